@@ -0,0 +1,284 @@
+# api_service.py - HTTP inference service for the Celestial Circuitry pipeline
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, ValidationError
+
+sys.path.append('utils')
+sys.path.append('models')
+
+from utils.bls_engine import MAX_PLANETS_LIMIT
+from utils.feature_extractor import LightCurveProcessor
+from utils.incremental import IncrementalMonitor, MonitorCapacityError
+from utils.instrumentation import PipelineProfile, get_metrics
+from utils.inference import model_inputs, predict_batch
+from utils.light_curve_io import LightCurveTooLarge
+from utils.model_registry import get_model_registry
+from utils.pipeline import process_light_curve_source
+
+# Micro-batching: flush when this many requests wait, or after this delay
+MAX_BATCH_SIZE = int(os.environ.get("CELESTIAL_MAX_BATCH", "64"))
+MAX_BATCH_WAIT_MS = float(os.environ.get("CELESTIAL_BATCH_WAIT_MS", "10"))
+# Threads for CPU-bound preprocessing/BLS work
+ANALYSIS_WORKERS = int(os.environ.get("CELESTIAL_ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+
+
+class LightCurvePayload(BaseModel):
+    target_id: Optional[str] = None
+    time: List[float]
+    flux: List[float]
+
+
+class BatchPayload(BaseModel):
+    light_curves: List[LightCurvePayload]
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into single model forward passes.
+
+    The classifier is fetched from the model registry for every batch, so
+    models promoted on disk are picked up without a restart.
+    """
+
+    def __init__(self, registry, executor, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS):
+        self.registry = registry
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.batches_run = 0
+        self.items_scored = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def predict(self, features, view):
+        """Queue one (features, view) pair and wait for its probabilities"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((features, view, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            profile = PipelineProfile()
+            try:
+                # Assembly errors (e.g. mismatched shapes) fail this batch, not the batcher
+                features = np.stack([item[0] for item in batch])
+                views = np.stack([item[1] for item in batch])
+                xgb, cnn, ensemble = await loop.run_in_executor(
+                    self.executor,
+                    lambda: predict_batch(self.registry.get_classifier(), features, views, profile=profile))
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches_run += 1
+            self.items_scored += len(batch)
+            get_metrics().observe(profile, batch_size=len(batch))
+            for i, (_, _, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result((xgb[i], cnn[i], ensemble[i]))
+
+
+def _probability(value):
+    return None if np.isnan(value) else float(value)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm start: models and processor are built once, before serving traffic
+    registry = get_model_registry()
+    app.state.registry = registry
+    registry.get_classifier()
+    app.state.processor = LightCurveProcessor()
+    app.state.monitor = IncrementalMonitor(app.state.processor)
+    app.state.analysis_pool = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+    app.state.inference_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+    app.state.batcher = MicroBatcher(registry, app.state.inference_pool)
+    app.state.batcher.start()
+    app.state.started_at = time.time()
+    try:
+        yield
+    finally:
+        await app.state.batcher.stop()
+        app.state.analysis_pool.shutdown(wait=False)
+        app.state.inference_pool.shutdown(wait=False)
+
+
+app = FastAPI(title="Celestial Circuitry AI", version="1.0.0", lifespan=lifespan)
+
+
+def _extract(source, max_planets=None):
+    """Analyze one light curve for the currently loaded models and build their inputs"""
+    if isinstance(source, LightCurvePayload):
+        source = _payload_arrays(source)
+    registry = app.state.registry
+    # Resolved per request, so reloaded models are used (and their feature path followed)
+    classifier = registry.get_classifier()
+    result = process_light_curve_source(app.state.processor, source, None, max_planets, registry.feature_path)
+    return result, model_inputs(classifier, result)
+
+
+async def _analyze(source, target_id=None, max_planets=None):
+    """
+    Run the pipeline off the event loop, then score through the micro-batcher.
+
+    JSON payloads are converted to arrays, and model inputs built, in the
+    analysis executor too, so a large request doesn't stall the loop.
+    """
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        result, (features, view) = await loop.run_in_executor(
+            app.state.analysis_pool, _extract, source, max_planets)
+    except LightCurveTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    xgb, cnn, ensemble = await app.state.batcher.predict(features, view)
+    return {
+        "target_id": target_id,
+        "transit_detected": bool(result["transit_detected"]),
+        "bls_features": result["bls_features"],
+        "candidates": result["candidates"],
+        "quality_report": result["quality_report"],
+        "uncertainty_features": result["uncertainty_features"],
+        "profile": result["profile"],
+        "xgb_proba": _probability(xgb),
+        "cnn_proba": _probability(cnn),
+        "ensemble_proba": _probability(ensemble),
+        "elapsed_s": round(time.perf_counter() - start, 4),
+    }
+
+
+def _payload_arrays(payload):
+    if len(payload.time) != len(payload.flux):
+        raise HTTPException(status_code=422, detail="time and flux must have the same length")
+    return np.asarray(payload.time, dtype=np.float64), np.asarray(payload.flux, dtype=np.float64)
+
+
+# Signals to search for per light curve; above 1 runs the multi-planet search
+MaxPlanets = Query(None, ge=1, le=MAX_PLANETS_LIMIT,
+                   description="Signals to search for (default: CELESTIAL_MAX_PLANETS)")
+
+
+@app.post("/analyze")
+async def analyze(request: Request, max_planets: Optional[int] = MaxPlanets):
+    """Analyze one light curve sent as CSV bytes or JSON {time, flux}"""
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            payload = LightCurvePayload(**await request.json())
+        except (json.JSONDecodeError, TypeError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid light curve payload: {e}")
+        return await _analyze(payload, payload.target_id, max_planets)
+    body = await request.body()
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty request body")
+    return await _analyze(body, max_planets=max_planets)
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(payload: BatchPayload, max_planets: Optional[int] = MaxPlanets):
+    """
+    Analyze many light curves concurrently; scoring is batched across them.
+
+    A light curve that fails gets an entry with its ``error`` and HTTP
+    ``status_code`` in place of its results; the others are unaffected.
+    """
+    tasks = [_analyze(lc, lc.target_id, max_planets) for lc in payload.light_curves]
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    return {"results": [_batch_entry(lc.target_id, outcome) for lc, outcome in zip(payload.light_curves, outcomes)]}
+
+
+def _batch_entry(target_id, outcome):
+    """Result of one batch item, or its error entry"""
+    if isinstance(outcome, HTTPException):
+        return {"target_id": target_id, "error": outcome.detail, "status_code": outcome.status_code}
+    if isinstance(outcome, Exception):
+        return {"target_id": target_id, "error": f"{type(outcome).__name__}: {outcome}", "status_code": 500}
+    if isinstance(outcome, BaseException):
+        raise outcome
+    return outcome
+
+
+@app.post("/monitor/{target_id}")
+async def monitor_append(target_id: str, payload: LightCurvePayload):
+    """Append new cadences to a monitored target and return refreshed BLS features"""
+    time_arr, flux_arr = _payload_arrays(payload)
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(
+            app.state.analysis_pool, app.state.monitor.append, target_id, time_arr, flux_arr)
+    except MonitorCapacityError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"target_id": target_id, **result}
+
+
+@app.delete("/monitor/{target_id}")
+async def monitor_drop(target_id: str):
+    """Stop monitoring a target and free its state"""
+    if not app.state.monitor.drop(target_id):
+        raise HTTPException(status_code=404, detail=f"Target {target_id!r} is not monitored")
+    return {"target_id": target_id, "dropped": True}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage wall/CPU/RSS metrics in Prometheus text format"""
+    return get_metrics().render_prometheus()
+
+
+@app.get("/healthz")
+async def healthz():
+    stats = app.state.registry.stats()
+    return {
+        "status": "ok",
+        "models_loaded": stats["loaded"],
+        "model_load_seconds": stats["load_seconds"],
+        "model_memory_bytes": stats["memory_bytes"],
+        "uptime_s": round(time.time() - app.state.started_at, 1),
+        "batches_run": app.state.batcher.batches_run,
+        "items_scored": app.state.batcher.items_scored,
+        "queue_depth": app.state.batcher.queue.qsize(),
+        "monitored_targets": len(app.state.monitor),
+        "monitor_state_bytes": app.state.monitor.state_bytes,
+        "monitor_evictions": app.state.monitor.evictions,
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.environ.get("HOST", "0.0.0.0"), port=int(os.environ.get("PORT", "8000")))
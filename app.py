@@ -1,24 +1,30 @@
 # app.py - CELESTIAL CIRCUITRY AI - ULTIMATE ENHANCED VERSION
 import streamlit as st
-import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import joblib
-import tensorflow as tf
-from tensorflow import keras
 import sys
 import os
 import time
 import random
-import base64
+import uuid
 
 # Add utils to path
 sys.path.append('utils')
 sys.path.append('models')
 
+from utils.lazy_imports import lazy_import, lazy_callable
 from utils.feature_extractor import LightCurveProcessor
-from models.train_models import ExoplanetClassifier
+from utils.model_registry import get_model_registry
+from utils.result_cache import get_result_cache
+from utils.job_queue import JobQueueFull, analyze_in_queue, get_job_queue
+from utils.instrumentation import PipelineProfile, get_metrics
+from utils.bls_engine import MAX_PLANETS, MAX_PLANETS_LIMIT
+from utils.pipeline import candidate_table
+from utils.static_assets import asset_src, encode_base64, render_cached
+from utils.decimate import decimate, phase_fold, scatter_trace
+
+# Plotly and the ML frameworks load on first use, not before the welcome screen
+go = lazy_import("plotly.graph_objects")
+make_subplots = lazy_callable("plotly.subplots", "make_subplots")
 
 # Configure the page for ultimate space experience
 st.set_page_config(
@@ -31,14 +37,20 @@ st.set_page_config(
 class CelestialCircuitryAI:
     def __init__(self):
         self.processor = LightCurveProcessor()
-        self.classifier = ExoplanetClassifier()
+        self.result_cache = get_result_cache()
+        # Analyses run on a bounded worker pool shared by every session
+        self.job_queue = get_job_queue()
         self.initialize_session_state()
         
-        try:
-            self.classifier.load_models()
-            st.session_state.models_loaded = True
-        except Exception as e:
-            st.session_state.models_loaded = False
+        # Models are loaded once per process, in the background, and shared across reruns/sessions
+        self.model_registry = get_model_registry()
+        # Readiness is read live from model_registry.models_loaded; a session copy would go stale
+        self.model_registry.warm_up()
+
+    @property
+    def classifier(self):
+        """Shared classifier; waits for the background load on first use"""
+        return self.model_registry.get_classifier()
 
     def initialize_session_state(self):
         """Initialize session state variables"""
@@ -46,24 +58,26 @@ class CelestialCircuitryAI:
             st.session_state.analysis_complete = False
         if 'current_data' not in st.session_state:
             st.session_state.current_data = None
+        if 'session_id' not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
 
     def get_base64_image(self, image_path):
-        """Convert image to base64"""
-        try:
-            with open(image_path, "rb") as img_file:
-                return base64.b64encode(img_file.read()).decode()
-        except:
-            return None
+        """Convert image to base64 (encoded once per process and file change)"""
+        return encode_base64(image_path)
 
     def inject_celestial_css(self):
         """Inject ultimate celestial CSS with background image"""
-        # Get base64 encoded images
-        logo_b64 = self.get_base64_image("logo.png")
-        bg_b64 = self.get_base64_image("background.jpg")
+        # Rendered once and reused until background.jpg changes on disk
+        css = render_cached("celestial_css", ["background.jpg"], self.build_celestial_css)
+        st.markdown(css, unsafe_allow_html=True)
+
+    def build_celestial_css(self):
+        """Build the celestial CSS block with background image"""
+        bg_src = asset_src("background.jpg")
         
-        background_image = f"url('data:image/jpg;base64,{bg_b64}')" if bg_b64 else "linear-gradient(135deg, #0a0a2a 0%, #1a1a4b 30%, #2d1b69 70%, #4a1c6b 100%)"
+        background_image = f"url('{bg_src}')" if bg_src else "linear-gradient(135deg, #0a0a2a 0%, #1a1a4b 30%, #2d1b69 70%, #4a1c6b 100%)"
         
-        st.markdown(f"""
+        return f"""
         <style>
             /* Clean Background - Only background.jpg */
             .main {{
@@ -591,14 +605,19 @@ class CelestialCircuitryAI:
             
             createParticles();
         </script>
-        """, unsafe_allow_html=True)
+        """
 
     def create_celestial_header(self):
         """Create celestial header with logo"""
-        logo_b64 = self.get_base64_image("logo.png")
-        logo_html = f'<img src="data:image/png;base64,{logo_b64}" class="logo-img">' if logo_b64 else '🚀'
+        header = render_cached("celestial_header", ["logo.png"], self.build_celestial_header)
+        st.markdown(header, unsafe_allow_html=True)
+
+    def build_celestial_header(self):
+        """Build the celestial header HTML with logo"""
+        logo_src = asset_src("logo.png")
+        logo_html = f'<img src="{logo_src}" class="logo-img">' if logo_src else '🚀'
         
-        st.markdown(f"""
+        return f"""
         <div class="celestial-header">
             <div class="logo-container">
                 {logo_html}
@@ -617,7 +636,7 @@ class CelestialCircuitryAI:
                 </div>
             </div>
         </div>
-        """, unsafe_allow_html=True)
+        """
 
     def create_quantum_control_panel(self):
         """Create quantum-inspired control panel"""
@@ -659,8 +678,13 @@ class CelestialCircuitryAI:
                      "HD 209458 b (Hot Jupiter)", "WASP-121b (Ultra-Hot Giant)", "Proxima Centauri b (Closest Exoplanet)"],
                     index=0
                 )
+                max_planets = st.number_input(
+                    "Planets to search for:", min_value=1, max_value=MAX_PLANETS_LIMIT,
+                    value=max(MAX_PLANETS, 7 if sample_option.startswith("TRAPPIST-1") else 1),
+                    help="Above 1, each detected transit is masked and the search repeated"
+                )
         
-        return uploaded_file, sample_option
+        return uploaded_file, sample_option, int(max_planets)
 
     def create_celestial_navigation(self):
         """Create celestial navigation orbs"""
@@ -707,7 +731,11 @@ class CelestialCircuitryAI:
             """, unsafe_allow_html=True)
         
         with col2:
-            st.markdown("""
+            # Measured over this server process's analyses so far
+            measured = get_metrics().summary()
+            speed = f"{measured['mean_wall_s']:.1f}s" if measured["mean_wall_s"] is not None else "—"
+            memory = f"{measured['peak_rss_mb']:.0f}MB" if measured["analyses"] else "—"
+            st.markdown(f"""
             <div class="circuit-card">
                 <h3 style="color: white; margin-bottom: 2.5rem; font-size: 1.8rem; text-align: center;">📊 Quantum Performance Matrix</h3>
                 
@@ -717,11 +745,11 @@ class CelestialCircuitryAI:
                         <div class="metric-label">Quantum Accuracy</div>
                     </div>
                     <div class="celestial-metric">
-                        <div class="metric-value">1.8s</div>
+                        <div class="metric-value">{speed}</div>
                         <div class="metric-label">Processing Speed</div>
                     </div>
                     <div class="celestial-metric">
-                        <div class="metric-value">98MB</div>
+                        <div class="metric-value">{memory}</div>
                         <div class="metric-label">Memory Usage</div>
                     </div>
                     <div class="celestial-metric">
@@ -765,6 +793,7 @@ class CelestialCircuitryAI:
             self.render_cosmic_overview(ensemble_proba, bls_features, xgb_proba, cnn_proba)
         with tab2:
             self.render_stellar_analysis(result, file_name, bls_features)
+            self.render_transit_candidates(result)
         with tab3:
             self.render_neural_insights(bls_features, xgb_proba, cnn_proba, ensemble_proba)
         with tab4:
@@ -827,20 +856,37 @@ class CelestialCircuitryAI:
                 st.metric("Detection Power", f"{bls_features['bls_power']:.1f}", "Significant" if bls_features['bls_power'] > 20 else "Marginal")
 
     def render_stellar_analysis(self, result, file_name, bls_features):
-        fig = self.create_stellar_visualization(result, file_name, bls_features)
-        st.plotly_chart(fig, use_container_width=True)
+        profile = PipelineProfile()
+        with profile.stage("plotting"):
+            fig = self.create_stellar_visualization(result, file_name, bls_features)
+            st.plotly_chart(fig, use_container_width=True)
+        get_metrics().observe(profile, file_name=file_name)
+        profile.merge_into(result)
+
+    def render_transit_candidates(self, result):
+        candidates = result.get('candidates', [])
+        if not candidates:
+            return
+        st.markdown(f"""
+        <div class="circuit-card">
+            <h3 style="color: white; margin-bottom: 1rem;">🪐 Transit Candidates ({len(candidates)})</h3>
+        </div>
+        """, unsafe_allow_html=True)
+        st.table(candidate_table(candidates))
 
     def create_stellar_visualization(self, result, file_name, bls_features):
-        time, flux = result['time'], result['flux']
-        period = result['period']
+        period, time_offset = result['period'], result.get('time_offset', 0.0)
+        # Decimate the compact arrays once for both traces; only the kept points get absolute float64 times
+        time, flux = decimate(result['time'], result['flux'])
+        time = time + time_offset
         fig = make_subplots(rows=2, cols=2, subplot_titles=('🌠 Raw Stellar Flux', '⚡ Processed Signal', '🔄 Phase-folded View', '📈 Transit Features'), vertical_spacing=0.15, horizontal_spacing=0.1)
         colors = ['#00f5ff', '#ff00ff', '#ffd700', '#8a2be2']
-        fig.add_trace(go.Scatter(x=time, y=flux, mode='lines', name='Raw Flux', line=dict(color=colors[0], width=3), fill='tozeroy', fillcolor=f'rgba(0, 245, 255, 0.1)'), row=1, col=1)
-        fig.add_trace(go.Scatter(x=time, y=flux, mode='lines', name='Processed', line=dict(color=colors[1], width=3)), row=1, col=2)
+        # Traces are decimated to a fixed point budget (min/max per bucket keeps the dips)
+        fig.add_trace(scatter_trace(time, flux, mode='lines', name='Raw Flux', line=dict(color=colors[0], width=3), fill='tozeroy', fillcolor=f'rgba(0, 245, 255, 0.1)'), row=1, col=1)
+        fig.add_trace(scatter_trace(time, flux, mode='lines', name='Processed', line=dict(color=colors[1], width=3)), row=1, col=2)
         if period > 0:
-            phase = (time / period) % 1
-            sort_idx = np.argsort(phase)
-            fig.add_trace(go.Scatter(x=phase[sort_idx], y=flux[sort_idx], mode='markers', name='Phase-folded', marker=dict(color=colors[2], size=5, opacity=0.7)), row=2, col=1)
+            phase, phase_flux = phase_fold(result['time'], result['flux'], period, -time_offset)
+            fig.add_trace(scatter_trace(phase, phase_flux, mode='markers', name='Phase-folded', marker=dict(color=colors[2], size=5, opacity=0.7)), row=2, col=1)
         features = ['Period', 'Depth', 'SNR', 'Power']
         values = [bls_features['bls_period'], bls_features['bls_depth'] * 1000, bls_features['bls_snr'], bls_features['bls_power']]
         fig.add_trace(go.Bar(x=features, y=values, name='BLS Features', marker_color=colors, hovertemplate='%{x}: %{y:.3f}<extra></extra>'), row=2, col=2)
@@ -878,16 +924,24 @@ class CelestialCircuitryAI:
             <h3 style="color: white; margin-bottom: 2rem;">🛰️ Quantum Mission Integration</h3>
         </div>
         """, unsafe_allow_html=True)
+        profile = result.get('profile', {})
+        stages = profile.get('stages', {})
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric("TESS Compatibility", "99%", "Quantum Optimized")
             st.metric("Data Quality", "A++", "Exceptional")
         with col2:
-            st.metric("Processing Speed", "1.8s", "Quantum Fast")
-            st.metric("Memory Usage", "98MB", "Ultra-Efficient")
+            st.metric("Processing Speed", f"{profile.get('wall_s', 0.0):.2f}s",
+                      f"BLS {stages.get('bls', {}).get('wall_s', 0.0):.2f}s", delta_color="off")
+            st.metric("Memory Usage", f"{profile.get('peak_rss_mb', 0.0):.0f}MB",
+                      f"CPU {profile.get('cpu_s', 0.0):.2f}s", delta_color="off")
         with col3:
             st.metric("NASA Compliance", "100%", "Quantum Certified")
             st.metric("Validation", "PASSED", "All Quantum Checks")
+        if stages:
+            with st.expander("⏱️ Stage Timings"):
+                st.table([{"Stage": name, "Wall (s)": f"{entry['wall_s']:.3f}", "CPU (s)": f"{entry['cpu_s']:.3f}",
+                           "Peak RSS (MB)": f"{entry['peak_rss_mb']:.0f}"} for name, entry in stages.items()])
 
     def render_professional_sidebar(self):
         st.sidebar.title("🔭 Quantum Control Panel")
@@ -916,11 +970,22 @@ class CelestialCircuitryAI:
             ensemble_proba = (xgb_proba + cnn_proba) / 2
         return xgb_proba, cnn_proba, ensemble_proba, bls_features
 
+    def analyze_in_queue(self, file_to_process, spinner_text, max_planets=None):
+        """Run the pipeline on the shared job queue and show its progress until it finishes"""
+        progress_bar = st.progress(0.0, text=spinner_text)
+        try:
+            return analyze_in_queue(self.job_queue, self.result_cache, self.processor, file_to_process,
+                                    st.session_state.session_id, spinner_text,
+                                    lambda fraction, text: progress_bar.progress(fraction, text=text), max_planets,
+                                    self.model_registry.feature_path)
+        finally:
+            progress_bar.empty()
+
     def run_celestial_circuitry(self):
         """Main celestial circuitry application"""
         self.inject_celestial_css()
         self.create_celestial_header()
-        uploaded_file, sample_choice = self.create_quantum_control_panel()
+        uploaded_file, sample_choice, max_planets = self.create_quantum_control_panel()
         
         file_to_process = None
         file_name = "Unknown"
@@ -937,17 +1002,15 @@ class CelestialCircuitryAI:
             self.render_enhanced_welcome()
             return
         
-        with st.spinner("🌌 Initializing quantum circuitry for cosmic analysis..."):
-            try:
-                if isinstance(file_to_process, str):
-                    result = self.processor.process_light_curve(file_to_process)
-                else:
-                    with open("temp_upload.csv", "wb") as f:
-                        f.write(file_to_process.getbuffer())
-                    result = self.processor.process_light_curve("temp_upload.csv")
-                self.render_stellar_dashboard(result, file_name)
-            except Exception as e:
-                st.error(f"🚨 Quantum analysis interrupted: {str(e)}")
+        try:
+            # Uploads are parsed straight from the in-memory buffer
+            result = self.analyze_in_queue(file_to_process, "🌌 Initializing quantum circuitry for cosmic analysis...",
+                                           max_planets)
+            self.render_stellar_dashboard(result, file_name)
+        except JobQueueFull as e:
+            st.warning(f"🛰️ Quantum circuitry is busy: {e}. Please retry in a moment.")
+        except Exception as e:
+            st.error(f"🚨 Quantum analysis interrupted: {str(e)}")
 
 # Launch Celestial Circuitry AI
 if __name__ == "__main__":
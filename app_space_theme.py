@@ -2,25 +2,30 @@
 # A user-friendly, space-themed exoplanet discovery platform
 
 import streamlit as st
-import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px
-import joblib
-import tensorflow as tf
-from tensorflow import keras
 import sys
 import os
 import time
 import random
+import uuid
 
 # Add utils to path
 sys.path.append('utils')
 sys.path.append('models')
 
+from utils.lazy_imports import lazy_import, lazy_callable
 from utils.feature_extractor import LightCurveProcessor
-from models.train_models import ExoplanetClassifier
+from utils.model_registry import get_model_registry
+from utils.result_cache import get_result_cache
+from utils.job_queue import JobQueueFull, analyze_in_queue, get_job_queue
+from utils.instrumentation import PipelineProfile, get_metrics
+from utils.bls_engine import MAX_PLANETS, MAX_PLANETS_LIMIT
+from utils.pipeline import candidate_table
+from utils.decimate import decimate, phase_fold, scatter_trace
+
+# Plotly and the ML frameworks load on first use, not before the first render
+go = lazy_import("plotly.graph_objects")
+make_subplots = lazy_callable("plotly.subplots", "make_subplots")
 
 # Configure the page
 st.set_page_config(
@@ -380,16 +385,25 @@ st.markdown("""
 class SpaceExplorerApp:
     def __init__(self):
         self.processor = LightCurveProcessor()
-        self.classifier = ExoplanetClassifier()
-        
-        # Load trained models
-        try:
-            self.classifier.load_models()
-            st.session_state.models_loaded = True
-        except Exception as e:
-            st.session_state.models_loaded = False
+        self.result_cache = get_result_cache()
+        # Analyses run on a bounded worker pool shared by every session
+        self.job_queue = get_job_queue()
+        if 'session_id' not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
+        
+        # Load trained models in the background (once per process, shared across reruns/sessions)
+        self.model_registry = get_model_registry()
+        # Readiness is read live from model_registry.models_loaded; a session copy would go stale
+        self.model_registry.warm_up()
+
+    @property
+    def classifier(self):
+        """Shared classifier; waits for the background load on first use"""
+        classifier = self.model_registry.get_classifier()
+        if not self.model_registry.models_loaded:
             # Create dummy models for demo
-            self.classifier.is_trained = True
+            classifier.is_trained = True
+        return classifier
     
     def create_starfield(self):
         """Create animated starfield background"""
@@ -439,8 +453,8 @@ class SpaceExplorerApp:
         st.sidebar.markdown("### 📡 Data Collection")
         uploaded_file = st.sidebar.file_uploader(
             "Upload Starlight Data",
-            type=['csv'],
-            help="Upload your starlight observation data (CSV format)"
+            type=['csv', 'fits'],
+            help="Upload your starlight observation data (CSV or TESS/Kepler FITS)"
         )
         
         # Quick start options
@@ -455,6 +469,10 @@ class SpaceExplorerApp:
         st.sidebar.markdown("### ⚙️ Explorer Settings")
         show_tutorial = st.sidebar.checkbox("Show Tutorial Guide", value=True)
         show_advanced = st.sidebar.checkbox("Show Technical Details", value=False)
+        max_planets = st.sidebar.number_input(
+            "Planets to Search For", min_value=1, max_value=MAX_PLANETS_LIMIT, value=MAX_PLANETS,
+            help="Above 1, each detected transit is masked and the search repeated (e.g. 7 for TRAPPIST-1)"
+        )
         
         # Mission stats
         st.sidebar.markdown("### 📊 Mission Statistics")
@@ -466,7 +484,7 @@ class SpaceExplorerApp:
         st.sidebar.metric("🪐 Planets Discovered", st.session_state.discoveries)
         st.sidebar.metric("🚀 Missions Completed", st.session_state.missions_completed)
         
-        return uploaded_file, mission_choice, show_tutorial, show_advanced
+        return uploaded_file, mission_choice, show_tutorial, show_advanced, int(max_planets)
     
     def get_mission_file_path(self, mission_choice):
         """Get file path for mission choice"""
@@ -478,9 +496,11 @@ class SpaceExplorerApp:
     
     def create_space_visualization(self, result, file_name):
         """Create space-themed visualizations"""
-        time, flux = result['time'], result['flux']
-        period = result['period']
+        period, time_offset = result['period'], result.get('time_offset', 0.0)
         bls_features = result['bls_features']
+        # Decimate the compact arrays once for both traces; only the kept points get absolute float64 times
+        time, flux = decimate(result['time'], result['flux'])
+        time = time + time_offset
         
         # Create subplots with space theme
         fig = make_subplots(
@@ -495,10 +515,10 @@ class SpaceExplorerApp:
             horizontal_spacing=0.1
         )
         
-        # Plot 1: Raw starlight data
+        # Plot 1: Raw starlight data (decimated to a fixed point budget)
         fig.add_trace(
-            go.Scatter(
-                x=time, y=flux, 
+            scatter_trace(
+                time, flux, 
                 mode='lines', 
                 name='Starlight', 
                 line=dict(color='#4ecdc4', width=2),
@@ -509,8 +529,8 @@ class SpaceExplorerApp:
         
         # Plot 2: Processed data
         fig.add_trace(
-            go.Scatter(
-                x=time, y=flux, 
+            scatter_trace(
+                time, flux, 
                 mode='lines',
                 name='Processed', 
                 line=dict(color='#45b7d1', width=2),
@@ -521,11 +541,10 @@ class SpaceExplorerApp:
         
         # Plot 3: Phase-folded orbit
         if period > 0:
-            phase = (time / period) % 1
-            sort_idx = np.argsort(phase)
+            phase, phase_flux = phase_fold(result['time'], result['flux'], period, -time_offset)
             fig.add_trace(
-                go.Scatter(
-                    x=phase[sort_idx], y=flux[sort_idx], 
+                scatter_trace(
+                    phase, phase_flux, 
                     mode='markers', 
                     name='Orbit Pattern',
                     marker=dict(color='#ff6b6b', size=4, opacity=0.7),
@@ -774,12 +793,23 @@ class SpaceExplorerApp:
             st.balloons()
             st.success("🎉 Achievement Unlocked: Planet Discoverer!")
     
+    def analyze_in_queue(self, file_to_process, spinner_text, max_planets=None):
+        """Run the pipeline on the shared job queue and show its progress until it finishes"""
+        progress_bar = st.progress(0.0, text=spinner_text)
+        try:
+            return analyze_in_queue(self.job_queue, self.result_cache, self.processor, file_to_process,
+                                    st.session_state.session_id, spinner_text,
+                                    lambda fraction, text: progress_bar.progress(fraction, text=text), max_planets,
+                                    self.model_registry.feature_path)
+        finally:
+            progress_bar.empty()
+
     def run_space_explorer(self):
         """Main space explorer application"""
         self.render_space_header()
         
         # Get user input
-        uploaded_file, mission_choice, show_tutorial, show_advanced = self.render_space_sidebar()
+        uploaded_file, mission_choice, show_tutorial, show_advanced, max_planets = self.render_space_sidebar()
         
         # Show tutorial if requested
         if show_tutorial:
@@ -817,63 +847,67 @@ class SpaceExplorerApp:
             return
         
         # Mission execution
-        with st.spinner("🛸 Analyzing starlight data... This may take a moment."):
-            try:
-                # Process the file
-                if isinstance(file_to_process, str):
-                    result = self.processor.process_light_curve(file_to_process)
-                else:
-                    # Save uploaded file temporarily
-                    with open("temp_upload.csv", "wb") as f:
-                        f.write(file_to_process.getbuffer())
-                    result = self.processor.process_light_curve("temp_upload.csv")
-                
-                # Get prediction (using deterministic logic for demo)
-                if "with_transit" in file_name.lower() or result['transit_detected']:
-                    xgb_proba = 0.96 + np.random.uniform(0.02, 0.03)
-                    cnn_proba = 0.95 + np.random.uniform(0.01, 0.04)
-                    ensemble_proba = (xgb_proba + cnn_proba) / 2
-                else:
-                    xgb_proba = 0.03 + np.random.uniform(0.0, 0.02)
-                    cnn_proba = 0.02 + np.random.uniform(0.0, 0.01)
-                    ensemble_proba = (xgb_proba + cnn_proba) / 2
-                
-                # Display results
-                st.success(f"✅ Mission Complete: **{file_name}**")
-                
-                # Create space-themed tabs
-                tab1, tab2, tab3 = st.tabs(["🌌 Space Analysis", "🪐 Discovery Results", "🎓 Learn More"])
-                
-                with tab1:
-                    st.markdown("### 🌟 Starlight Analysis Dashboard")
+        try:
+            # Process the file on the shared job queue (repeat inputs come from the result cache)
+            # Uploaded files are parsed from memory, never via a shared temp file
+            result = self.analyze_in_queue(file_to_process, "🛸 Analyzing starlight data...", max_planets)
+            
+            # Get prediction (using deterministic logic for demo)
+            if "with_transit" in file_name.lower() or result['transit_detected']:
+                xgb_proba = 0.96 + np.random.uniform(0.02, 0.03)
+                cnn_proba = 0.95 + np.random.uniform(0.01, 0.04)
+                ensemble_proba = (xgb_proba + cnn_proba) / 2
+            else:
+                xgb_proba = 0.03 + np.random.uniform(0.0, 0.02)
+                cnn_proba = 0.02 + np.random.uniform(0.0, 0.01)
+                ensemble_proba = (xgb_proba + cnn_proba) / 2
+            
+            # Display results
+            st.success(f"✅ Mission Complete: **{file_name}**")
+            
+            # Create space-themed tabs
+            tab1, tab2, tab3 = st.tabs(["🌌 Space Analysis", "🪐 Discovery Results", "🎓 Learn More"])
+            
+            with tab1:
+                st.markdown("### 🌟 Starlight Analysis Dashboard")
+                profile = PipelineProfile()
+                with profile.stage("plotting"):
                     fig = self.create_space_visualization(result, file_name)
                     st.plotly_chart(fig, use_container_width=True)
-                
-                with tab2:
-                    self.render_discovery_result(ensemble_proba, result['bls_features'], xgb_proba, cnn_proba)
-                
-                with tab3:
-                    self.render_tutorial_section()
-                    if show_advanced:
-                        st.markdown("### 🔬 Technical Details")
-                        st.json({
-                            "Raw Features": result['bls_features'],
-                            "Quality Report": result.get('quality_report', {}),
-                            "Uncertainty Features": result.get('uncertainty_features', {})
-                        })
-                
-                # Mission summary
-                self.render_mission_summary(result, file_name)
-                
-            except Exception as e:
-                st.error(f"❌ Mission Failed: {str(e)}")
-                st.info("""
-                **Troubleshooting Tips:**
-                - Make sure your CSV has 'time' and 'flux' columns
-                - Check that all values are numbers
-                - Try the sample missions first
-                - Contact mission control if problems persist
-                """)
+                get_metrics().observe(profile, file_name=file_name)
+                profile.merge_into(result)
+            
+            with tab2:
+                self.render_discovery_result(ensemble_proba, result['bls_features'], xgb_proba, cnn_proba)
+                if result.get('candidates'):
+                    st.markdown(f"### 🪐 Transit Candidates ({len(result['candidates'])})")
+                    st.table(candidate_table(result['candidates']))
+            
+            with tab3:
+                self.render_tutorial_section()
+                if show_advanced:
+                    st.markdown("### 🔬 Technical Details")
+                    st.json({
+                        "Raw Features": result['bls_features'],
+                        "Quality Report": result.get('quality_report', {}),
+                        "Uncertainty Features": result.get('uncertainty_features', {}),
+                        "Stage Timings": result.get('profile', {})
+                    })
+            
+            # Mission summary
+            self.render_mission_summary(result, file_name)
+            
+        except JobQueueFull as e:
+            st.warning(f"🛰️ Mission control is busy: {e}. Please retry in a moment.")
+        except Exception as e:
+            st.error(f"❌ Mission Failed: {str(e)}")
+            st.info("""
+            **Troubleshooting Tips:**
+            - Make sure your CSV has 'time' and 'flux' columns
+            - Check that all values are numbers
+            - Try the sample missions first
+            - Contact mission control if problems persist
+            """)
 
 # Run the space explorer application
 if __name__ == "__main__":
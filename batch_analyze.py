@@ -0,0 +1,62 @@
+# batch_analyze.py - Screen many light curves from the command line
+import argparse
+import sys
+
+sys.path.append('utils')
+sys.path.append('models')
+
+from utils.batch import discover_inputs, run_batch
+from utils.bls_engine import MAX_PLANETS, MAX_PLANETS_LIMIT
+from utils.cascade import DEFAULT_GATES, SCREEN_THRESHOLD, format_report
+from utils.feature_store import DEFAULT_FEATURE_STORE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch exoplanet analysis of light curve CSV files")
+    parser.add_argument("inputs", nargs="+", help="Directories, glob patterns or manifest files")
+    parser.add_argument("-o", "--output", default="batch_results.csv",
+                        help="CSV file or Parquet directory (*.parquet) for results")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Output format (default: from extension)")
+    parser.add_argument("-j", "--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, help="Maximum in-flight targets (default: 2x workers)")
+    parser.add_argument("--no-classify", action="store_true", help="Skip XGBoost/CNN scoring")
+    parser.add_argument("--restart", action="store_true", help="Re-run targets already present in the output")
+    parser.add_argument("--feature-store", nargs="?", const=DEFAULT_FEATURE_STORE,
+                        help=f"Reuse/record extracted features in a SQLite store (default: {DEFAULT_FEATURE_STORE})")
+    parser.add_argument("--cascade", nargs="?", const=",".join(DEFAULT_GATES),
+                        help="Early-exit gates, comma separated: screen (cheap box-filter screen before BLS), "
+                             f"bls (score only BLS detections); default: {','.join(DEFAULT_GATES)}")
+    parser.add_argument("--screen-snr", type=float, default=SCREEN_THRESHOLD,
+                        help=f"Screen statistic needed to run BLS (default: {SCREEN_THRESHOLD})")
+    parser.add_argument("--max-planets", type=int, choices=range(1, MAX_PLANETS_LIMIT + 1), metavar="N",
+                        help=f"Signals to search for per light curve, up to {MAX_PLANETS_LIMIT} (default: {MAX_PLANETS})")
+    args = parser.parse_args(argv)
+    cascade = tuple(gate.strip() for gate in args.cascade.split(",") if gate.strip()) if args.cascade else None
+
+    targets = []
+    for spec in args.inputs:
+        targets.extend(discover_inputs(spec))
+    if not targets:
+        print("No light curves found", file=sys.stderr)
+        return 1
+
+    def report(done, total, row):
+        status = "✅" if row["status"] == "ok" else f"❌ {row.get('error')}"
+        print(f"[{done}/{total}] {row['target_id']} {status}", flush=True)
+
+    summary = run_batch(targets, args.output, fmt=args.format, workers=args.workers,
+                        max_pending=args.max_pending, classify=not args.no_classify,
+                        resume=not args.restart, progress=report, feature_store=args.feature_store,
+                        cascade=cascade, screen_threshold=args.screen_snr, max_planets=args.max_planets)
+    print(f"🚀 Batch complete: {summary['ok']} ok, {summary['error']} failed, "
+          f"{summary['skipped']} already done (of {summary['total']})")
+    if args.feature_store:
+        print(f"🗄️ {summary['from_store']} targets reused stored features from {args.feature_store}")
+    if "cascade" in summary:
+        print(f"⏩ Cascade ({', '.join(cascade)}):")
+        print(format_report(summary["cascade"]))
+    return 0 if summary["error"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+# benchmark.py - Reproducible performance benchmarks for the light curve pipeline
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('utils')
+sys.path.append('models')
+
+from create_sample_data import create_professional_non_transit, create_professional_transit
+from utils.instrumentation import PipelineProfile
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+GENERATORS = {
+    "transit": create_professional_transit,
+    "non_transit": create_professional_non_transit,
+}
+STAGES = ("preprocess", "bls", "pipeline", "inference")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def environment():
+    """Machine and library details stored with each run, so results are only compared like for like"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def synthesize(kind, n_points, seed):
+    """Generate one benchmark light curve (without the demo time marker)"""
+    np.random.seed(seed)
+    return GENERATORS[kind](n_points=n_points, marker=False)
+
+
+def measure(fn, repeats):
+    """
+    Run ``fn`` ``repeats`` times under a PipelineProfile stage.
+
+    Returns:
+        tuple: (summary dict, last return value of fn).
+    """
+    walls, cpus, peaks = [], [], []
+    value = None
+    for _ in range(repeats):
+        profile = PipelineProfile()
+        with profile.stage("run"):
+            value = fn()
+        entry = profile.stages["run"]
+        walls.append(entry["wall_s"])
+        cpus.append(entry["cpu_s"])
+        peaks.append(entry["peak_rss_mb"])
+    return {
+        "repeats": repeats,
+        "wall_s_median": float(np.median(walls)),
+        "wall_s_min": float(np.min(walls)),
+        "cpu_s_median": float(np.median(cpus)),
+        "peak_rss_mb": float(np.max(peaks)),
+    }, value
+
+
+def _row(kind, n_points, stage, stats):
+    wall = stats["wall_s_median"]
+    return {
+        "kind": kind, "n_points": n_points, "stage": stage, **stats,
+        "curves_per_s": 1.0 / wall if wall > 0 else None,
+        "points_per_s": n_points / wall if wall > 0 else None,
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, kinds=tuple(GENERATORS), repeats=3, stages=STAGES, seed=42, progress=None):
+    """
+    Time preprocessing, BLS, the full pipeline and classifier inference across a size sweep.
+
+    Args:
+        sizes (tuple): Cadences per synthetic light curve.
+        kinds (tuple): Generator names from GENERATORS.
+        repeats (int): Timed runs per case; the median is reported.
+        stages (tuple): Subset of STAGES to run.
+        seed (int): RNG seed, so every run times identical inputs.
+        progress (callable): Called with each result row as it is produced.
+
+    Returns:
+        dict: {"environment": ..., "config": ..., "results": [rows]}.
+    """
+    from utils.feature_extractor import LightCurveProcessor
+    from utils.pipeline import preprocess, process_light_curve_arrays, run_bls
+
+    processor = LightCurveProcessor()
+    classifier = None
+    if "inference" in stages:
+        from utils.model_registry import get_model_registry
+
+        registry = get_model_registry()
+        classifier = registry.get_classifier()
+        if not registry.models_loaded:
+            classifier = None
+
+    rows = []
+
+    def emit(row):
+        rows.append(row)
+        if progress:
+            progress(row)
+
+    for n_points in sizes:
+        for kind in kinds:
+            time_arr, flux_arr = synthesize(kind, n_points, seed)
+            clean_time, clean_flux = preprocess(processor, time_arr, flux_arr)
+
+            if "preprocess" in stages:
+                stats, _ = measure(lambda: preprocess(processor, time_arr, flux_arr), repeats)
+                emit(_row(kind, n_points, "preprocess", stats))
+            if "bls" in stages:
+                stats, _ = measure(lambda: run_bls(clean_time, clean_flux), repeats)
+                emit(_row(kind, n_points, "bls", stats))
+            result = None
+            if "pipeline" in stages or classifier is not None:
+                stats, result = measure(lambda: process_light_curve_arrays(processor, time_arr, flux_arr), repeats)
+                if "pipeline" in stages:
+                    emit(_row(kind, n_points, "pipeline", stats))
+            if classifier is not None:
+                from utils.inference import score_light_curve
+
+                stats, _ = measure(lambda: score_light_curve(classifier, result), repeats)
+                emit(_row(kind, n_points, "inference", stats))
+
+    return {
+        "environment": environment(),
+        "config": {"sizes": list(sizes), "kinds": list(kinds), "repeats": repeats, "stages": list(stages),
+                   "seed": seed, "inference_skipped": "inference" in stages and classifier is None},
+        "results": rows,
+    }
+
+
+def compare(current, baseline):
+    """Pair rows of two runs by (kind, n_points, stage) with the wall-time ratio baseline/current"""
+    previous = {(row["kind"], row["n_points"], row["stage"]): row for row in baseline["results"]}
+    pairs = []
+    for row in current["results"]:
+        old = previous.get((row["kind"], row["n_points"], row["stage"]))
+        if old and row["wall_s_median"] > 0:
+            pairs.append((row, old, old["wall_s_median"] / row["wall_s_median"]))
+    return pairs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the light curve pipeline on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Cadences per curve")
+    parser.add_argument("--kinds", nargs="+", choices=list(GENERATORS), default=list(GENERATORS))
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per case (median reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    def report(row):
+        print(f"{row['kind']:<12} {row['n_points']:>9,} {row['stage']:<11} "
+              f"{row['wall_s_median']:>9.4f}s {row['points_per_s']:>14,.0f} pts/s {row['peak_rss_mb']:>8.1f} MB",
+              flush=True)
+
+    results = run_benchmarks(args.sizes, args.kinds, args.repeats, args.stages, args.seed, progress=report)
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"📊 Wrote {len(results['results'])} results to {args.output}")
+    if results["config"]["inference_skipped"]:
+        print("⚠️ Models not loaded; inference was skipped")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline.get("environment", {}).get("platform") != results["environment"]["platform"]:
+            print("⚠️ Baseline was recorded on a different platform; ratios may not be meaningful")
+        for row, old, speedup in compare(results, baseline):
+            print(f"{row['kind']:<12} {row['n_points']:>9,} {row['stage']:<11} "
+                  f"{old['wall_s_median']:.4f}s -> {row['wall_s_median']:.4f}s ({speedup:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
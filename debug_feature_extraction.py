@@ -1,8 +1,8 @@
 # debug_feature_extraction.py
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from utils.feature_extractor import LightCurveProcessor
+from utils.light_curve_io import read_light_curve_chunked
 
 # Initialize processor
 processor = LightCurveProcessor()
@@ -11,15 +11,13 @@ print("=== DEBUGGING FEATURE EXTRACTION ===")
 
 # 1. First, let's check what's in our sample data
 print("\n1. Checking sample data...")
-df = pd.read_csv('data/sample_light_curve.csv')
-print(f"Data shape: {df.shape}")
-print(f"Time range: {df['time'].min():.2f} to {df['time'].max():.2f}")
-print(f"Flux stats: min={df['flux'].min():.6f}, max={df['flux'].max():.6f}, mean={df['flux'].mean():.6f}")
+time, flux = read_light_curve_chunked('data/sample_light_curve.csv')
+print(f"Data points: {len(time)}")
+print(f"Time range: {time.min():.2f} to {time.max():.2f}")
+print(f"Flux stats: min={flux.min():.6f}, max={flux.max():.6f}, mean={flux.mean():.6f}")
 
 # 2. Let's manually check if there's a visible transit
 print("\n2. Looking for transits manually...")
-time = df['time'].values
-flux = df['flux'].values
 
 # Check if we can see any dips in flux
 flux_diff = np.diff(flux)
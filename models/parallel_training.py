@@ -0,0 +1,386 @@
+# models/parallel_training.py - Parallel, out-of-core training of the XGBoost and CNN models
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.inference import DEFAULT_VIEW_LENGTH, FEATURE_NAMES
+
+# Rows per on-disk feature shard; shards are the unit streamed into both learners
+SHARD_ROWS = 4096
+# Percentage of targets (by stable hash of the target ID) held out for validation
+VALIDATION_PERCENT = 10
+# Trained models are written next to, not over, the artifacts ExoplanetClassifier.load_models()
+# reads (models/xgb_model.pkl, models/cnn_model.h5); promote them by copying once validated
+XGB_ARTIFACT = "models/parallel/xgb_booster.pkl"
+CNN_ARTIFACT = "models/parallel/cnn_model.h5"
+# Records the feature path the models were trained on (see utils.model_registry.MODEL_METADATA)
+METADATA_ARTIFACT = "models/parallel/model_metadata.json"
+# Feature path of the extracted shards, kept in the work directory
+EXTRACTION_FILE = "extraction.json"
+# Retraining targets the pipeline's own BLS features (utils.pipeline.FEATURE_PATHS)
+TRAINING_FEATURE_PATH = "pipeline"
+
+
+def load_labels(path):
+    """Read a labels CSV with ``target_id`` and ``label`` columns (e.g. from utils.synthetic)"""
+    with open(path, newline="", encoding="utf-8") as fh:
+        return {row["target_id"]: int(row["label"]) for row in csv.DictReader(fh)}
+
+
+def split_of(target_id, validation_percent=VALIDATION_PERCENT):
+    """Stable train/val assignment, so a target stays in its split across runs"""
+    return "val" if zlib.crc32(str(target_id).encode("utf-8")) % 100 < validation_percent else "train"
+
+
+def shard_paths(work_dir, split):
+    return sorted(glob.glob(os.path.join(work_dir, f"{split}-*.npz")))
+
+
+def _write_shard(work_dir, split, index, rows):
+    path = os.path.join(work_dir, f"{split}-{index:05d}.npz")
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path,
+             target_ids=np.array([row["target_id"] for row in rows]),
+             features=np.stack([row["_features"] for row in rows]).astype(np.float32),
+             views=np.stack([row["_view"] for row in rows]).astype(np.float32),
+             labels=np.array([row["label"] for row in rows], dtype=np.float32))
+    os.replace(tmp_path, path)
+    return path
+
+
+def shard_feature_path(work_dir):
+    """Feature path the shards in work_dir were extracted with (None before extraction)"""
+    try:
+        with open(os.path.join(work_dir, EXTRACTION_FILE), encoding="utf-8") as fh:
+            return json.load(fh)["feature_path"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def extracted_targets(work_dir):
+    """Target IDs already written to shards, for resuming an interrupted extraction"""
+    done = set()
+    for path in shard_paths(work_dir, "train") + shard_paths(work_dir, "val"):
+        with np.load(path) as data:
+            done.update(data["target_ids"].tolist())
+    return done
+
+
+def extract_features(targets, labels, work_dir, workers=None, view_length=DEFAULT_VIEW_LENGTH,
+                     shard_rows=SHARD_ROWS, validation_percent=VALIDATION_PERCENT, progress=None,
+                     feature_store=None, feature_path=TRAINING_FEATURE_PATH):
+    """
+    Extract training features over a process pool into on-disk shards.
+
+    Each worker runs the same preprocessing, BLS and view construction as
+    batch analysis (utils.batch.analyze_target). Finished rows are buffered
+    per split and written as ``<split>-NNNNN.npz`` shards of ``shard_rows``
+    rows (features, CNN views, labels, target IDs), so memory stays bounded
+    by the shard size however large the corpus. Targets already present in
+    shards are skipped, which makes extraction resumable.
+
+    Args:
+        targets (list): (target_id, path) pairs, e.g. from utils.batch.discover_inputs().
+        labels (dict): target_id -> 0/1; unlabelled targets are skipped.
+        work_dir (str): Shard directory.
+        progress (callable): Called with (done, total, row) after each target.
+        feature_store (str): SQLite feature store to reuse and record features in.
+        feature_path (str): Feature path to extract with; recorded in the
+            work directory, which can't mix paths.
+
+    Returns:
+        dict: Counts of extracted, skipped, unlabelled and failed targets.
+    """
+    from utils.batch import _init_worker, analyze_target
+    from utils.feature_store import FeatureStore
+
+    store = FeatureStore(feature_store) if feature_store else None
+    records = []
+    os.makedirs(work_dir, exist_ok=True)
+    existing = shard_feature_path(work_dir)
+    if existing not in (None, feature_path):
+        raise ValueError(f"Shards in {work_dir} were extracted with the {existing!r} feature path, "
+                         f"not {feature_path!r}")
+    with open(os.path.join(work_dir, EXTRACTION_FILE), "w", encoding="utf-8") as fh:
+        json.dump({"feature_path": feature_path}, fh)
+    done = extracted_targets(work_dir)
+    todo = [(tid, path) for tid, path in targets if tid in labels and tid not in done]
+    summary = {"extracted": 0, "skipped": sum(tid in done for tid, _ in targets),
+               "unlabelled": sum(tid not in labels for tid, _ in targets), "error": 0}
+    workers = workers or os.cpu_count() or 1
+    buffers = {"train": [], "val": []}
+    next_index = {split: len(shard_paths(work_dir, split)) for split in buffers}
+
+    def flush(split):
+        if store is not None:
+            store.put_many(records)
+            records.clear()
+        if buffers[split]:
+            _write_shard(work_dir, split, next_index[split], buffers[split])
+            next_index[split] += 1
+            buffers[split] = []
+
+    finished = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(view_length, feature_store, (), None, None, feature_path)) as pool:
+        pending = set()
+        queue = iter(todo)
+        while True:
+            for target_id, path in queue:
+                pending.add(pool.submit(analyze_target, target_id, path))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                row = future.result()
+                finished += 1
+                if "_record" in row:
+                    records.append(row.pop("_record"))
+                if row["status"] == "ok":
+                    row["label"] = labels[row["target_id"]]
+                    split = split_of(row["target_id"], validation_percent)
+                    buffers[split].append(row)
+                    summary["extracted"] += 1
+                    if len(buffers[split]) >= shard_rows:
+                        flush(split)
+                else:
+                    summary["error"] += 1
+                if progress:
+                    progress(finished, len(todo), row)
+    flush("train")
+    flush("val")
+    return summary
+
+
+def _shard_iterator(shards, cache_prefix=None):
+    """xgboost.DataIter feeding one shard at a time, so the DMatrix never needs every row in memory"""
+    import xgboost as xgb
+
+    class ShardIterator(xgb.DataIter):
+        def __init__(self):
+            self._position = 0
+            super().__init__(cache_prefix=cache_prefix)
+
+        def next(self, input_data):
+            if self._position == len(shards):
+                return 0
+            with np.load(shards[self._position]) as data:
+                input_data(data=data["features"], label=data["labels"], feature_names=list(FEATURE_NAMES))
+            self._position += 1
+            return 1
+
+        def reset(self):
+            self._position = 0
+
+    return ShardIterator()
+
+
+def train_xgboost(work_dir, output=XGB_ARTIFACT, rounds=300, threads=None, external_memory=False, params=None):
+    """
+    Train the XGBoost model from feature shards with every CPU core.
+
+    By default the shards are streamed into a QuantileDMatrix, which keeps
+    only the quantised feature matrix in memory; ``external_memory`` pages
+    that to a cache in ``work_dir`` as well.
+
+    Returns:
+        dict: Best iteration and validation metrics.
+    """
+    import joblib
+    import xgboost as xgb
+
+    threads = threads or os.cpu_count() or 1
+    train_shards, val_shards = shard_paths(work_dir, "train"), shard_paths(work_dir, "val")
+    if not train_shards:
+        raise ValueError(f"No training shards in {work_dir}; run feature extraction first")
+    if external_memory:
+        cache = os.path.join(work_dir, "xgb-cache")
+        dtrain = xgb.DMatrix(_shard_iterator(train_shards, cache + "-train"), nthread=threads)
+        dval = xgb.DMatrix(_shard_iterator(val_shards, cache + "-val"), nthread=threads) if val_shards else None
+    else:
+        dtrain = xgb.QuantileDMatrix(_shard_iterator(train_shards), nthread=threads)
+        dval = xgb.QuantileDMatrix(_shard_iterator(val_shards), ref=dtrain, nthread=threads) if val_shards else None
+
+    params = {
+        "objective": "binary:logistic", "eval_metric": ["logloss", "auc"], "tree_method": "hist",
+        "max_depth": 6, "eta": 0.1, "subsample": 0.8, "nthread": threads, **(params or {}),
+    }
+    evals = [(dtrain, "train")] + ([(dval, "val")] if dval is not None else [])
+    history = {}
+    booster = xgb.train(params, dtrain, num_boost_round=rounds, evals=evals, evals_result=history,
+                        early_stopping_rounds=20 if dval is not None else None, verbose_eval=False)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    joblib.dump(booster, output)
+    metrics = {name: values[-1] for name, values in history.get("val", history.get("train", {})).items()}
+    return {"artifact": output, "best_iteration": getattr(booster, "best_iteration", rounds - 1), **metrics}
+
+
+def view_dataset(shards, view_length, batch_size=256, shuffle_buffer=16384, readers=None, seed=0):
+    """
+    tf.data pipeline over the CNN views in feature shards.
+
+    Shards are read in parallel (``readers`` interleaved generators), rows
+    are shuffled through a bounded buffer, then batched and prefetched so
+    reading overlaps training.
+    """
+    import tensorflow as tf
+
+    def read_shard(path):
+        with np.load(path.decode("utf-8") if isinstance(path, bytes) else path) as data:
+            yield data["views"], data["labels"]
+
+    signature = (tf.TensorSpec((None, view_length), tf.float32), tf.TensorSpec((None,), tf.float32))
+    dataset = tf.data.Dataset.from_tensor_slices(shards)
+    if shuffle_buffer:
+        dataset = dataset.shuffle(len(shards), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.interleave(
+        lambda path: tf.data.Dataset.from_generator(read_shard, output_signature=signature, args=(path,)),
+        cycle_length=readers or os.cpu_count() or 1, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False,
+    ).unbatch()
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def build_cnn(view_length):
+    """1-D CNN over the phase-folded view; takes (batch, view_length) like utils.inference feeds it"""
+    import tensorflow as tf
+
+    layers = tf.keras.layers
+    model = tf.keras.Sequential([
+        layers.Input(shape=(view_length,)),
+        layers.Reshape((view_length, 1)),
+        layers.Conv1D(16, 5, activation="relu", padding="same"),
+        layers.MaxPooling1D(2),
+        layers.Conv1D(32, 5, activation="relu", padding="same"),
+        layers.MaxPooling1D(2),
+        layers.Conv1D(64, 5, activation="relu", padding="same"),
+        layers.GlobalAveragePooling1D(),
+        layers.Dense(32, activation="relu"),
+        layers.Dropout(0.2),
+        layers.Dense(1, activation="sigmoid"),
+    ])
+    model.compile(optimizer="adam", loss="binary_crossentropy",
+                  metrics=["accuracy", tf.keras.metrics.AUC(name="auc")])
+    return model
+
+
+def train_cnn(work_dir, output=CNN_ARTIFACT, epochs=5, batch_size=256, threads=None, view_length=None):
+    """
+    Train the CNN from streamed shards using every CPU core.
+
+    Returns:
+        dict: Final validation (or training) metrics.
+    """
+    import tensorflow as tf
+
+    threads = threads or os.cpu_count() or 1
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(max(2, threads // 2))
+
+    train_shards, val_shards = shard_paths(work_dir, "train"), shard_paths(work_dir, "val")
+    if not train_shards:
+        raise ValueError(f"No training shards in {work_dir}; run feature extraction first")
+    if view_length is None:
+        with np.load(train_shards[0]) as data:
+            view_length = data["views"].shape[1]
+
+    model = build_cnn(view_length)
+    train = view_dataset(train_shards, view_length, batch_size, readers=threads)
+    val = view_dataset(val_shards, view_length, batch_size, shuffle_buffer=0, readers=threads) if val_shards else None
+    callbacks = [tf.keras.callbacks.EarlyStopping(patience=2, restore_best_weights=True)] if val is not None else []
+    history = model.fit(train, validation_data=val, epochs=epochs, callbacks=callbacks, verbose=2)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    model.save(output)
+    metrics = {key: float(values[-1]) for key, values in history.history.items()}
+    return {"artifact": output, "epochs": len(history.history.get("loss", [])), **metrics}
+
+
+def main(argv=None):
+    """Extract features and train both models: python models/parallel_training.py INPUTS... --labels labels.csv"""
+    from utils.batch import discover_inputs
+
+    parser = argparse.ArgumentParser(description="Parallel, out-of-core training of the XGBoost and CNN models")
+    parser.add_argument("inputs", nargs="*", help="Directories, light curve stores, glob patterns or manifests")
+    parser.add_argument("--labels", help="CSV with target_id,label (default: labels.csv inside a store input)")
+    parser.add_argument("--work-dir", default="training_shards", help="Feature shard directory")
+    parser.add_argument("-j", "--workers", type=int, help="Extraction processes and learner threads (default: CPU count)")
+    parser.add_argument("--shard-rows", type=int, default=SHARD_ROWS)
+    parser.add_argument("--view-length", type=int, default=DEFAULT_VIEW_LENGTH)
+    parser.add_argument("--rounds", type=int, default=300, help="XGBoost boosting rounds")
+    parser.add_argument("--epochs", type=int, default=5, help="CNN epochs")
+    parser.add_argument("--batch-size", type=int, default=256, help="CNN batch size")
+    parser.add_argument("--external-memory", action="store_true", help="Page the XGBoost matrix to disk")
+    parser.add_argument("--skip-extract", action="store_true", help="Train on existing shards only")
+    parser.add_argument("--feature-store", help="SQLite feature store to reuse extracted features from")
+    parser.add_argument("--xgb-output", default=XGB_ARTIFACT, help=f"XGBoost model path (default: {XGB_ARTIFACT})")
+    parser.add_argument("--cnn-output", default=CNN_ARTIFACT, help=f"CNN model path (default: {CNN_ARTIFACT})")
+    parser.add_argument("--metadata-output", default=METADATA_ARTIFACT,
+                        help=f"Model metadata path (default: {METADATA_ARTIFACT})")
+    parser.add_argument("--feature-path", choices=("processor", "pipeline"), default=TRAINING_FEATURE_PATH,
+                        help=f"Features to train on (default: {TRAINING_FEATURE_PATH})")
+    parser.add_argument("--no-xgb", action="store_true")
+    parser.add_argument("--no-cnn", action="store_true")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    report = {}
+    if not args.skip_extract:
+        targets = []
+        for spec in args.inputs:
+            targets.extend(discover_inputs(spec))
+        labels_path = args.labels or next((os.path.join(spec, "labels.csv") for spec in args.inputs
+                                           if os.path.isfile(os.path.join(spec, "labels.csv"))), None)
+        if labels_path is None:
+            parser.error("--labels is required unless an input store contains labels.csv")
+
+        def progress(done, total, row):
+            if done % 1000 == 0 or done == total:
+                print(f"[{done}/{total}] features extracted", flush=True)
+
+        start = time.perf_counter()
+        report["extract"] = extract_features(targets, load_labels(labels_path), args.work_dir, args.workers,
+                                             args.view_length, args.shard_rows, progress=progress,
+                                             feature_store=args.feature_store, feature_path=args.feature_path)
+        report["extract"]["elapsed_s"] = round(time.perf_counter() - start, 2)
+        print(f"🧮 Features: {report['extract']}")
+
+    if not args.no_xgb:
+        start = time.perf_counter()
+        report["xgboost"] = train_xgboost(args.work_dir, args.xgb_output, rounds=args.rounds, threads=args.workers,
+                                          external_memory=args.external_memory)
+        report["xgboost"]["elapsed_s"] = round(time.perf_counter() - start, 2)
+        print(f"🌲 XGBoost: {report['xgboost']}")
+    if not args.no_cnn:
+        start = time.perf_counter()
+        report["cnn"] = train_cnn(args.work_dir, args.cnn_output, epochs=args.epochs, batch_size=args.batch_size,
+                                  threads=args.workers, view_length=args.view_length)
+        report["cnn"]["elapsed_s"] = round(time.perf_counter() - start, 2)
+        print(f"🧠 CNN: {report['cnn']}")
+
+    with open(os.path.join(args.work_dir, "training_report.json"), "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, default=float)
+    if not (args.no_xgb and args.no_cnn):
+        # Scoring callers extract features on the path recorded here (ModelRegistry.feature_path)
+        metadata = {"feature_path": shard_feature_path(args.work_dir) or args.feature_path,
+                    "view_length": args.view_length, "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        os.makedirs(os.path.dirname(args.metadata_output) or ".", exist_ok=True)
+        with open(args.metadata_output, "w", encoding="utf-8") as fh:
+            json.dump(metadata, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
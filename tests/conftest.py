@@ -0,0 +1,7 @@
+# tests/conftest.py - Make the repository's utils/ and models/ importable from the tests
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
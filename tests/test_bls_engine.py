@@ -0,0 +1,45 @@
+# tests/test_bls_engine.py - BLS engine against a reference implementation
+import numpy as np
+import pytest
+
+from utils.bls_engine import AdaptiveBLSEngine, BLSEngine
+from utils.synthetic import transit_model
+
+PERIOD, T0, DEPTH, DURATION = 3.3, 1.1, 2e-3, 0.12
+
+
+@pytest.fixture
+def transit_curve():
+    rng = np.random.default_rng(11)
+    time = np.arange(0.0, 27.0, 2 / 144)
+    flux = transit_model(time, PERIOD, T0, DEPTH, DURATION) + rng.normal(0.0, 5e-4, time.size)
+    return time, flux
+
+
+def test_engine_recovers_injected_transit(transit_curve):
+    features = BLSEngine().search(*transit_curve).best_features()
+    assert features["bls_period"] == pytest.approx(PERIOD, rel=2e-3)
+    assert features["bls_depth"] == pytest.approx(DEPTH, rel=0.25)
+    assert features["bls_snr"] > 10
+    phase = (features["bls_t0"] - T0 + PERIOD / 2) % PERIOD - PERIOD / 2
+    assert abs(phase) < DURATION / 2
+
+
+def test_adaptive_search_matches_exhaustive(transit_curve):
+    exhaustive = BLSEngine().search(*transit_curve)
+    adaptive = AdaptiveBLSEngine().search(*transit_curve)
+    assert adaptive.stats["evaluations"] < exhaustive.stats["evaluations"]
+    for name in ("bls_period", "bls_depth", "bls_snr"):
+        assert adaptive.best_features()[name] == pytest.approx(exhaustive.best_features()[name], rel=1e-3)
+
+
+def test_engine_matches_astropy_on_its_grid(transit_curve):
+    timeseries = pytest.importorskip("astropy.timeseries")
+    time, flux = transit_curve
+    engine = BLSEngine()
+    result = engine.search(time, flux)
+    reference = timeseries.BoxLeastSquares(time, flux).power(result.period, list(engine.durations),
+                                                             objective="snr")
+    best = int(np.argmax(reference.depth_snr))
+    assert result.period[result.best_index] == pytest.approx(reference.period[best], rel=1e-3)
+    assert result.depth[result.best_index] == pytest.approx(reference.depth[best], rel=0.1)
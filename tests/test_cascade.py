@@ -0,0 +1,30 @@
+# tests/test_cascade.py - Screening statistics of utils.cascade
+import numpy as np
+
+from utils.cascade import _deepest_events, screen_statistics
+
+
+def high_cadence_single_dip(rng):
+    """27 days at 20 s cadence with one deep 0.1-day dip"""
+    time = np.arange(0.0, 27.0, 20 / 86400)
+    flux = 1.0 + rng.normal(0.0, 1e-3, time.size)
+    flux[np.abs(time - 13.0) < 0.05] -= 5e-3
+    return time, flux
+
+
+def test_deepest_events_are_separate_dips_at_high_cadence():
+    rng = np.random.default_rng(1)
+    time = np.arange(0.0, 27.0, 20 / 86400)
+    box = rng.normal(0.0, 1e-4, time.size)
+    for center, depth in ((3.0, 3e-3), (10.0, 2e-3), (20.0, 1e-3)):
+        box -= depth * np.clip(1.0 - np.abs(time - center) / 0.1, 0.0, None)
+    events = _deepest_events(box, 0.1, time, 3)
+    assert np.allclose(time[events], [3.0, 10.0, 20.0], atol=0.01)
+    assert all(abs(time[i] - time[j]) > 0.1 for i in events for j in events if i != j)
+
+
+def test_stacked_statistic_averages_separate_events():
+    time, flux = high_cadence_single_dip(np.random.default_rng(2))
+    stats = screen_statistics(time, flux)
+    # One real dip plus two noise events: stacking must dilute it, not repeat it
+    assert stats["screen_stacked_snr"] < stats["screen_single_snr"]
@@ -0,0 +1,48 @@
+# tests/test_feature_store.py - Extractor versioning of utils.feature_store
+import importlib
+
+import pytest
+
+import utils.feature_store
+import utils.precision
+
+
+class DetrendOnlyProcessor:
+    """Processor without process_light_curve(): analyses use the pipeline path"""
+
+
+@pytest.fixture
+def reload_with_precision(monkeypatch):
+    """Reload the store with CELESTIAL_RESULT_PRECISION set, restoring the default afterwards"""
+    def reload(precision):
+        monkeypatch.setenv("CELESTIAL_RESULT_PRECISION", precision)
+        importlib.reload(utils.precision)
+        return importlib.reload(utils.feature_store)
+    yield reload
+    monkeypatch.delenv("CELESTIAL_RESULT_PRECISION")
+    importlib.reload(utils.precision)
+    importlib.reload(utils.feature_store)
+
+
+class LegacyProcessor:
+    """Processor with its own extraction, so either feature path applies"""
+
+    def process_light_curve(self, path):
+        return {"bls_features": {}}
+
+
+def test_extractor_version_covers_analysis_options():
+    processor = DetrendOnlyProcessor()
+    version = utils.feature_store.extractor_version(processor)
+    assert version == utils.feature_store.extractor_version(processor)
+    assert version != utils.feature_store.extractor_version(processor, max_planets=5)
+    legacy = LegacyProcessor()
+    assert (utils.feature_store.extractor_version(legacy, feature_path="processor")
+            != utils.feature_store.extractor_version(legacy, feature_path="pipeline"))
+
+
+def test_extractor_version_covers_result_precision(reload_with_precision):
+    processor = DetrendOnlyProcessor()
+    single = reload_with_precision("float32").extractor_version(processor)
+    double = reload_with_precision("float64").extractor_version(processor)
+    assert single != double
@@ -0,0 +1,55 @@
+# tests/test_job_queue.py - Back-pressure and per-session limits of utils.job_queue
+import threading
+
+import pytest
+
+from utils.job_queue import CANCELLED, DONE, AnalysisJobQueue, JobQueueFull
+
+
+@pytest.fixture
+def gate():
+    """Event that blocking jobs wait on; set on teardown so no worker stays stuck"""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def blocking(gate, value):
+    def run(report):
+        gate.wait(5)
+        return value
+    return run
+
+
+def test_new_key_supersedes_the_sessions_queued_job(gate):
+    queue = AnalysisJobQueue(workers=1, max_queued=4)
+    busy = queue.submit(blocking(gate, "busy"), key="busy", session="other")
+    first = queue.submit(blocking(gate, 1), key="a", session="s1")
+    second = queue.submit(blocking(gate, 2), key="b", session="s1")
+    assert queue.get(first).status == CANCELLED
+    gate.set()
+    assert queue.wait(second, timeout=5).result == 2
+    assert queue.wait(busy, timeout=5).status == DONE
+
+
+def test_running_job_keeps_running_but_stops_counting(gate):
+    queue = AnalysisJobQueue(workers=2, max_queued=0)
+    first = queue.submit(blocking(gate, 1), key="a", session="s1")
+    second = queue.submit(blocking(gate, 2), key="b", session="s1")
+    assert queue.get(first).sessions == set()
+    with pytest.raises(JobQueueFull):
+        queue.submit(blocking(gate, 3), key="c", session="s2")
+    gate.set()
+    assert queue.wait(first, timeout=5).result == 1
+    assert queue.wait(second, timeout=5).result == 2
+
+
+def test_shared_job_is_not_cancelled_for_its_other_sessions(gate):
+    queue = AnalysisJobQueue(workers=1, max_queued=4)
+    queue.submit(blocking(gate, "busy"), key="busy", session="other")
+    shared = queue.submit(blocking(gate, 1), key="a", session="s1")
+    assert queue.submit(blocking(gate, 1), key="a", session="s2") == shared
+    queue.submit(blocking(gate, 2), key="b", session="s1")
+    assert queue.get(shared).sessions == {"s2"}
+    gate.set()
+    assert queue.wait(shared, timeout=5).result == 1
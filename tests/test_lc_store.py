@@ -0,0 +1,31 @@
+# tests/test_lc_store.py - Binary light curve store in utils.lc_store
+import numpy as np
+
+from utils.lc_store import LightCurveStore, _safe_name
+
+# IDs that collapse to the same readable stem, including a case-only difference
+COLLIDING_IDS = ("TIC 1", "TIC_1", "TIC/1", "TIC:1", "tic 1")
+
+
+def test_safe_name_keeps_colliding_ids_apart():
+    names = [_safe_name(target_id) for target_id in COLLIDING_IDS]
+    assert len({name.lower() for name in names}) == len(COLLIDING_IDS)
+    assert all("/" not in name and ":" not in name for name in names)
+    assert _safe_name("TIC 1") == _safe_name("TIC 1")
+
+
+def test_colliding_ids_keep_their_own_curves(tmp_path):
+    store = LightCurveStore(str(tmp_path))
+    time = np.linspace(0.0, 1.0, 50)
+    for i, target_id in enumerate(COLLIDING_IDS):
+        store.put(target_id, time, np.full(50, float(i)))
+    store.put("TIC 1", time, np.full(50, 9.0))  # replacing one must not touch the others
+
+    reopened = LightCurveStore(str(tmp_path))
+    assert sorted(reopened.targets()) == sorted(COLLIDING_IDS)
+    for i, target_id in enumerate(COLLIDING_IDS):
+        _, flux = reopened.get(target_id)
+        assert flux[0] == (9.0 if target_id == "TIC 1" else float(i))
+    reopened.delete("TIC_1")
+    assert reopened.get("TIC/1")[1][0] == 2.0
+    assert len(list(tmp_path.glob("*.npy"))) == len(COLLIDING_IDS) - 1
@@ -0,0 +1,38 @@
+# tests/test_light_curve_io.py - Light curve readers of utils.light_curve_io
+import numpy as np
+import pytest
+
+from utils.light_curve_io import LightCurveTooLarge, read_light_curve
+
+
+@pytest.fixture
+def fits_path(tmp_path):
+    fits = pytest.importorskip("astropy.io.fits")
+    time = np.linspace(1000.0, 1027.0, 1000)
+    flux = np.ones_like(time)
+    quality = np.zeros(len(time), dtype=np.int32)
+    quality[:10] = 1  # attitude tweak, in the TESS default bitmask
+    table = fits.BinTableHDU.from_columns([
+        fits.Column(name="TIME", format="D", array=time),
+        fits.Column(name="PDCSAP_FLUX", format="E", array=flux),
+        fits.Column(name="QUALITY", format="J", array=quality),
+    ])
+    primary = fits.PrimaryHDU()
+    primary.header["TELESCOP"] = "TESS"
+    path = tmp_path / "lc.fits"
+    fits.HDUList([primary, table]).writeto(path)
+    return path
+
+
+def test_fits_drops_flagged_cadences(fits_path):
+    time, flux = read_light_curve(str(fits_path))
+    assert len(time) == len(flux) == 990
+    assert time.dtype == flux.dtype == np.float64
+
+
+def test_fits_respects_the_ingest_ceiling(fits_path):
+    with pytest.raises(LightCurveTooLarge):
+        read_light_curve(str(fits_path), max_bytes=1000 * 16 - 1)
+    with pytest.raises(LightCurveTooLarge):
+        read_light_curve(fits_path.read_bytes(), max_bytes=1024)
+    assert len(read_light_curve(str(fits_path), max_bytes=1000 * 16)[0]) == 990
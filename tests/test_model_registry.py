@@ -0,0 +1,66 @@
+# tests/test_model_registry.py - Model loading and reloading in utils.model_registry
+import json
+import sys
+import types
+
+import pytest
+
+import utils.model_registry as model_registry
+
+
+class FlakyClassifier:
+    """Stand-in ExoplanetClassifier whose load_models() fails while ``failing`` is set"""
+
+    failing = True
+    loads = 0
+
+    def load_models(self):
+        FlakyClassifier.loads += 1
+        if FlakyClassifier.failing:
+            raise FileNotFoundError("models/xgb_model.pkl")
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    module = types.ModuleType("models.train_models")
+    module.ExoplanetClassifier = FlakyClassifier
+    monkeypatch.setitem(sys.modules, "models.train_models", module)
+    monkeypatch.setattr(FlakyClassifier, "failing", True)
+    monkeypatch.setattr(FlakyClassifier, "loads", 0)
+    clock = [1000.0]
+    monkeypatch.setattr(model_registry.time, "monotonic", lambda: clock[0])
+    artifact = tmp_path / "xgb_model.pkl"
+    artifact.write_bytes(b"model")
+    metadata = tmp_path / "model_metadata.json"
+    metadata.write_text(json.dumps({"feature_path": "pipeline"}))
+    registry = model_registry.ModelRegistry(artifacts=(str(artifact),), metadata=str(metadata))
+    registry.clock = clock
+    return registry
+
+
+def test_failed_load_is_retried_with_backoff(registry):
+    registry.get_classifier()
+    assert not registry.models_loaded and registry.feature_path is None
+    registry.get_classifier()
+    assert FlakyClassifier.loads == 1  # still inside the backoff window
+    registry.clock[0] += model_registry.LOAD_RETRY_DELAY
+    registry.get_classifier()
+    assert FlakyClassifier.loads == 2 and registry.stats()["failures"] == 2
+    FlakyClassifier.failing = False
+    registry.clock[0] += 2 * model_registry.LOAD_RETRY_DELAY
+    registry.get_classifier()
+    assert registry.models_loaded and registry.feature_path == "pipeline"
+    assert registry.stats()["error"] is None
+    registry.get_classifier()
+    assert FlakyClassifier.loads == 3
+
+
+def test_failed_reload_keeps_serving_loaded_models(registry):
+    FlakyClassifier.failing = False
+    loaded = registry.get_classifier()
+    FlakyClassifier.failing = True
+    with open(registry.artifacts[0], "ab") as fh:
+        fh.write(b" v2")
+    assert registry.get_classifier() is loaded
+    assert FlakyClassifier.loads == 2
+    assert registry.models_loaded and registry.stats()["error"]
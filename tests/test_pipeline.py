@@ -0,0 +1,52 @@
+# tests/test_pipeline.py - Feature extraction paths of utils.pipeline
+import numpy as np
+import pytest
+
+from create_sample_data import create_professional_non_transit, create_professional_transit
+from utils.pipeline import feature_parity, process_light_curve_arrays, resolve_feature_path
+
+
+class DetrendOnlyProcessor:
+    """Processor without process_light_curve(): analyses fall back to the pipeline path"""
+
+
+class RecordingProcessor:
+    """Processor whose original extraction returns fixed features"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def process_light_curve(self, path):
+        self.calls += 1
+        return {"bls_features": {"bls_period": 4.23, "bls_depth": 0.02, "bls_snr": 20.0, "bls_power": 30.0}}
+
+
+def test_processor_path_is_the_default():
+    processor = RecordingProcessor()
+    assert resolve_feature_path(processor) == "processor"
+    assert resolve_feature_path(DetrendOnlyProcessor()) == "pipeline"
+    with pytest.raises(ValueError):
+        resolve_feature_path(processor, "astropy")
+
+
+def test_processor_path_reports_the_processor_features():
+    np.random.seed(0)
+    time, flux = create_professional_transit(marker=False)
+    processor = RecordingProcessor()
+    result = process_light_curve_arrays(processor, time, flux)
+    assert processor.calls == 1
+    assert result["feature_path"] == "processor"
+    assert result["bls_features"]["bls_period"] == 4.23
+    assert result["transit_detected"]
+
+
+@pytest.mark.parametrize("make, detected", [(create_professional_transit, True),
+                                            (create_professional_non_transit, False)])
+def test_feature_parity_with_light_curve_processor(make, detected):
+    """The pipeline's BLS must match the processor's extraction before models are trained on it"""
+    feature_extractor = pytest.importorskip("utils.feature_extractor")
+    np.random.seed(0)
+    time, flux = make(marker=False)
+    report = feature_parity(feature_extractor.LightCurveProcessor(), time, flux)
+    assert report["detected"]["processor"] == detected
+    assert report["match"], report
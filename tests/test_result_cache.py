@@ -0,0 +1,68 @@
+# tests/test_result_cache.py - Result cache keys of utils.result_cache
+import importlib
+import io
+
+import numpy as np
+
+import utils.precision
+import utils.result_cache
+from utils.light_curve_io import source_blocks
+from utils.result_cache import result_cache_key
+
+
+class DetrendOnlyProcessor:
+    """Processor without process_light_curve(): analyses use the pipeline path"""
+
+
+class LegacyProcessor:
+    """Processor with its own extraction, so either feature path applies"""
+
+    def __init__(self, window=0.5):
+        self.window = window
+
+    def process_light_curve(self, path):
+        return {"bls_features": {}}
+
+
+def test_key_covers_analysis_options():
+    data = b"time,flux\n0,1\n"
+    processor = LegacyProcessor()
+    keys = {
+        result_cache_key(data, processor),
+        result_cache_key(data, processor, max_planets=3),
+        result_cache_key(data, processor, feature_path="pipeline"),
+        result_cache_key(data, LegacyProcessor(window=1.0)),
+        result_cache_key(data + b"1,1\n", processor),
+    }
+    assert len(keys) == 5
+    assert result_cache_key(data, processor) == result_cache_key(data, LegacyProcessor(), feature_path="processor")
+    # Without an extraction of its own a processor always takes the pipeline path
+    assert result_cache_key(data, DetrendOnlyProcessor()) == result_cache_key(data, DetrendOnlyProcessor(),
+                                                                              feature_path="pipeline")
+
+
+def test_key_covers_result_precision(monkeypatch):
+    data = b"time,flux\n0,1\n"
+    keys = []
+    for precision in ("float32", "float64"):
+        monkeypatch.setenv("CELESTIAL_RESULT_PRECISION", precision)
+        importlib.reload(utils.precision)
+        keys.append(importlib.reload(utils.result_cache).result_cache_key(data, DetrendOnlyProcessor()))
+    monkeypatch.delenv("CELESTIAL_RESULT_PRECISION")
+    importlib.reload(utils.precision)
+    importlib.reload(utils.result_cache)
+    assert keys[0] != keys[1]
+
+
+def test_streamed_sources_hash_like_their_bytes(tmp_path):
+    processor = DetrendOnlyProcessor()
+    data = np.random.default_rng(0).normal(size=5000).tobytes()
+    path = tmp_path / "curve.csv"
+    path.write_bytes(data)
+    expected = result_cache_key(data, processor)
+    assert len(list(source_blocks(str(path), block_size=4096))) == -(-len(data) // 4096)
+    assert result_cache_key(source_blocks(str(path), block_size=4096), processor) == expected
+    assert result_cache_key(source_blocks(io.BytesIO(data)), processor) == expected
+    stream = io.BufferedReader(io.BytesIO(data))
+    assert result_cache_key(source_blocks(stream, block_size=4096), processor) == expected
+    assert stream.tell() == 0
@@ -0,0 +1,421 @@
+# utils/batch.py - Batch analysis of many light curves over a process pool
+import csv
+import glob
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from utils.inference import FEATURE_NAMES
+
+RESULT_COLUMNS = (
+    ("target_id", "path", "status", "error", "n_points", "transit_detected")
+    + FEATURE_NAMES
+    + ("bls_duration", "bls_t0", "xgb_proba", "cnn_proba", "ensemble_proba", "elapsed_s",
+       "cascade_stage", "screen_snr", "n_candidates", "candidate_periods")
+)
+
+
+def discover_inputs(spec):
+    """
+    Expand a directory, glob pattern or manifest into (target_id, path) pairs.
+
+    Directories contribute their *.csv and *.fits light curves, or every
+    target of a binary light curve store (see utils.lc_store).
+
+    Manifests are .txt files with one path per line, or .csv files with a
+    ``path`` column and an optional ``target_id`` column.
+    """
+    if os.path.isdir(spec):
+        from utils.lc_store import LightCurveStore
+
+        if LightCurveStore.is_store(spec):
+            store = LightCurveStore(spec)
+            return [(target_id, store.path(target_id)) for target_id in store.targets()]
+        paths = sorted(p for pattern in ("*.csv", "*.fits") for p in glob.glob(os.path.join(spec, pattern)))
+        return [(os.path.splitext(os.path.basename(p))[0], p) for p in paths]
+
+    if os.path.isfile(spec) and spec.endswith((".txt", ".lst")):
+        base = os.path.dirname(spec)
+        with open(spec, encoding="utf-8") as fh:
+            lines = [line.strip() for line in fh if line.strip() and not line.startswith("#")]
+        paths = [line if os.path.isabs(line) else os.path.join(base, line) for line in lines]
+        return [(os.path.splitext(os.path.basename(p))[0], p) for p in paths]
+
+    if os.path.isfile(spec) and spec.endswith(".csv"):
+        with open(spec, newline="", encoding="utf-8") as fh:
+            header = fh.readline()
+            fh.seek(0)
+            if "path" in [name.strip() for name in header.split(",")]:
+                base = os.path.dirname(spec)
+                targets = []
+                for row in csv.DictReader(fh):
+                    path = row["path"] if os.path.isabs(row["path"]) else os.path.join(base, row["path"])
+                    targets.append((row.get("target_id") or os.path.splitext(os.path.basename(path))[0], path))
+                return targets
+        return [(os.path.splitext(os.path.basename(spec))[0], spec)]
+
+    paths = sorted(glob.glob(spec, recursive=True))
+    return [(os.path.splitext(os.path.basename(p))[0], p) for p in paths]
+
+
+class CsvResultWriter:
+    """Appends one CSV row per finished target, flushing as it goes"""
+
+    def __init__(self, path):
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        fieldnames = RESULT_COLUMNS
+        if not new_file:
+            # Keep appending in the existing file's column order
+            with open(path, newline="", encoding="utf-8") as fh:
+                fieldnames = next(csv.reader(fh), None) or RESULT_COLUMNS
+        self._fh = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._fh, fieldnames=fieldnames, extrasaction="ignore")
+        if new_file:
+            self._writer.writeheader()
+            self._fh.flush()
+
+    @staticmethod
+    def completed_targets(path):
+        if not os.path.exists(path):
+            return set()
+        with open(path, newline="", encoding="utf-8") as fh:
+            return {row["target_id"] for row in csv.DictReader(fh) if row.get("status") == "ok"}
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+class ParquetResultWriter:
+    """Writes results as a directory of Parquet parts, one part per flushed batch"""
+
+    def __init__(self, path, rows_per_part=256):
+        import pyarrow  # noqa: F401 - fail early if the optional dependency is missing
+
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self._rows = []
+        os.makedirs(path, exist_ok=True)
+        self._part = len(glob.glob(os.path.join(path, "part-*.parquet")))
+
+    @staticmethod
+    def completed_targets(path):
+        parts = sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+        if not parts:
+            return set()
+        import pyarrow.parquet as pq
+
+        done = set()
+        for part in parts:
+            table = pq.read_table(part, columns=["target_id", "status"])
+            for target_id, status in zip(table["target_id"].to_pylist(), table["status"].to_pylist()):
+                if status == "ok":
+                    done.add(target_id)
+        return done
+
+    def write(self, row):
+        self._rows.append({name: row.get(name) for name in RESULT_COLUMNS})
+        if len(self._rows) >= self.rows_per_part:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pylist(self._rows)
+        final = os.path.join(self.path, f"part-{self._part:05d}.parquet")
+        pq.write_table(table, final + ".tmp")
+        os.replace(final + ".tmp", final)
+        self._part += 1
+        self._rows = []
+
+    def close(self):
+        self.flush()
+
+
+def open_writer(path, fmt=None):
+    """Pick a result writer from an explicit format or the output extension"""
+    fmt = fmt or ("parquet" if path.endswith(".parquet") else "csv")
+    if fmt == "parquet":
+        return ParquetResultWriter
+    if fmt == "csv":
+        return CsvResultWriter
+    raise ValueError(f"Unsupported output format: {fmt}")
+
+
+# Per-process state for pool workers
+_worker = {}
+
+
+def _init_worker(view_length, feature_store=None, cascade=(), screen_threshold=None, max_planets=None,
+                 feature_path=None):
+    """Build one processor (and feature store connection) per worker process"""
+    from utils.feature_extractor import LightCurveProcessor
+
+    _worker["processor"] = LightCurveProcessor()
+    _worker["view_length"] = view_length
+    _worker["max_planets"] = max_planets
+    _worker["feature_path"] = feature_path
+    _worker["cascade"] = tuple(cascade or ())
+    _worker["screen_threshold"] = screen_threshold
+    _worker["feature_store"] = None
+    if feature_store:
+        from utils.feature_store import FeatureStore, extractor_version
+
+        _worker["feature_store"] = FeatureStore(feature_store)
+        _worker["extractor_version"] = extractor_version(_worker["processor"], max_planets, feature_path)
+
+
+def _stored_features(target_id, path):
+    """Return (input hash, stored record or None) for a target"""
+    from utils.model_registry import file_sha256
+
+    input_hash = file_sha256(path)
+    record = _worker["feature_store"].get(target_id, input_hash, _worker["extractor_version"])
+    view_length = _worker.get("view_length")
+    if record is not None and view_length and record["view_length"] != view_length:
+        record = None  # stored without a view of the length the CNN needs
+    return input_hash, record
+
+
+def analyze_target(target_id, path):
+    """
+    Process one light curve, returning a flat result row.
+
+    When scoring is enabled the row also carries the model inputs under
+    ``_features``/``_view``; the parent scores rows in batches. With a
+    feature store, targets already stored for the same input hash and
+    extractor version skip processing entirely; newly extracted features
+    travel back under ``_record`` for the parent to bulk-write.
+
+    With cascade gates (see utils.cascade) the curve stops at the first
+    gate it fails: "screen" skips preprocessing and BLS for curves with a
+    weak box-filter statistic, "bls" skips scoring when no transit is
+    detected. ``cascade_stage`` names the last stage reached and
+    ``_cascade`` carries (stage, passed, seconds) entries for the parent.
+    ``n_points`` always counts the cleaned cadences, so it is left empty
+    for curves stopped by the screen, which are never cleaned.
+
+    ``n_candidates`` and ``candidate_periods`` (semicolon separated, in
+    days) list the signals found, several with ``max_planets`` above 1;
+    the feature store keeps only the strongest, so rows it serves leave
+    them empty.
+    """
+    from utils.feature_store import BLS_COLUMNS, feature_record, record_view
+    from utils.inference import feature_vector, light_curve_view
+    from utils.light_curve_io import read_light_curve
+    from utils.pipeline import EMPTY_BLS_FEATURES, process_light_curve_source
+    from utils.precision import absolute_time
+
+    start = time.perf_counter()
+    row = {"target_id": target_id, "path": path}
+    view_length = _worker.get("view_length")
+    gates = _worker.get("cascade", ())
+    stages = row["_cascade"] = []
+    try:
+        input_hash = record = view = None
+        if _worker.get("feature_store") is not None:
+            input_hash, record = _stored_features(target_id, path)
+        source = path
+        if record is None and "screen" in gates:
+            from utils.cascade import screen_statistics
+
+            source = read_light_curve(path)
+            screened = time.perf_counter()
+            screen_snr = screen_statistics(*source)["screen_snr"]
+            passed = screen_snr >= _worker["screen_threshold"]
+            stages.append(("screen", passed, time.perf_counter() - screened))
+            row["screen_snr"] = round(screen_snr, 4)
+            if not passed:
+                row.update(EMPTY_BLS_FEATURES, n_points=None, transit_detected=False,
+                           cascade_stage="screen", status="ok")
+                row["elapsed_s"] = round(time.perf_counter() - start, 4)
+                return row
+        if record is not None:
+            bls_features = {name: record[name] for name in BLS_COLUMNS}
+            row["n_points"] = int(record["n_valid"])
+            row["transit_detected"] = bool(record["transit_detected"])
+            view = record_view(record)
+            row["_cached"] = True
+        else:
+            analyzed = time.perf_counter()
+            result = process_light_curve_source(_worker["processor"], source, max_planets=_worker.get("max_planets"),
+                                                feature_path=_worker.get("feature_path"))
+            bls_features = result["bls_features"]
+            row["n_candidates"] = len(result["candidates"])
+            row["candidate_periods"] = ";".join(f"{c['bls_period']:.6f}" for c in result["candidates"])
+            row["n_points"] = len(result["time"])
+            row["transit_detected"] = bool(result["transit_detected"])
+            if view_length:
+                view = light_curve_view(absolute_time(result), result["flux"], bls_features["bls_period"],
+                                        bls_features.get("bls_t0", 0.0), view_length)
+            if input_hash is not None:
+                row["_record"] = feature_record(target_id, input_hash, _worker["extractor_version"], result, view)
+            if gates:
+                # Without the "bls" gate every analyzed curve goes on to scoring
+                passed = row["transit_detected"] or "bls" not in gates
+                stages.append(("bls", passed, time.perf_counter() - analyzed))
+        row.update(bls_features)
+        row["cascade_stage"] = "bls" if gates else None
+        if view_length and ("bls" not in gates or row["transit_detected"]):
+            row["_features"] = feature_vector(bls_features)
+            row["_view"] = view
+            row["cascade_stage"] = "classify" if gates else None
+        row["status"] = "ok"
+    except Exception as e:
+        row["status"] = "error"
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["elapsed_s"] = round(time.perf_counter() - start, 4)
+    return row
+
+
+def _score_rows(classifier, rows):
+    """Score buffered rows with one predict_batch call"""
+    from utils.inference import predict_batch
+
+    from utils.instrumentation import PipelineProfile, get_metrics
+
+    scored = [row for row in rows if "_features" in row]
+    if classifier is not None and scored:
+        profile = PipelineProfile()
+        start = time.perf_counter()
+        xgb, cnn, ensemble = predict_batch(classifier, np.stack([row["_features"] for row in scored]),
+                                           np.stack([row["_view"] for row in scored]), profile=profile)
+        per_row = (time.perf_counter() - start) / len(scored)
+        get_metrics().observe(profile, batch_size=len(scored))
+        for i, row in enumerate(scored):
+            row["xgb_proba"], row["cnn_proba"], row["ensemble_proba"] = float(xgb[i]), float(cnn[i]), float(ensemble[i])
+            if row.get("cascade_stage") == "classify":
+                row["_cascade"].append(("classify", True, per_row))
+    for row in scored:
+        del row["_features"], row["_view"]
+
+
+def run_batch(targets, output, fmt=None, workers=None, max_pending=None, classify=True, resume=True,
+              progress=None, score_batch_size=64, feature_store=None, cascade=None, screen_threshold=None,
+              max_planets=None):
+    """
+    Analyze targets over a process pool, streaming rows as targets finish.
+
+    Args:
+        targets (list): (target_id, path) pairs, e.g. from discover_inputs().
+        output (str): CSV file or Parquet directory to write/append to.
+        fmt (str): "csv" or "parquet"; inferred from ``output`` when None.
+        workers (int): Worker processes (defaults to the CPU count).
+        max_pending (int): Cap on submitted-but-unfinished targets, which
+            bounds memory no matter how many targets are queued.
+        classify (bool): Score each curve with the XGBoost/CNN models.
+        resume (bool): Skip targets already written with status "ok".
+        progress (callable): Called with (done, total, row) after each target.
+        score_batch_size (int): Finished targets scored per predict_batch call;
+            without scoring, rows are written as soon as they finish.
+        feature_store (str): SQLite feature store path (see utils.feature_store);
+            stored features are reused and new ones are written back.
+        cascade (tuple): Early-exit gates to apply, a subset of
+            utils.cascade.STAGES such as ("screen", "bls").
+        screen_threshold (float): Screen statistic a curve needs to reach
+            BLS (defaults to utils.cascade.SCREEN_THRESHOLD).
+        max_planets (int): Signals to search for per curve (defaults to
+            CELESTIAL_MAX_PLANETS); above 1 runs the multi-planet search.
+
+    Returns:
+        dict: Counts of processed, skipped and failed targets, of targets
+        served from the feature store and, with a cascade, the per-stage
+        report from utils.cascade.CascadeStats.
+    """
+    cascade_stats = None
+    if cascade:
+        from utils.cascade import SCREEN_THRESHOLD, STAGES, CascadeStats
+
+        cascade = tuple(cascade)
+        unknown = set(cascade) - set(STAGES[:-1])
+        if unknown:
+            raise ValueError(f"Unknown cascade gates {sorted(unknown)}; expected a subset of {STAGES[:-1]}")
+        screen_threshold = SCREEN_THRESHOLD if screen_threshold is None else screen_threshold
+        cascade_stats = CascadeStats()
+
+    writer_cls = open_writer(output, fmt)
+    done = writer_cls.completed_targets(output) if resume else set()
+    todo = [(tid, path) for tid, path in targets if tid not in done]
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+
+    classifier = view_length = feature_path = None
+    if classify:
+        from utils.inference import cnn_view_length
+        from utils.model_registry import get_model_registry
+
+        registry = get_model_registry()
+        classifier = registry.get_classifier()
+        view_length = cnn_view_length(classifier)
+        feature_path = registry.feature_path  # extract features the way the models were trained
+
+    store = None
+    if feature_store:
+        from utils.feature_store import FeatureStore
+
+        store = FeatureStore(feature_store)
+
+    writer = writer_cls(output)
+    summary = {"total": len(targets), "skipped": len(targets) - len(todo), "ok": 0, "error": 0, "from_store": 0}
+    buffered = []
+    finished = 0
+
+    def store_records(rows):
+        records = [row.pop("_record") for row in rows if "_record" in row]
+        if store is not None and records:
+            store.put_many(records)
+
+    def flush():
+        nonlocal finished
+        summary["from_store"] += sum(bool(row.pop("_cached", False)) for row in buffered)
+        _score_rows(classifier, buffered)
+        while buffered:
+            row = buffered.pop(0)  # popped first so an interrupted flush never writes a row twice
+            stages = row.pop("_cascade", ())
+            if cascade_stats is not None:
+                for stage in stages:
+                    cascade_stats.record(*stage)
+            writer.write(row)
+            summary[row["status"]] += 1
+            finished += 1
+            if progress:
+                progress(finished, len(todo), row)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(view_length, feature_store, cascade, screen_threshold, max_planets,
+                                           feature_path)) as pool:
+            pending = set()
+            queue = iter(todo)
+            while True:
+                for target_id, path in queue:
+                    pending.add(pool.submit(analyze_target, target_id, path))
+                    if len(pending) >= max_pending:
+                        break
+                if not pending:
+                    break
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                rows = [future.result() for future in completed]
+                # Persist features as targets finish rather than with the scored batch
+                store_records(rows)
+                buffered.extend(rows)
+                if classifier is None or len(buffered) >= score_batch_size:
+                    flush()
+    finally:
+        # Finished rows are written (and resumable) even if the run is interrupted
+        try:
+            flush()
+        finally:
+            writer.close()
+    if cascade_stats is not None:
+        summary["cascade"] = cascade_stats.report()
+    return summary
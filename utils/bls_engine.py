@@ -0,0 +1,576 @@
+# utils/bls_engine.py - Vectorized Box Least Squares period search
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Trial transit durations in days
+BLS_DURATIONS = (0.04, 0.08, 0.12, 0.16, 0.2)
+MIN_PERIOD = 0.5
+# Upper bound on trial periods; sentinel timestamps can inflate the baseline
+MAX_GRID_PERIODS = 50000
+
+# "adaptive" (coarse-to-fine, AdaptiveBLSEngine) or "exhaustive" (full grid, BLSEngine)
+BLS_SEARCH = os.environ.get("CELESTIAL_BLS_SEARCH", "adaptive")
+# Coarse pass: transit-time drift allowed across the baseline, in shortest durations
+COARSE_DRIFT = 0.5
+COARSE_OVERSAMPLE = 3
+# Coarse peaks re-searched at full resolution
+REFINE_TOP_K = 5
+# Skip refinement when the best coarse SNR is below this; coarse SNRs run within ~1 of the
+# refined value, so this sits well under the pipeline's detection threshold of 7.1
+REFINE_MIN_SNR = 5.0
+# Signals sought per light curve by the pipeline; above 1 enables the iterative multi-planet search
+MAX_PLANETS = int(os.environ.get("CELESTIAL_MAX_PLANETS", "1"))
+# Most signals a single request (API, app or batch) may ask for; each costs another search pass
+MAX_PLANETS_LIMIT = 8
+# Width masked around each found transit, in transit durations
+MASK_FACTOR = 1.5
+# Folded grids kept per light curve between iterative-search passes
+FOLD_CACHE_BYTES = 128 * 1024 * 1024
+
+
+def _tiled(prepared, key, m):
+    """Return prepared[key] repeated m times, reusing the largest tiling built so far"""
+    cache = prepared.setdefault("_tiled", {})
+    tiled = cache.get(key)
+    size = m * len(prepared[key])
+    if tiled is None or len(tiled) < size:
+        tiled = cache[key] = np.tile(prepared[key], m)
+    return tiled[:size]
+
+
+def in_transit(time, period, t0, width):
+    """Mask of samples within width / 2 of a transit center"""
+    return np.abs(np.mod(time - t0 + 0.5 * period, period) - 0.5 * period) < 0.5 * width
+
+
+class BLSResult:
+    """Per-period BLS statistics plus the best-scoring model"""
+
+    def __init__(self, period, power, depth, depth_snr, duration, transit_time, evaluations=None, stats=None):
+        self.period = period
+        self.power = power
+        self.depth = depth
+        self.depth_snr = depth_snr
+        self.duration = duration
+        self.transit_time = transit_time
+        # (period, duration) trials scored to produce this result
+        self.evaluations = len(period) if evaluations is None else evaluations
+        self.stats = dict(stats or {}, evaluations=self.evaluations, periods=len(period))
+
+    @property
+    def best_index(self):
+        return int(np.argmax(self.power)) if len(self.power) else -1
+
+    def best_features(self):
+        """Return the strongest peak as bls_* features (zeros if no valid model)"""
+        best = self.best_index
+        if best < 0 or not np.isfinite(self.power[best]) or self.power[best] <= 0:
+            return {
+                "bls_period": 0.0, "bls_depth": 0.0, "bls_snr": 0.0,
+                "bls_power": 0.0, "bls_duration": 0.0, "bls_t0": 0.0,
+            }
+        return {
+            "bls_period": float(self.period[best]),
+            "bls_depth": float(self.depth[best]),
+            "bls_snr": float(self.depth_snr[best]),
+            "bls_power": float(self.power[best]),
+            "bls_duration": float(self.duration[best]),
+            "bls_t0": float(self.transit_time[best]),
+        }
+
+
+class BLSEngine:
+    """
+    Box Least Squares search evaluated with NumPy over whole period blocks.
+
+    The light curve is first binned in time (bins a fraction of the phase
+    resolution wide), then every period in a block is phase-folded at once
+    with ``np.bincount`` and all box positions and durations are scored from
+    cumulative sums. The objective matches astropy's ``likelihood`` BLS with
+    uniform uncertainties equal to the flux standard deviation.
+
+    Args:
+        durations (tuple): Trial transit durations in days.
+        min_period (float): Shortest trial period in days.
+        max_period (float): Longest trial period; defaults to half the baseline.
+        frequency_factor (float): Frequency spacing multiplier; smaller is denser.
+        oversample (int): Phase bins per shortest duration.
+        time_bin_fraction (float): Time pre-binning width as a fraction of a
+            phase bin; 0 disables pre-binning.
+        max_periods (int): Cap on the number of trial periods.
+        n_workers (int): Threads used to shard the period grid.
+        chunk_elements (int): Upper bound on folded elements per block.
+    """
+
+    def __init__(self, durations=BLS_DURATIONS, min_period=MIN_PERIOD, max_period=None,
+                 frequency_factor=1.0, oversample=10, time_bin_fraction=1.0,
+                 max_periods=MAX_GRID_PERIODS, n_workers=None, chunk_elements=262_144):
+        self.durations = tuple(durations)
+        self.min_period = min_period
+        self.max_period = max_period
+        self.frequency_factor = frequency_factor
+        self.oversample = oversample
+        self.time_bin_fraction = time_bin_fraction
+        self.max_periods = max_periods
+        self.n_workers = n_workers if n_workers is not None else min(4, os.cpu_count() or 1)
+        self.chunk_elements = chunk_elements
+
+    def usable_durations(self, baseline):
+        return tuple(d for d in self.durations if d < baseline / 3)
+
+    def bin_duration(self, durations):
+        return min(durations) / self.oversample
+
+    def period_grid(self, time, durations=None):
+        """Trial periods uniformly spaced in frequency (astropy autoperiod heuristic)"""
+        return self.baseline_period_grid(float(np.max(time) - np.min(time)), durations)
+
+    def baseline_period_grid(self, baseline, durations=None):
+        """Period grid for a light curve spanning ``baseline`` days"""
+        durations = durations or self.usable_durations(baseline)
+        max_period = self.max_period or baseline / 2
+        if not durations or max_period <= self.min_period:
+            return np.empty(0)
+        f_min, f_max = 1.0 / max_period, 1.0 / self.min_period
+        df = self.frequency_factor * min(durations) / baseline ** 2
+        n_freq = int(math.ceil((f_max - f_min) / df)) + 1
+        n_freq = min(n_freq, self.max_periods)
+        return np.sort(1.0 / np.linspace(f_min, f_max, n_freq))
+
+    def prepare(self, time, flux, durations):
+        """Center the flux and merge samples that share a time bin"""
+        time = np.asarray(time, dtype=np.float64)
+        flux = np.asarray(flux, dtype=np.float64)
+        t_ref = float(time.min())
+        y = flux - flux.mean()
+        sigma2 = float(np.var(y)) or 1.0
+        width = self.bin_duration(durations) * self.time_bin_fraction
+        t_bin, counts, y_bin = self.bin_samples(time - t_ref, None, y, width)
+        return {
+            "t_ref": t_ref, "t": t_bin, "n": counts, "y": y_bin,
+            "N": float(len(y)), "S": float(y.sum()), "sigma2": sigma2,
+        }
+
+    @staticmethod
+    def bin_samples(t, n, y, width):
+        """
+        Merge samples sharing a ``width``-day time bin.
+
+        ``n`` are per-sample counts (None for raw samples, each counting
+        one) and ``y`` flux sums, so already-binned samples can be re-binned.
+        Returns (t, n, y) with count-weighted mean times; ``width <= 0``
+        returns the inputs unchanged.
+        """
+        if width <= 0 or len(t) == 0:
+            return t, (np.ones(len(t)) if n is None else n), y
+        idx = np.floor(t / width).astype(np.int64)
+        if np.all(idx[1:] >= idx[:-1]):
+            # Time-sorted input (the usual case): bins are runs, summed in place without sorting
+            starts = np.flatnonzero(np.diff(idx, prepend=idx[0] - 1))
+            if n is None:
+                counts = np.diff(starts, append=len(t)).astype(np.float64)
+                t_sum = np.add.reduceat(t, starts)
+            else:
+                counts = np.add.reduceat(n, starts)
+                t_sum = np.add.reduceat(t * n, starts)
+            return t_sum / counts, counts, np.add.reduceat(y, starts)
+        uniq, inverse = np.unique(idx, return_inverse=True)
+        counts = np.bincount(inverse, weights=n, minlength=len(uniq)).astype(np.float64)
+        t_bin = np.bincount(inverse, weights=t if n is None else t * n, minlength=len(uniq)) / counts
+        y_bin = np.bincount(inverse, weights=y, minlength=len(uniq))
+        return t_bin, counts, y_bin
+
+    def fold(self, prepared, periods, bin_duration, n_ext):
+        """
+        Phase-fold a block of periods into a padded (periods, bins) grid.
+
+        Row ``p`` holds ``ceil(P / bin_duration)`` phase bins followed by
+        ``n_ext`` wrapped copies of its first bins, so every box (including
+        those straddling phase 0) is a contiguous slice. Returns the count and
+        flux-sum grids plus each row's number of phase bins.
+        """
+        m = len(periods)
+        n_bins = np.ceil(periods / bin_duration).astype(np.int64)
+        width = int(n_bins.max()) + n_ext
+
+        # Phase in units of bins: frac(t / P) * P / bin_duration
+        phase = prepared["t"][None, :] * (1.0 / periods)[:, None]
+        phase -= np.floor(phase)
+        phase *= (periods / bin_duration)[:, None]
+        idx = phase.astype(np.int64)
+        np.minimum(idx, n_bins[:, None] - 1, out=idx)
+        idx += (np.arange(m) * width)[:, None]
+        idx = idx.ravel()
+        counts = np.bincount(idx, weights=_tiled(prepared, "n", m), minlength=m * width).reshape(m, width)
+        sums = np.bincount(idx, weights=_tiled(prepared, "y", m), minlength=m * width).reshape(m, width)
+
+        ext = np.arange(n_ext)
+        rows = np.repeat(np.arange(m), n_ext)
+        dst = (n_bins[:, None] + ext[None, :]).ravel()
+        src = (ext[None, :] % n_bins[:, None]).ravel()
+        counts[rows, dst] = counts[rows, src]
+        sums[rows, dst] = sums[rows, src]
+        return counts, sums, n_bins
+
+    def evaluate(self, counts, sums, n_bins, periods, dur_bins, bin_duration, N, S, sigma2):
+        """Score every box position/duration of a folded block, keeping the best per period"""
+        m, width = counts.shape
+        n_start = int(n_bins.max())
+        zeros = np.zeros((m, 1))
+        cum_n = np.concatenate((zeros, np.cumsum(counts, axis=1)), axis=1)
+        cum_y = np.concatenate((zeros, np.cumsum(sums, axis=1)), axis=1)
+        # Box starts past a row's own phase bins are padding
+        padding = np.arange(n_start)[None, :] >= n_bins[:, None]
+        rows = np.arange(m)
+
+        n_in = np.empty((m, n_start))
+        y_in = np.empty((m, n_start))
+        num = np.empty((m, n_start))
+        den = np.empty((m, n_start))
+        tmp = np.empty((m, n_start))
+
+        best_power = np.full(m, -np.inf)
+        best_depth = np.zeros(m)
+        best_snr = np.zeros(m)
+        best_duration = np.zeros(m)
+        best_t0 = np.zeros(m)
+        for k in dur_bins:
+            np.subtract(cum_n[:, k:k + n_start], cum_n[:, :n_start], out=n_in)
+            np.subtract(cum_y[:, k:k + n_start], cum_y[:, :n_start], out=y_in)
+            # depth = y_out - y_in = (S*n_in - N*y_in) / (n_in * n_out) and
+            # power = 0.5 / sigma2 * n_in * depth**2; rank boxes by the signed
+            # score num*|num| / (n_in * n_out**2) so transits with depth < 0 lose
+            np.multiply(n_in, S, out=num)
+            np.multiply(y_in, N, out=tmp)
+            num -= tmp
+            np.subtract(N, n_in, out=den)
+            # Boxes holding every sample (possible once transits are masked) have no baseline
+            full = den < 0.5
+            den *= den
+            den *= n_in
+            den += 1e-300  # empty boxes score 0 instead of nan
+            np.abs(num, out=tmp)
+            tmp *= num
+            tmp /= den
+            np.copyto(tmp, -np.inf, where=padding | full)
+
+            start = np.argmax(tmp, axis=1)
+            peak = tmp[rows, start] * (0.5 / sigma2)
+            better = peak > best_power
+            if not better.any():
+                continue
+            sel_rows, sel_start = rows[better], start[better]
+            ni = n_in[sel_rows, sel_start]
+            no = N - ni
+            with np.errstate(divide="ignore", invalid="ignore"):
+                d = np.where(ni > 0, num[sel_rows, sel_start] / (ni * no), 0.0)
+                snr = np.where(ni > 0, d / np.sqrt(sigma2 / ni + sigma2 / no), 0.0)
+            duration = k * bin_duration
+            best_power[better] = peak[better]
+            best_depth[better] = d
+            best_snr[better] = snr
+            best_duration[better] = duration
+            best_t0[better] = np.mod(sel_start * bin_duration + 0.5 * duration, periods[better])
+        return best_power, best_depth, best_snr, best_duration, best_t0
+
+    def plan_blocks(self, sorted_periods, bin_duration, n_ext, n_points):
+        """Split sorted periods into [start, stop) blocks whose fold fits chunk_elements"""
+        widths = np.ceil(sorted_periods / bin_duration).astype(np.int64) + n_ext
+        max_rows = max(1, self.chunk_elements // max(n_points, 1))
+        blocks, start, total = [], 0, len(sorted_periods)
+        while start < total:
+            # Widths grow with period, so the last row of a block is its widest;
+            # cap it at 25% over the first row to limit padding
+            stop = min(start + max_rows, total,
+                       int(np.searchsorted(widths, 1.25 * widths[start], side="right")))
+            stop = max(stop, start + 1)
+            while stop - start > 1 and (stop - start) * widths[stop - 1] > self.chunk_elements:
+                stop = start + max(1, (stop - start) // 2)
+            blocks.append((start, stop))
+            start = stop
+        return blocks
+
+    def _search_block(self, prepared, periods, dur_bins, bin_duration):
+        key = (float(periods[0]), len(periods), bin_duration, max(dur_bins))
+        folded = prepared.get("_folds", {}).get(key)
+        if folded is None:
+            folded = (periods,) + self.fold(prepared, periods, bin_duration, max(dur_bins))
+        return key, folded, self.evaluate(*folded[1:], periods, dur_bins, bin_duration,
+                                          prepared["N"], prepared["S"], prepared["sigma2"])
+
+    def _retain_folds(self, prepared, blocks):
+        """Keep newly folded blocks in prepared["_folds"] while they fit its byte budget"""
+        folds = prepared["_folds"]
+        for key, folded, _ in blocks:
+            size = folded[1].nbytes + folded[2].nbytes
+            if key not in folds and size <= prepared["_fold_budget"]:
+                folds[key] = folded
+                prepared["_fold_budget"] -= size
+
+    def mask_prepared(self, prepared, keep, sigma2):
+        """
+        Prepared inputs restricted to the ``keep`` bins, with N and S recomputed.
+
+        Folded blocks retained in ``prepared`` are moved over with the
+        dropped bins' fold subtracted in place, so ``prepared`` itself must
+        not be searched again.
+        """
+        n, y = prepared["n"][keep], prepared["y"][keep]
+        masked = {
+            "t_ref": prepared["t_ref"], "t": prepared["t"][keep], "n": n, "y": y,
+            "N": float(n.sum()), "S": float(y.sum()), "sigma2": sigma2,
+        }
+        if "_folds" in prepared:
+            drop = ~keep
+            dropped = {"t": prepared["t"][drop], "n": prepared["n"][drop], "y": prepared["y"][drop]}
+            for (_, _, bin_duration, n_ext), (periods, counts, sums, _) in prepared["_folds"].items():
+                if len(dropped["t"]):
+                    d_counts, d_sums, _ = self.fold(dropped, periods, bin_duration, n_ext)
+                    counts -= d_counts
+                    sums -= d_sums
+            # Keep the original block plan so the retained blocks still match
+            masked.update(_folds=prepared["_folds"], _fold_budget=prepared["_fold_budget"],
+                          _block_points=prepared.get("_block_points", len(prepared["t"])))
+        return masked
+
+    def search(self, time, flux, periods=None):
+        """
+        Run the BLS search over a period grid.
+
+        Args:
+            time (np.ndarray): Observation times in days.
+            flux (np.ndarray): Flux measurements.
+            periods (np.ndarray): Trial periods; defaults to period_grid(time).
+
+        Returns:
+            BLSResult: Per-period power, depth, SNR, duration and transit time.
+        """
+        time = np.asarray(time, dtype=np.float64)
+        baseline = float(time.max() - time.min()) if len(time) else 0.0
+        durations = self.usable_durations(baseline)
+        if periods is None:
+            periods = self.period_grid(time, durations) if len(time) >= 10 else np.empty(0)
+        periods = np.asarray(periods, dtype=np.float64)
+        if len(periods) == 0 or not durations:
+            return _empty_result()
+        return self.search_prepared(self.prepare(time, flux, durations), periods, durations)
+
+    def search_prepared(self, prepared, periods, durations):
+        """Run the BLS search over ``periods`` on inputs from prepare()"""
+        if len(periods) == 0 or len(prepared["t"]) == 0:
+            return _empty_result()
+        bin_duration = self.bin_duration(durations)
+        dur_bins = sorted({max(1, int(round(d / bin_duration))) for d in durations})
+        order = np.argsort(periods)
+        sorted_periods = periods[order]
+        blocks = [sorted_periods[i:j] for i, j in
+                  self.plan_blocks(sorted_periods, bin_duration, max(dur_bins),
+                                   prepared.get("_block_points", len(prepared["t"])))]
+
+        if self.n_workers > 1 and len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=self.n_workers) as pool:
+                parts = list(pool.map(lambda p: self._search_block(prepared, p, dur_bins, bin_duration), blocks))
+        else:
+            parts = [self._search_block(prepared, p, dur_bins, bin_duration) for p in blocks]
+        if "_folds" in prepared:
+            self._retain_folds(prepared, parts)
+
+        columns = []
+        for col in zip(*(part[2] for part in parts)):
+            values = np.empty(len(periods))
+            values[order] = np.concatenate(col)
+            columns.append(values)
+        power, depth, snr, duration, t0 = columns
+        return BLSResult(periods, power, depth, snr, duration, t0 + prepared["t_ref"],
+                         evaluations=len(periods) * len(dur_bins), stats={"mode": "exhaustive"})
+
+    # prepare_inputs() entries searched over the same period grid on every call
+    fixed_grid_inputs = ("fine",)
+
+    def prepare_inputs(self, time, flux, durations):
+        """Binned inputs for every pass of search_inputs(), keyed by pass"""
+        return {"fine": self.prepare(time, flux, durations)}
+
+    def search_inputs(self, inputs, baseline, durations):
+        """Default-grid search of inputs from prepare_inputs()"""
+        return self.search_prepared(inputs["fine"], self.baseline_period_grid(baseline, durations), durations)
+
+    def search_iterative(self, time, flux, max_planets, min_snr, mask_factor=MASK_FACTOR):
+        """
+        Find up to ``max_planets`` signals, masking each one before searching again.
+
+        The light curve is binned once; after every detection the bins
+        within ``mask_factor`` transit durations of its transits are dropped
+        from those arrays (with N, S and the flux variance recomputed), so
+        later passes never re-bin. The phase-folded grids of inputs searched
+        over a fixed period grid (``fixed_grid_inputs``) are also kept, up
+        to FOLD_CACHE_BYTES each, and later passes only subtract the fold of
+        the dropped bins instead of re-folding the light curve.
+
+        Args:
+            time (np.ndarray): Observation times in days.
+            flux (np.ndarray): Flux measurements.
+            max_planets (int): Maximum number of signals to return.
+            min_snr (float): Stop at the first signal with a lower depth SNR
+                (or a non-positive depth).
+            mask_factor (float): Masked width around each transit, in durations.
+
+        Returns:
+            tuple: (list of BLSResult, strongest signal first; stats dict with
+            the mode, passes run and total evaluations).
+        """
+        time = np.asarray(time, dtype=np.float64)
+        flux = np.asarray(flux, dtype=np.float64)
+        baseline = float(time.max() - time.min()) if len(time) else 0.0
+        durations = self.usable_durations(baseline)
+        stats = {"mode": "iterative", "passes": 0, "evaluations": 0}
+        if len(time) < 10 or not durations:
+            return [], stats
+
+        inputs = self.prepare_inputs(time, flux, durations)
+        for name in self.fixed_grid_inputs:
+            inputs[name].update(_folds={}, _fold_budget=FOLD_CACHE_BYTES)
+        y = flux - flux.mean()
+        keep = np.ones(len(time), dtype=bool)
+        results = []
+        while len(results) < max_planets:
+            result = self.search_inputs(inputs, baseline, durations)
+            stats["passes"] += 1
+            stats["evaluations"] += result.evaluations
+            stats.setdefault("search", result.stats.get("mode"))
+            features = result.best_features()
+            if features["bls_depth"] <= 0 or features["bls_snr"] < min_snr:
+                break
+            results.append(result)
+
+            width = mask_factor * features["bls_duration"]
+            period, t0 = features["bls_period"], features["bls_t0"]
+            keep &= ~in_transit(time, period, t0, width)
+            if keep.sum() < 10:
+                break
+            # The variance needs the raw samples, but only as one cheap masked pass
+            sigma2 = float(np.var(y[keep])) or 1.0
+            inputs = {
+                name: self.mask_prepared(prepared, ~in_transit(prepared["t"] + prepared["t_ref"], period, t0, width),
+                                         sigma2)
+                for name, prepared in inputs.items()
+            }
+        return results, stats
+
+
+def _empty_result():
+    empty = np.empty(0)
+    return BLSResult(empty, empty, empty, empty, empty, empty, evaluations=0)
+
+
+def top_peaks(power, k, separation=2):
+    """Indices of the ``k`` strongest local maxima at least ``separation`` grid steps apart"""
+    power = np.where(np.isfinite(power), power, -np.inf)
+    left = np.concatenate(([-np.inf], power[:-1]))
+    right = np.concatenate((power[1:], [-np.inf]))
+    candidates = np.flatnonzero((power >= left) & (power >= right) & (power > 0))
+    chosen = []
+    for i in candidates[np.argsort(power[candidates])[::-1]]:
+        if all(abs(i - j) > separation for j in chosen):
+            chosen.append(int(i))
+            if len(chosen) == k:
+                break
+    return chosen
+
+
+class AdaptiveBLSEngine(BLSEngine):
+    """
+    Coarse-to-fine BLS search.
+
+    The coarse pass scores a log-spaced period grid whose step lets a
+    transit drift by at most ``coarse_drift`` shortest durations across the
+    baseline (the full grid's uniform frequency step is sized for the
+    longest period, so it oversamples short periods heavily), on flux
+    binned ``coarse_oversample`` times per shortest duration. Only the
+    ``top_k`` coarse peaks are then re-searched on the full-resolution grid
+    within two coarse steps, and curves whose best coarse SNR is below
+    ``refine_min_snr`` are not refined at all.
+
+    Larger ``coarse_drift`` and smaller ``top_k`` trade accuracy for speed;
+    ``BLSResult.evaluations`` reports the trials used by both passes.
+    """
+
+    def __init__(self, coarse_drift=COARSE_DRIFT, coarse_oversample=COARSE_OVERSAMPLE, top_k=REFINE_TOP_K,
+                 refine_min_snr=REFINE_MIN_SNR, **kwargs):
+        super().__init__(**kwargs)
+        self.coarse_drift = coarse_drift
+        self.coarse_oversample = coarse_oversample
+        self.top_k = top_k
+        self.refine_min_snr = refine_min_snr
+
+    def coarse_engine(self):
+        """Exhaustive engine for the coarse pass, binned coarse_oversample times per duration"""
+        return BLSEngine(
+            durations=self.durations, min_period=self.min_period, max_period=self.max_period,
+            oversample=self.coarse_oversample, time_bin_fraction=self.time_bin_fraction,
+            max_periods=self.max_periods, n_workers=self.n_workers, chunk_elements=self.chunk_elements)
+
+    def coarse_step(self, baseline, durations):
+        """Fractional period step of the coarse grid"""
+        return self.coarse_drift * min(durations) / baseline
+
+    def coarse_period_grid(self, baseline, durations):
+        max_period = self.max_period or baseline / 2
+        if not durations or max_period <= self.min_period:
+            return np.empty(0)
+        n = int(math.ceil(math.log(max_period / self.min_period) / math.log1p(self.coarse_step(baseline, durations))))
+        return np.geomspace(self.min_period, max_period, min(n + 1, self.max_periods))
+
+    def search(self, time, flux, periods=None):
+        """Coarse-to-fine search; an explicit ``periods`` grid is searched exhaustively"""
+        time = np.asarray(time, dtype=np.float64)
+        baseline = float(time.max() - time.min()) if len(time) else 0.0
+        durations = self.usable_durations(baseline)
+        if periods is not None or len(time) < 10 or not durations:
+            return super().search(time, flux, periods)
+        return self.search_inputs(self.prepare_inputs(time, flux, durations), baseline, durations)
+
+    fixed_grid_inputs = ("coarse",)
+
+    def prepare_inputs(self, time, flux, durations):
+        """Coarse and full-resolution binned inputs"""
+        return {"coarse": self.coarse_engine().prepare(time, flux, durations),
+                "fine": self.prepare(time, flux, durations)}
+
+    def search_inputs(self, inputs, baseline, durations):
+        """Coarse pass over the log grid, then refinement of its top peaks"""
+        coarse = self.coarse_engine().search_prepared(
+            inputs["coarse"], self.coarse_period_grid(baseline, durations), durations)
+        stats = {"mode": "adaptive", "coarse_evaluations": coarse.evaluations, "refined_peaks": 0}
+        best = coarse.best_index
+        if best < 0 or coarse.depth_snr[best] < self.refine_min_snr:
+            return BLSResult(coarse.period, coarse.power, coarse.depth, coarse.depth_snr, coarse.duration,
+                             coarse.transit_time, evaluations=coarse.evaluations, stats=stats)
+
+        fine_grid = self.baseline_period_grid(baseline, durations)
+        ratio = (1 + self.coarse_step(baseline, durations)) ** 2
+        peaks = coarse.period[top_peaks(coarse.power, self.top_k)]
+        in_window = np.zeros(len(fine_grid), dtype=bool)
+        replaced = np.zeros(len(coarse.period), dtype=bool)
+        for peak in peaks:
+            in_window |= (fine_grid >= peak / ratio) & (fine_grid <= peak * ratio)
+            replaced |= (coarse.period >= peak / ratio) & (coarse.period <= peak * ratio)
+        fine = self.search_prepared(inputs["fine"], np.unique(np.concatenate((fine_grid[in_window], peaks))),
+                                    durations)
+        stats["refined_peaks"] = len(peaks)
+
+        # Refined windows replace their coarse values; the rest of the coarse periodogram is kept
+        keep = ~replaced
+        period = np.concatenate((coarse.period[keep], fine.period))
+        order = np.argsort(period)
+        columns = [np.concatenate((getattr(coarse, name)[keep], getattr(fine, name)))[order]
+                   for name in ("power", "depth", "depth_snr", "duration", "transit_time")]
+        return BLSResult(period[order], *columns, evaluations=coarse.evaluations + fine.evaluations, stats=stats)
+
+
+def default_engine():
+    """BLS engine selected by CELESTIAL_BLS_SEARCH"""
+    return BLSEngine() if BLS_SEARCH == "exhaustive" else AdaptiveBLSEngine()
@@ -0,0 +1,154 @@
+# utils/cascade.py - Early-exit screening cascade for survey-scale batch analysis
+import os
+
+import numpy as np
+
+from utils.bls_engine import BLS_DURATIONS
+
+# Order in which a light curve moves through the cascade; a curve stops at the
+# first gate it fails
+STAGES = ("screen", "bls", "classify")
+# Gates enabled by default: the cheap screen before preprocessing and BLS, and
+# the BLS detection before XGBoost/CNN scoring
+DEFAULT_GATES = ("screen", "bls")
+
+# Screen: curves whose best box statistic falls below this go no further. On a synthetic
+# survey mix (utils.synthetic, 30% with planets) 6.5 stops ~90% of planet-free curves
+# while keeping ~94% of the planets BLS goes on to detect
+SCREEN_THRESHOLD = float(os.environ.get("CELESTIAL_SCREEN_SNR", "6.5"))
+# High-pass window (days) removing variability before the box filter
+SCREEN_WINDOW = 1.0
+SCREEN_DURATIONS = BLS_DURATIONS
+# Deepest non-overlapping dips averaged by the stacked statistic
+SCREEN_EVENTS = 3
+
+
+def _running_mean(time, cumsum, half_width):
+    """Mean of the samples within half_width days of each sample, from a padded cumulative sum"""
+    lo = np.searchsorted(time, time - half_width, side="left")
+    hi = np.searchsorted(time, time + half_width, side="right")
+    return (cumsum[hi] - cumsum[lo]) / (hi - lo), hi - lo
+
+
+def _deepest_events(box, duration, time, k):
+    """
+    Indices of the k lowest box means whose centres are more than a duration apart.
+
+    Picks the minimum, masks everything within a duration of it and repeats,
+    so a single dip spanning any number of samples counts once whatever the
+    cadence.
+    """
+    remaining = box.copy()
+    chosen = []
+    for _ in range(k):
+        i = int(np.argmin(remaining))
+        if not np.isfinite(remaining[i]):
+            break
+        chosen.append(i)
+        lo = np.searchsorted(time, time[i] - duration, side="left")
+        hi = np.searchsorted(time, time[i] + duration, side="right")
+        remaining[lo:hi] = np.inf
+    return chosen
+
+
+def screen_statistics(time, flux, durations=SCREEN_DURATIONS, window=SCREEN_WINDOW, events=SCREEN_EVENTS):
+    """
+    Cheap O(n) transit screen on a raw light curve.
+
+    The flux is median-normalised and high-passed with a running mean over
+    ``window`` days, then box-filtered at each trial duration. Each box
+    mean is compared to the robust scatter of all box means of that
+    duration, which already includes red noise, both for the single
+    deepest dip and for the mean of the ``events`` deepest separated dips
+    (periodic shallow transits that no single event reveals).
+
+    Returns:
+        dict: screen_snr (best of both statistics over all durations),
+        screen_single_snr, screen_stacked_snr and screen_duration.
+    """
+    time = np.asarray(time, dtype=np.float64)
+    flux = np.asarray(flux, dtype=np.float64)
+    finite = np.isfinite(time) & np.isfinite(flux)
+    time, flux = time[finite], flux[finite]
+    stats = {"screen_snr": 0.0, "screen_single_snr": 0.0, "screen_stacked_snr": 0.0, "screen_duration": 0.0}
+    if len(time) < 10:
+        return stats
+    if np.any(np.diff(time) < 0):
+        order = np.argsort(time, kind="stable")
+        time, flux = time[order], flux[order]
+    scale = np.median(flux)
+    residual = flux / scale - 1.0 if scale != 0 else flux - np.mean(flux)
+    trend, _ = _running_mean(time, np.concatenate(([0.0], np.cumsum(residual))), window / 2)
+    residual -= trend
+    cumsum = np.concatenate(([0.0], np.cumsum(residual)))
+
+    for duration in durations:
+        box, _ = _running_mean(time, cumsum, duration / 2)
+        center = np.median(box)
+        sigma = 1.4826 * np.median(np.abs(box - center))
+        if not sigma > 0:
+            continue
+        dips = _deepest_events(box, duration, time, events)
+        single = float((center - box[dips[0]]) / sigma)
+        stacked = float((center - box[dips].mean()) / sigma * np.sqrt(len(dips)))
+        if max(single, stacked) > stats["screen_snr"]:
+            stats.update(screen_snr=max(single, stacked), screen_single_snr=single,
+                         screen_stacked_snr=stacked, screen_duration=float(duration))
+    return stats
+
+
+class CascadeStats:
+    """
+    Per-stage entry/pass counts and wall time for a cascade run.
+
+    Time saved is estimated per gate as the curves it stopped times the
+    mean cost of the later stages measured on the curves that ran them.
+    """
+
+    def __init__(self):
+        self.entered = {stage: 0 for stage in STAGES}
+        self.passed = {stage: 0 for stage in STAGES}
+        self.seconds = {stage: 0.0 for stage in STAGES}
+
+    def record(self, stage, passed, seconds):
+        self.entered[stage] += 1
+        self.passed[stage] += int(bool(passed))
+        self.seconds[stage] += seconds
+
+    def mean_seconds(self, stage):
+        return self.seconds[stage] / self.entered[stage] if self.entered[stage] else 0.0
+
+    def report(self):
+        """Stage table plus the estimated wall time the gates saved"""
+        stages = {}
+        saved = 0.0
+        for i, stage in enumerate(STAGES):
+            entered, passed = self.entered[stage], self.passed[stage]
+            stopped = entered - passed if i < len(STAGES) - 1 else 0
+            saved += stopped * sum(self.mean_seconds(later) for later in STAGES[i + 1:])
+            stages[stage] = {
+                "entered": entered,
+                "passed": passed,
+                "pass_rate": round(passed / entered, 4) if entered else None,
+                "seconds": round(self.seconds[stage], 4),
+                "mean_s": round(self.mean_seconds(stage), 6),
+            }
+        spent = sum(self.seconds.values())
+        return {
+            "stages": stages,
+            "seconds": round(spent, 4),
+            "saved_s": round(saved, 4),
+            "speedup": round((spent + saved) / spent, 3) if spent > 0 else None,
+        }
+
+
+def format_report(report):
+    """One line per stage for console output"""
+    lines = []
+    for stage, info in report["stages"].items():
+        if not info["entered"]:
+            continue
+        lines.append(f"  {stage:<9} {info['passed']:>7}/{info['entered']:<7} passed "
+                     f"({100 * info['pass_rate']:.1f}%), {info['seconds']:.1f} s")
+    lines.append(f"  saved ~{report['saved_s']:.1f} s (~{report['speedup'] or 1:.2f}x)")
+    return "\n".join(lines)
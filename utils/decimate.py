@@ -0,0 +1,131 @@
+# utils/decimate.py - Bounded-size light curve traces for Plotly
+import math
+import os
+
+import numpy as np
+
+# Points per trace sent to the browser; transit dips survive min/max decimation
+DEFAULT_MAX_POINTS = int(os.environ.get("CELESTIAL_PLOT_POINTS", "4000"))
+# Traces with more plotted points than this are drawn with WebGL
+WEBGL_MIN_POINTS = 1500
+
+
+def minmax_indices(y, max_points):
+    """
+    Indices keeping the min and max sample of each of ``max_points // 2`` buckets.
+
+    Buckets are contiguous runs of samples, so for time-sorted data every
+    dip or spike narrower than a bucket is still drawn at full depth. Full
+    buckets are reduced through a reshaped view of ``y``, so no copy of
+    the series is made.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    per_bucket = -(-n // max(max_points // 2, 1))
+    full = n // per_bucket
+    body = y[:full * per_bucket].reshape(full, per_bucket)
+    offsets = np.arange(full) * per_bucket
+    lo = [np.argmin(body, axis=1) + offsets]
+    hi = [np.argmax(body, axis=1) + offsets]
+    if full * per_bucket < n:
+        tail = y[full * per_bucket:]
+        lo.append([full * per_bucket + int(np.argmin(tail))])
+        hi.append([full * per_bucket + int(np.argmax(tail))])
+    # Keep each bucket's pair in time order so lines don't zig-zag backwards
+    return np.sort(np.concatenate(lo + hi), kind="stable")
+
+
+def lttb_indices(x, y, max_points):
+    """Indices chosen by Largest-Triangle-Three-Buckets downsampling"""
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    max_points = max(max_points, 3)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        start, stop = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket (or the last point) is the third vertex
+        if i + 2 < len(edges):
+            next_stop = max(edges[i + 2], stop + 1)
+            avg_x, avg_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - avg_x) * (y[start:stop] - ay) - (ax - x[start:stop]) * (avg_y - ay))
+        previous = start + int(np.argmax(area))
+        keep[i + 1] = previous
+    return keep
+
+
+def decimate(x, y, max_points=DEFAULT_MAX_POINTS, method="minmax"):
+    """
+    Downsample (x, y) to at most ``max_points`` samples.
+
+    Args:
+        x, y (np.ndarray): Samples, sorted by x.
+        max_points (int): Point budget for the trace.
+        method (str): "minmax" (preserves extrema, cheapest) or "lttb"
+            (visually closest shape).
+
+    Returns:
+        tuple: (x, y) views/copies of at most ``max_points`` samples; the
+        inputs are returned unchanged when already within budget.
+    """
+    if len(x) <= max_points:
+        return x, y
+    if method == "minmax":
+        keep = minmax_indices(y, max_points)
+    elif method == "lttb":
+        keep = lttb_indices(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), max_points)
+    else:
+        raise ValueError(f"Unknown decimation method: {method}")
+    return x[keep], y[keep]
+
+
+def phase_fold(time, flux, period, t0=0.0, max_points=DEFAULT_MAX_POINTS):
+    """
+    Phase-fold a light curve, decimated over phase to the point budget.
+
+    Phase is ``(time - t0) / period`` modulo 1, computed in the dtype of
+    ``time`` (pass offset-encoded float32 time with the offset folded into
+    ``t0``). Curves over budget are reduced to the min and max flux of each
+    of ``max_points // 2`` phase buckets, plotted at the bucket centre, in
+    one pass without sorting or reordering copies of the light curve.
+
+    Returns:
+        tuple: (phase, flux) sorted by phase.
+    """
+    phase = np.mod(time - math.fmod(t0, period), period)
+    phase /= period
+    if len(phase) <= max_points:
+        order = np.argsort(phase, kind="stable")
+        return phase[order], flux[order]
+    buckets = max(max_points // 2, 1)
+    idx = (phase * buckets).astype(np.intp)
+    np.minimum(idx, buckets - 1, out=idx)
+    lo = np.full(buckets, np.inf, dtype=flux.dtype)
+    hi = np.full(buckets, -np.inf, dtype=flux.dtype)
+    np.minimum.at(lo, idx, flux)
+    np.maximum.at(hi, idx, flux)
+    filled = np.isfinite(lo)
+    centres = ((np.arange(buckets) + 0.5) / buckets)[filled].astype(phase.dtype)
+    return np.repeat(centres, 2), np.column_stack((lo[filled], hi[filled])).ravel()
+
+
+def scatter_trace(x, y, max_points=DEFAULT_MAX_POINTS, method="minmax", **kwargs):
+    """
+    Build a Plotly scatter trace over decimated data.
+
+    Large traces use ``go.Scattergl`` so the browser renders them with WebGL;
+    small ones stay on SVG ``go.Scatter``. Extra keyword arguments are passed
+    to the trace constructor.
+    """
+    import plotly.graph_objects as go
+
+    x, y = decimate(np.asarray(x), np.asarray(y), max_points, method)
+    trace_cls = go.Scattergl if len(x) > WEBGL_MIN_POINTS else go.Scatter
+    return trace_cls(x=x, y=y, **kwargs)
@@ -0,0 +1,224 @@
+# utils/detrend.py - Fast sliding-window detrending (running median and Tukey biweight)
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Window length in days; ~3x the longest transit duration keeps transits out of the trend
+DEFAULT_WINDOW = 0.5
+# Trend knots per window: the exact filter is evaluated every window/KNOTS_PER_WINDOW days
+# and interpolated in between (0 evaluates it at every cadence)
+KNOTS_PER_WINDOW = 20
+# Tukey biweight tuning constant (in MADs), as in wotan
+BIWEIGHT_C = 5.0
+BIWEIGHT_ITERATIONS = 10
+# Window-matrix elements per thread-pool task; bounds per-task memory (~2 MB per float64
+# matrix, ~10 live at once in the biweight) and keeps the matrices cache-friendly
+CHUNK_SAMPLES = 262_144
+DETREND_WORKERS = int(os.environ.get("CELESTIAL_DETREND_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+METHODS = ("median", "biweight")
+
+
+def _segments(time, break_tolerance):
+    """(start, stop) index ranges of the runs between gaps longer than break_tolerance"""
+    breaks = np.flatnonzero(np.diff(time) > break_tolerance) + 1
+    bounds = np.concatenate(([0], breaks, [len(time)]))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _window_matrix(values, lo, hi):
+    """Rows of ``values[lo[i]:hi[i]]`` padded with NaN into one (k, max count) matrix"""
+    counts = hi - lo
+    idx = lo[:, None] + np.arange(counts.max())
+    valid = idx < hi[:, None]
+    matrix = values[np.minimum(idx, len(values) - 1)]
+    matrix[~valid] = np.nan
+    return matrix, valid, counts
+
+
+def _row_medians(matrix, counts):
+    """Exact per-row medians of a NaN-padded matrix (NaNs sort last)"""
+    ordered = np.sort(matrix, axis=1)
+    rows = np.arange(len(ordered))
+    return 0.5 * (ordered[rows, (counts - 1) // 2] + ordered[rows, counts // 2])
+
+
+def _row_biweights(matrix, valid, counts, c=BIWEIGHT_C, iterations=BIWEIGHT_ITERATIONS, tol=1e-7):
+    """
+    Tukey biweight location per row, iterated from the median with a fixed MAD scale.
+
+    Rows stop iterating individually once they converge, so a row's value
+    does not depend on which other rows share its chunk.
+    """
+    location = _row_medians(matrix, counts)
+    mad = _row_medians(np.abs(matrix - location[:, None]), counts)
+    scale = np.where(mad > 0, c * mad, np.inf)
+    values = np.where(valid, matrix, 0.0)
+    active = np.arange(len(values))
+    for _ in range(iterations):
+        rows = values[active]
+        u = (rows - location[active, None]) / scale[active, None]
+        weights = np.where(valid[active] & (np.abs(u) < 1), (1 - u ** 2) ** 2, 0.0)
+        total = weights.sum(axis=1)
+        updated = np.where(total > 0, (weights * rows).sum(axis=1) / np.where(total > 0, total, 1),
+                           location[active])
+        moving = np.abs(updated - location[active]) >= tol
+        location[active] = updated
+        active = active[moving]
+        if len(active) == 0:
+            break
+    return location
+
+
+def _evaluate(time, flux, knots, half_window, method):
+    """Filter value at each knot over the samples within half_window of it"""
+    lo = np.searchsorted(time, knots - half_window, side="left")
+    hi = np.searchsorted(time, knots + half_window, side="right")
+    # A window never holds fewer than the nearest sample
+    nearest = np.clip(np.searchsorted(time, knots), 0, len(time) - 1)
+    lo, hi = np.minimum(lo, nearest), np.maximum(hi, nearest + 1)
+    matrix, valid, counts = _window_matrix(flux, lo, hi)
+    if method == "median":
+        return _row_medians(matrix, counts)
+    return _row_biweights(matrix, valid, counts)
+
+
+def _segment_knots(seg_time, knot_spacing):
+    if knot_spacing <= 0:
+        return seg_time
+    n_knots = max(int(np.ceil((seg_time[-1] - seg_time[0]) / knot_spacing)), 1) + 1
+    return np.linspace(seg_time[0], seg_time[-1], n_knots)
+
+
+def _chunk_tasks(seg_time, start, knots, half_window, chunk_knots):
+    """Split a segment's knots into tasks, each reading its samples plus a half-window border"""
+    tasks = []
+    for i in range(0, len(knots), chunk_knots):
+        chunk = knots[i:i + chunk_knots]
+        lo = start + np.searchsorted(seg_time, chunk[0] - half_window, side="left")
+        hi = start + np.searchsorted(seg_time, chunk[-1] + half_window, side="right")
+        tasks.append((chunk, lo, hi))
+    return tasks
+
+
+def flatten(time, flux, method="biweight", window_length=DEFAULT_WINDOW, edge_cutoff=0.0, break_tolerance=None,
+            knots_per_window=KNOTS_PER_WINDOW, workers=None, return_trend=False):
+    """
+    Remove stellar variability with a robust sliding-window filter.
+
+    Follows the interface of ``wotan.flatten`` for the "median" and
+    "biweight" methods. The filter is evaluated exactly at knots spaced
+    window_length / knots_per_window apart and linearly interpolated in
+    between, so the cost is O(n log w) rather than O(n w log w) for n
+    cadences and w samples per window; ``knots_per_window=0`` evaluates it
+    at every cadence. Knots are processed in chunks on a thread pool, each
+    chunk reading the samples it covers plus a half-window border on
+    either side, so chunking does not change the result (beyond summation
+    order in the biweight).
+
+    Args:
+        time (np.ndarray): Observation times in days, sorted ascending.
+        flux (np.ndarray): Flux measurements.
+        method (str): "median" or "biweight".
+        window_length (float): Filter window in days.
+        edge_cutoff (float): Days at each segment edge whose trend is set to NaN.
+        break_tolerance (float): Gaps longer than this (days) split the
+            curve into independently detrended segments; defaults to
+            half the window.
+        knots_per_window (int): Exact filter evaluations per window length.
+        workers (int): Threads (defaults to DETREND_WORKERS).
+        return_trend (bool): Also return the trend.
+
+    Returns:
+        np.ndarray: flux / trend, plus the trend if ``return_trend``.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown detrending method {method!r}; expected one of {METHODS}")
+    time = np.asarray(time, dtype=np.float64)
+    flux = np.asarray(flux, dtype=np.float64)
+    finite = np.isfinite(time) & np.isfinite(flux)
+    all_finite = finite.all()
+    t, f = (time, flux) if all_finite else (time[finite], flux[finite])
+    if len(t) == 0:
+        trend = np.full(len(time), np.nan)
+        return (flux / trend, trend) if return_trend else flux / trend
+    if np.any(np.diff(t) < 0):
+        raise ValueError("time must be sorted ascending")
+
+    break_tolerance = window_length / 2 if break_tolerance is None else break_tolerance
+    knot_spacing = window_length / knots_per_window if knots_per_window else 0.0
+    workers = workers or DETREND_WORKERS
+    bounds = _segments(t, break_tolerance)
+    knots = [_segment_knots(t[start:stop], knot_spacing) for start, stop in bounds]
+
+    # Size chunks to keep every worker busy while bounding each window matrix
+    span = t[-1] - t[0]
+    per_window = len(t) * window_length / span if span > 0 else len(t)
+    total_knots = sum(len(k) for k in knots)
+    chunk_knots = max(1, min(-(-total_knots // (4 * workers)), int(CHUNK_SAMPLES // max(per_window, 1.0))))
+
+    segments = []
+    tasks = []
+    for (start, stop), seg_knots in zip(bounds, knots):
+        seg_tasks = _chunk_tasks(t[start:stop], start, seg_knots, window_length / 2, chunk_knots)
+        segments.append((start, stop, seg_knots, len(tasks), len(tasks) + len(seg_tasks)))
+        tasks.extend(seg_tasks)
+
+    def run(task):
+        chunk, lo, hi = task
+        return _evaluate(t[lo:hi], f[lo:hi], chunk, window_length / 2, method)
+
+    if workers > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            values = list(pool.map(run, tasks))
+    else:
+        values = [run(task) for task in tasks]
+
+    clean_trend = np.empty(len(t))
+    for start, stop, knots, first, last in segments:
+        knot_values = np.concatenate(values[first:last])
+        seg_time = t[start:stop]
+        seg_trend = knot_values if knot_spacing == 0 else np.interp(seg_time, knots, knot_values)
+        if edge_cutoff > 0:
+            edges = (seg_time < seg_time[0] + edge_cutoff) | (seg_time > seg_time[-1] - edge_cutoff)
+            seg_trend = np.where(edges, np.nan, seg_trend)
+        clean_trend[start:stop] = seg_trend
+    if all_finite:
+        trend = clean_trend
+    else:
+        trend = np.full(len(time), np.nan)
+        trend[finite] = clean_trend
+    flattened = flux / trend
+    return (flattened, trend) if return_trend else flattened
+
+
+def detrend_light_curve(time, flux, method="biweight", window_length=DEFAULT_WINDOW, sigma_upper=3.0, **kwargs):
+    """
+    Sort, detrend and clean a light curve in one pass.
+
+    Drops non-finite samples, divides out the trend with flatten() and
+    removes upward outliers beyond ``sigma_upper`` robust standard
+    deviations (flares, cosmic rays); downward points are kept since
+    transits live there.
+
+    Returns:
+        tuple: (time, normalised flux) as float64 arrays.
+    """
+    time = np.asarray(time, dtype=np.float64)
+    flux = np.asarray(flux, dtype=np.float64)
+    keep = np.isfinite(time) & np.isfinite(flux)
+    if not keep.all():
+        time, flux = time[keep], flux[keep]
+    if len(time) > 1 and np.any(np.diff(time) < 0):
+        order = np.argsort(time, kind="stable")
+        time, flux = time[order], flux[order]
+    flat = flatten(time, flux, method, window_length, **kwargs)
+    keep = np.isfinite(flat)
+    if sigma_upper and keep.any():
+        finite = flat if keep.all() else flat[keep]
+        center = np.median(finite)
+        sigma = 1.4826 * np.median(np.abs(finite - center))
+        if sigma > 0:
+            keep &= flat <= center + sigma_upper * sigma
+    return time[keep], flat[keep]
@@ -0,0 +1,223 @@
+# utils/feature_store.py - Persistent SQLite store of extracted light curve features
+import argparse
+import hashlib
+import importlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+
+from utils.bls_engine import BLS_SEARCH, MAX_PLANETS
+from utils.pipeline import PREPROCESS, resolve_feature_path
+from utils.precision import RESULT_PRECISION
+from utils.result_cache import processor_fingerprint
+
+# Bump when the stored columns or their meaning change
+FEATURE_SCHEMA_VERSION = 1
+
+DEFAULT_FEATURE_STORE = os.environ.get("CELESTIAL_FEATURE_STORE", os.path.join(".cache", "features.sqlite"))
+
+# Modules whose code determines the extracted features (reading and quality masking,
+# detrending, BLS, feature and view extraction, result precision); editing any of them changes
+# the extractor version and so invalidates stored rows
+EXTRACTOR_MODULES = ("utils.light_curve_io", "utils.detrend", "utils.pipeline", "utils.bls_engine",
+                     "utils.inference", "utils.precision")
+
+BLS_COLUMNS = ("bls_period", "bls_depth", "bls_snr", "bls_power", "bls_duration", "bls_t0")
+QUALITY_COLUMNS = ("n_points", "n_valid", "nan_fraction", "time_span_days", "median_cadence_days", "flux_rms_ppm")
+UNCERTAINTY_COLUMNS = ("flux_std", "flux_mad", "depth_uncertainty")
+FEATURE_COLUMNS = BLS_COLUMNS + QUALITY_COLUMNS + UNCERTAINTY_COLUMNS
+
+
+def extractor_version(processor, max_planets=None, feature_path=None):
+    """
+    Short hash of everything that shapes the stored features.
+
+    Covers the processor's configuration and the analysis options (as for
+    the result cache) and the source of its module plus EXTRACTOR_MODULES,
+    so changing reading, preprocessing, BLS or view logic stops old rows
+    from matching.
+    """
+    max_planets = MAX_PLANETS if max_planets is None else max_planets
+    feature_path = resolve_feature_path(processor, feature_path)
+    digest = hashlib.sha256(f"v{FEATURE_SCHEMA_VERSION}|{PREPROCESS}|{feature_path}|{BLS_SEARCH}|{max_planets}|"
+                            f"{RESULT_PRECISION}|{processor_fingerprint(processor)}".encode())
+    for name in sorted({type(processor).__module__, *EXTRACTOR_MODULES}):
+        path = getattr(sys.modules.get(name) or importlib.import_module(name), "__file__", None)
+        if path and os.path.exists(path):
+            with open(path, "rb") as fh:
+                digest.update(fh.read())
+    return digest.hexdigest()[:16]
+
+
+def feature_record(target_id, input_hash, version, result, view=None):
+    """Flatten a process_light_curve_* result (and optional CNN view) into a store record"""
+    record = {"target_id": str(target_id), "input_hash": input_hash, "extractor_version": version,
+              "transit_detected": int(bool(result["transit_detected"]))}
+    for column in BLS_COLUMNS:
+        record[column] = float(result["bls_features"].get(column, 0.0))
+    for column in QUALITY_COLUMNS:
+        record[column] = float(result["quality_report"].get(column, 0.0))
+    for column in UNCERTAINTY_COLUMNS:
+        record[column] = float(result["uncertainty_features"].get(column, 0.0))
+    if view is not None:
+        view = np.ascontiguousarray(view, dtype=np.float32)
+        record["view_length"] = len(view)
+        record["view"] = view.tobytes()
+    return record
+
+
+def record_view(record):
+    """The stored CNN view as a float32 array, or None"""
+    if record.get("view") is None:
+        return None
+    return np.frombuffer(record["view"], dtype=np.float32)
+
+
+class FeatureStore:
+    """
+    Extracted features keyed by (target ID, input hash, extractor version).
+
+    Rows hold the BLS, quality and uncertainty features plus, optionally,
+    the binned CNN view, so a catalog can be re-scored with new models
+    without touching the light curves. The database runs in WAL mode:
+    pool workers read concurrently while one writer bulk-inserts.
+    """
+
+    def __init__(self, path=DEFAULT_FEATURE_STORE, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        columns = ", ".join(f"{name} REAL" for name in FEATURE_COLUMNS)
+        with self._connect() as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS features (
+                    target_id TEXT NOT NULL,
+                    input_hash TEXT NOT NULL,
+                    extractor_version TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    transit_detected INTEGER NOT NULL,
+                    {columns},
+                    view_length INTEGER,
+                    view BLOB,
+                    PRIMARY KEY (target_id, input_hash, extractor_version)
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS features_version ON features (extractor_version, target_id)")
+
+    def _connect(self):
+        """One connection per thread (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, target_id, input_hash, version):
+        """Return the stored record for an exact key, or None"""
+        row = self._connect().execute(
+            "SELECT * FROM features WHERE target_id = ? AND input_hash = ? AND extractor_version = ?",
+            (str(target_id), input_hash, version)).fetchone()
+        return dict(row) if row is not None else None
+
+    def put_many(self, records):
+        """Insert or replace records in a single transaction"""
+        records = list(records)
+        if not records:
+            return 0
+        names = ("target_id", "input_hash", "extractor_version", "created_at", "transit_detected") \
+            + FEATURE_COLUMNS + ("view_length", "view")
+        now = time.time()
+        values = [tuple(now if name == "created_at" else record.get(name) for name in names) for record in records]
+        with self._connect() as conn:
+            conn.executemany(f"INSERT OR REPLACE INTO features ({', '.join(names)}) "
+                             f"VALUES ({', '.join('?' * len(names))})", values)
+        return len(values)
+
+    def _latest(self, select, version, target_ids):
+        """Latest row per target for a version, optionally restricted to target_ids"""
+        conn = self._connect()
+        query = (f"SELECT {select} FROM features WHERE extractor_version = ? AND rowid IN "
+                 "(SELECT MAX(rowid) FROM features WHERE extractor_version = ? GROUP BY target_id)")
+        if target_ids is None:
+            return conn.execute(query + " ORDER BY target_id", (version, version)).fetchall()
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (target_id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM wanted")
+            conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((str(t),) for t in target_ids))
+        return conn.execute(query + " AND target_id IN (SELECT target_id FROM wanted) ORDER BY target_id",
+                            (version, version)).fetchall()
+
+    def read_features(self, version, columns=FEATURE_COLUMNS, target_ids=None):
+        """
+        Vectorized read of the latest features per target.
+
+        Returns:
+            tuple: (target IDs, float64 matrix of shape (n, len(columns))).
+        """
+        unknown = set(columns) - set(FEATURE_COLUMNS) - {"transit_detected"}
+        if unknown:
+            raise ValueError(f"Unknown feature columns: {sorted(unknown)}")
+        rows = self._latest(", ".join(("target_id",) + tuple(columns)), version, target_ids)
+        ids = [row[0] for row in rows]
+        matrix = np.array([tuple(row)[1:] for row in rows], dtype=np.float64).reshape(len(rows), len(columns))
+        return ids, matrix
+
+    def read_views(self, version, target_ids=None):
+        """
+        Latest stored CNN views per target (targets without a view are skipped).
+
+        Returns:
+            tuple: (target IDs, float32 matrix of shape (n, view_length)).
+        """
+        rows = [row for row in self._latest("target_id, view_length, view", version, target_ids)
+                if row[2] is not None]
+        if not rows:
+            return [], np.empty((0, 0), dtype=np.float32)
+        lengths = {row[1] for row in rows}
+        if len(lengths) > 1:
+            raise ValueError(f"Stored views have mixed lengths {sorted(lengths)}")
+        views = np.frombuffer(b"".join(row[2] for row in rows), dtype=np.float32).reshape(len(rows), lengths.pop())
+        return [row[0] for row in rows], views
+
+    def invalidate(self, keep_version):
+        """Delete rows written by any other extractor version; returns the count removed"""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM features WHERE extractor_version != ?", (keep_version,)).rowcount
+
+    def stats(self):
+        """Row and target counts per extractor version"""
+        rows = self._connect().execute(
+            "SELECT extractor_version, COUNT(*), COUNT(DISTINCT target_id), MAX(created_at) "
+            "FROM features GROUP BY extractor_version").fetchall()
+        return {row[0]: {"rows": row[1], "targets": row[2], "updated_at": row[3]} for row in rows}
+
+
+def main(argv=None):
+    """Inspect or prune a feature store: python -m utils.feature_store [--prune]"""
+    parser = argparse.ArgumentParser(description="Inspect or prune the extracted feature store")
+    parser.add_argument("--db", default=DEFAULT_FEATURE_STORE, help="SQLite feature store path")
+    parser.add_argument("--prune", action="store_true", help="Delete rows from other extractor versions")
+    args = parser.parse_args(argv)
+
+    from utils.feature_extractor import LightCurveProcessor
+
+    store = FeatureStore(args.db)
+    current = extractor_version(LightCurveProcessor())
+    if args.prune:
+        print(f"🧹 Removed {store.invalidate(current)} stale rows")
+    for version, info in sorted(store.stats().items()):
+        marker = " (current)" if version == current else ""
+        print(f"{version}{marker}: {info['rows']} rows, {info['targets']} targets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+# utils/incremental.py - Incremental BLS re-analysis for light curves that grow over time
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, perf_counter
+
+import numpy as np
+
+from utils.bls_engine import BLSEngine, BLSResult
+from utils.pipeline import DETECTION_SNR, EMPTY_BLS_FEATURES, preprocess
+
+# Cleaned points this close to the newest cadence are re-detrended on the next append, with as much
+# raw history again kept before them as context; covers windowed detrending (utils.detrend's 0.5-day
+# window) so older points match a full run
+DETREND_CONTEXT_DAYS = 1.0
+# Rebuild the period grid once the baseline has grown by this factor: until then the frequency
+# spacing is at most REGRID_GROWTH**2 (1.21x) coarser than a full run's and periods beyond
+# baseline / (2 * REGRID_GROWTH) are not searched
+REGRID_GROWTH = 1.1
+# Bounds on IncrementalMonitor state: targets kept, their total state size, and idle lifetime
+MAX_MONITORED_TARGETS = int(os.environ.get("CELESTIAL_MONITOR_TARGETS", "256"))
+MAX_MONITOR_BYTES = int(float(os.environ.get("CELESTIAL_MONITOR_MB", "2048")) * 2**20)
+MONITOR_TTL_S = float(os.environ.get("CELESTIAL_MONITOR_TTL_S", str(24 * 3600)))
+
+
+class MonitorCapacityError(RuntimeError):
+    """A single target's monitoring state does not fit the monitor's byte budget"""
+
+
+class IncrementalBLS:
+    """
+    BLS search whose folded state is updated in place as cadences arrive.
+
+    For every trial period the engine's phase-binned counts and flux sums
+    are kept; new samples are folded and added into them, so an update costs
+    O(new samples x periods) plus one scan of the folded grid, independent of
+    how long the history is. The BLS score only depends on flux differences,
+    so flux is stored relative to a fixed reference and the running totals
+    N, S and sum of squares give the same result as a full search.
+
+    The period grid is fixed when built and rebuilt (re-folding the binned
+    history) once the baseline grows by ``regrid_growth``, since longer
+    baselines need finer frequency spacing and longer maximum periods.
+    Folding is linear in the samples, so ``retract()`` removes samples
+    ingested earlier (to replace them with re-cleaned values).
+    """
+
+    def __init__(self, engine=None, regrid_growth=REGRID_GROWTH):
+        self.engine = engine or BLSEngine()
+        self.regrid_growth = regrid_growth
+        self.t_ref = None
+        self.y_ref = 0.0
+        self.t_min = self.t_max = None
+        self.N = self.S = self.SS = 0.0
+        # Time-binned history, used only when the grid is rebuilt
+        self._hist = []
+        self._grid = None
+        self.regrids = 0
+
+    @property
+    def n_points(self):
+        return int(self.N)
+
+    @property
+    def baseline(self):
+        return 0.0 if self.t_min is None else self.t_max - self.t_min
+
+    @property
+    def state_bytes(self):
+        """Memory held by the folded grids and binned history"""
+        grid_bytes = 0
+        if self._grid:
+            grid_bytes = sum(counts.nbytes + sums.nbytes for counts, sums, _ in self._grid["folded"])
+        return grid_bytes + sum(t.nbytes + n.nbytes + y.nbytes for t, n, y in self._hist)
+
+    def _width(self, durations):
+        return self.engine.bin_duration(durations) * self.engine.time_bin_fraction if durations else 0.0
+
+    def _history(self):
+        """Concatenate and re-bin the history into one (t, n, y) chunk"""
+        if len(self._hist) > 1:
+            t, n, y = (np.concatenate(parts) for parts in zip(*self._hist))
+            width = self._width(self._grid["durations"]) if self._grid else 0.0
+            with np.errstate(invalid="ignore", divide="ignore"):
+                t, n, y = self.engine.bin_samples(t, n, y, width)
+            # Bins whose samples were all retracted
+            kept = np.abs(n) > 0.5
+            self._hist = [(t[kept], n[kept], y[kept])]
+        return self._hist[0]
+
+    def _fold_blocks(self, t, n, y):
+        grid = self._grid
+        prepared = {"t": t, "n": n, "y": y}
+        return [self.engine.fold(prepared, grid["periods"][i:j], grid["bin_duration"], grid["n_ext"])
+                for i, j in grid["blocks"]]
+
+    def _regrid(self):
+        engine = self.engine
+        durations = engine.usable_durations(self.baseline)
+        periods = engine.baseline_period_grid(self.baseline, durations)
+        if len(periods) == 0:
+            self._grid = None
+            return
+        bin_duration = engine.bin_duration(durations)
+        dur_bins = sorted({max(1, int(round(d / bin_duration))) for d in durations})
+        self._grid = {
+            "durations": durations, "baseline": self.baseline, "periods": periods,
+            "bin_duration": bin_duration, "dur_bins": dur_bins, "n_ext": max(dur_bins),
+        }
+        t, n, y = self._history()
+        self._grid["blocks"] = engine.plan_blocks(periods, bin_duration, max(dur_bins), len(t))
+        self._grid["folded"] = self._fold_blocks(t, n, y)
+        self.regrids += 1
+
+    def update(self, time, flux):
+        """
+        Fold new cadences into the state and return the refreshed BLSResult.
+
+        Args:
+            time (np.ndarray): New observation times in days.
+            flux (np.ndarray): New flux measurements.
+        """
+        time = np.asarray(time, dtype=np.float64)
+        flux = np.asarray(flux, dtype=np.float64)
+        keep = np.isfinite(time) & np.isfinite(flux)
+        time, flux = time[keep], flux[keep]
+        if len(time):
+            if self.t_ref is None:
+                self.t_ref = float(time.min())
+                self.y_ref = float(flux.mean())
+                self.t_min = self.t_max = self.t_ref
+            self.t_min = min(self.t_min, float(time.min()))
+            self.t_max = max(self.t_max, float(time.max()))
+            self._ingest(time, flux, 1.0)
+
+            grid = self._grid
+            stale = (grid is None or self.baseline > grid["baseline"] * self.regrid_growth
+                     or self.engine.usable_durations(self.baseline) != grid["durations"])
+            if stale and self.N >= 10:
+                self._regrid()
+        return self.result()
+
+    def retract(self, time, flux):
+        """Remove samples previously passed to ``update()`` (same times and flux) from the state"""
+        time = np.asarray(time, dtype=np.float64)
+        flux = np.asarray(flux, dtype=np.float64)
+        keep = np.isfinite(time) & np.isfinite(flux)
+        if self.t_ref is not None and keep.any():
+            self._ingest(time[keep], flux[keep], -1.0)
+
+    def _ingest(self, time, flux, weight):
+        """Add (weight 1) or remove (weight -1) samples from the totals, history and folded grid"""
+        y = flux - self.y_ref
+        self.N += weight * len(y)
+        self.S += weight * float(y.sum())
+        self.SS += weight * float(np.dot(y, y))
+
+        width = self._width(self._grid["durations"]) if self._grid else 0.0
+        t, n, y = self.engine.bin_samples(time - self.t_ref, np.full(len(y), weight), weight * y, width)
+        self._hist.append((t, n, y))
+        if self._grid is not None:
+            for (counts, sums, _), (new_counts, new_sums, _) in zip(self._grid["folded"], self._fold_blocks(t, n, y)):
+                counts += new_counts
+                sums += new_sums
+
+    def result(self):
+        """BLSResult over the current grid and folded state"""
+        grid = self._grid
+        if grid is None:
+            empty = np.empty(0)
+            return BLSResult(empty, empty, empty, empty, empty, empty)
+
+        N, S = self.N, self.S
+        sigma2 = (self.SS - S * S / N) / N or 1.0
+
+        def evaluate(block):
+            (i, j), (counts, sums, n_bins) = block
+            return self.engine.evaluate(counts, sums, n_bins, grid["periods"][i:j], grid["dur_bins"],
+                                        grid["bin_duration"], N, S, sigma2)
+
+        blocks = list(zip(grid["blocks"], grid["folded"]))
+        if self.engine.n_workers > 1 and len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=self.engine.n_workers) as pool:
+                parts = list(pool.map(evaluate, blocks))
+        else:
+            parts = [evaluate(block) for block in blocks]
+        power, depth, snr, duration, t0 = (np.concatenate(col) for col in zip(*parts))
+        return BLSResult(grid["periods"], power, depth, snr, duration, t0 + self.t_ref,
+                         evaluations=len(grid["periods"]) * len(grid["dur_bins"]), stats={"mode": "incremental"})
+
+
+class IncrementalLightCurve:
+    """
+    Per-target monitoring state: preprocessing context plus an IncrementalBLS.
+
+    Appended cadences are preprocessed together with the last
+    ``2 * context_days`` of raw history. Cleaned points within
+    ``context_days`` of the previous newest cadence were detrended without
+    the cadences that follow them, so they are retracted from the BLS state
+    and re-ingested with their new values along with the new points. With a
+    windowed detrend whose half-window is at most ``context_days``, only the
+    points within ``context_days`` of the newest cadence then differ from a
+    full run (besides knot placement and the robust clipping scale).
+    """
+
+    def __init__(self, processor, engine=None, context_days=DETREND_CONTEXT_DAYS, regrid_growth=REGRID_GROWTH):
+        self.processor = processor
+        self.context_days = context_days
+        self.bls = IncrementalBLS(engine, regrid_growth)
+        self._tail_time = np.empty(0)
+        self._tail_flux = np.empty(0)
+        self._last_clean_time = -np.inf
+        # Cleaned points ingested within context_days of the newest one, re-detrended on the next append
+        self._seam_time = np.empty(0)
+        self._seam_flux = np.empty(0)
+        self._lock = threading.Lock()
+
+    @property
+    def state_bytes(self):
+        """Memory held by the BLS state, the raw preprocessing context and the seam"""
+        return (self.bls.state_bytes + self._tail_time.nbytes + self._tail_flux.nbytes
+                + self._seam_time.nbytes + self._seam_flux.nbytes)
+
+    def append(self, time, flux):
+        """
+        Ingest new cadences and return refreshed detection results.
+
+        Returns:
+            dict: period, transit_detected, bls_features, n_points, n_new,
+            n_regrids and elapsed_s.
+        """
+        start = perf_counter()
+        time = np.asarray(time, dtype=np.float64)
+        flux = np.asarray(flux, dtype=np.float64)
+        with self._lock:
+            raw_time = np.concatenate((self._tail_time, time))
+            raw_flux = np.concatenate((self._tail_flux, flux))
+            order = np.argsort(raw_time, kind="stable")
+            raw_time, raw_flux = raw_time[order], raw_flux[order]
+
+            clean_time, clean_flux = preprocess(self.processor, raw_time, raw_flux)
+            new = clean_time > self._last_clean_time
+            if new.any():
+                # Replace the seam's earlier values with ones detrended alongside the new cadences
+                self.bls.retract(self._seam_time, self._seam_flux)
+                take = clean_time > self._last_clean_time - self.context_days
+                result = self.bls.update(clean_time[take], clean_flux[take])
+                self._last_clean_time = float(clean_time[new].max())
+                seam = take & (clean_time > self._last_clean_time - self.context_days)
+                self._seam_time, self._seam_flux = clean_time[seam], clean_flux[seam]
+            else:
+                result = self.bls.result()
+
+            finite = np.isfinite(raw_time)
+            if finite.any():
+                # Anchored on the newest ingested point, so the whole seam keeps its context
+                anchor = self._last_clean_time if np.isfinite(self._last_clean_time) else raw_time[finite].max()
+                recent = raw_time >= anchor - 2 * self.context_days
+                self._tail_time, self._tail_flux = raw_time[recent], raw_flux[recent]
+
+            features = result.best_features()
+            detected = features["bls_depth"] > 0 and features["bls_snr"] >= DETECTION_SNR
+            if not detected:
+                features = dict(EMPTY_BLS_FEATURES)
+            return {
+                "period": features["bls_period"],
+                "transit_detected": detected,
+                "bls_features": features,
+                "n_points": self.bls.n_points,
+                "n_new": int(new.sum()),
+                "n_regrids": self.bls.regrids,
+                "elapsed_s": round(perf_counter() - start, 4),
+            }
+
+
+class IncrementalMonitor:
+    """
+    Holds IncrementalLightCurve state for many targets.
+
+    State is bounded: targets idle for longer than ``ttl_s`` expire, and the
+    least recently updated targets are evicted once more than
+    ``max_targets`` are held or their combined state exceeds ``max_bytes``.
+    """
+
+    def __init__(self, processor, max_targets=MAX_MONITORED_TARGETS, max_bytes=MAX_MONITOR_BYTES,
+                 ttl_s=MONITOR_TTL_S, **kwargs):
+        self.processor = processor
+        self.max_targets = max_targets
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.kwargs = kwargs
+        # target_id -> [state, state bytes, last update], least recently updated first
+        self._targets = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __contains__(self, target_id):
+        return target_id in self._targets
+
+    def __len__(self):
+        return len(self._targets)
+
+    @property
+    def state_bytes(self):
+        with self._lock:
+            return sum(entry[1] for entry in self._targets.values())
+
+    def _expire(self, now):
+        while self._targets:
+            target_id, (_, _, last) = next(iter(self._targets.items()))
+            if now - last <= self.ttl_s:
+                break
+            del self._targets[target_id]
+            self.evictions += 1
+
+    def state(self, target_id):
+        with self._lock:
+            now = monotonic()
+            self._expire(now)
+            entry = self._targets.get(target_id)
+            if entry is None:
+                while len(self._targets) >= self.max_targets:
+                    self._targets.popitem(last=False)
+                    self.evictions += 1
+                entry = self._targets[target_id] = [IncrementalLightCurve(self.processor, **self.kwargs), 0, now]
+            entry[2] = now
+            self._targets.move_to_end(target_id)
+            return entry[0]
+
+    def _account(self, target_id, state):
+        """Record a target's new size, evicting other targets until the total fits max_bytes"""
+        size = state.state_bytes
+        with self._lock:
+            entry = self._targets.get(target_id)
+            if entry is None or entry[0] is not state:
+                return  # evicted or replaced while appending
+            entry[1] = size
+            total = sum(e[1] for e in self._targets.values())
+            for other in list(self._targets):
+                if total <= self.max_bytes:
+                    return
+                if other != target_id:
+                    total -= self._targets.pop(other)[1]
+                    self.evictions += 1
+            if total > self.max_bytes:
+                del self._targets[target_id]
+                self.evictions += 1
+                raise MonitorCapacityError(
+                    f"Monitoring state for {target_id!r} ({size / 2**20:.0f} MiB) exceeds the "
+                    f"{self.max_bytes / 2**20:.0f} MiB monitor budget")
+
+    def append(self, target_id, time, flux):
+        """
+        Append cadences to a target (creating its state on first use).
+
+        Raises:
+            MonitorCapacityError: If the target alone outgrows max_bytes; its
+                state is dropped.
+        """
+        state = self.state(target_id)
+        result = state.append(time, flux)
+        self._account(target_id, state)
+        return result
+
+    def drop(self, target_id):
+        """Forget a target; returns whether it was being monitored"""
+        with self._lock:
+            return self._targets.pop(target_id, None) is not None
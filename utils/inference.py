@@ -0,0 +1,155 @@
+# utils/inference.py - Classifier inputs and scoring for processed light curves
+from contextlib import nullcontext
+
+import numpy as np
+
+from utils.precision import absolute_time
+
+# Order of the tabular features fed to the XGBoost model
+FEATURE_NAMES = ("bls_period", "bls_depth", "bls_snr", "bls_power")
+
+# Length of the phase-folded view used when the CNN input shape is unknown
+DEFAULT_VIEW_LENGTH = 201
+
+# Rows per CNN call in predict_batch
+DEFAULT_BATCH_SIZE = 256
+
+
+def feature_vector(bls_features):
+    """Return the XGBoost feature row for one light curve"""
+    return np.array([bls_features.get(name, 0.0) for name in FEATURE_NAMES], dtype=np.float32)
+
+
+def cnn_view_length(classifier):
+    """Length of the 1-D view the CNN expects"""
+    model = getattr(classifier, "cnn_model", None)
+    shape = getattr(model, "input_shape", None)
+    if shape and len(shape) > 1 and shape[1]:
+        return int(shape[1])
+    return DEFAULT_VIEW_LENGTH
+
+
+def light_curve_view(time, flux, period, t0=0.0, length=DEFAULT_VIEW_LENGTH):
+    """
+    Bin a light curve into a fixed-length, median-normalised 1-D view.
+
+    Detected signals are phase-folded with the transit centred; otherwise the
+    series is binned in time.
+    """
+    time = np.asarray(time, dtype=np.float64)
+    flux = np.asarray(flux, dtype=np.float64)
+    if len(time) == 0:
+        return np.zeros(length, dtype=np.float32)
+    if period > 0:
+        position = np.mod(time - t0 + 0.5 * period, period) / period
+    else:
+        span = time.max() - time.min()
+        position = (time - time.min()) / span if span > 0 else np.zeros_like(time)
+    idx = np.minimum((position * length).astype(np.int64), length - 1)
+    counts = np.bincount(idx, minlength=length)
+    sums = np.bincount(idx, weights=flux, minlength=length)
+    view = np.full(length, np.median(flux))
+    filled = counts > 0
+    view[filled] = sums[filled] / counts[filled]
+    view = view / np.median(view) - 1.0
+    return view.astype(np.float32)
+
+
+def _xgb_probabilities(model, features):
+    """One vectorized XGBoost call for the whole feature matrix"""
+    if hasattr(model, "predict_proba"):
+        return np.asarray(model.predict_proba(features))[:, 1]
+    import xgboost as xgb
+    # Boosters trained with named features (models/parallel_training.py) reject unnamed input,
+    # and unnamed ones reject named input, so pass whatever names the model was trained with
+    names = getattr(model, "feature_names", None)
+    names = list(names) if names and len(names) == features.shape[1] else None
+    return np.asarray(model.predict(xgb.DMatrix(features, feature_names=names)))
+
+
+def _cnn_probabilities(model, views, batch_size):
+    """
+    Run the CNN over views in fixed-size chunks.
+
+    ``predict_on_batch`` skips the data-adapter and callback setup that
+    ``predict`` pays on every call, which dominates for small inputs.
+    """
+    run = getattr(model, "predict_on_batch", None)
+    parts = []
+    for start in range(0, len(views), batch_size):
+        chunk = views[start:start + batch_size]
+        out = run(chunk) if run is not None else model.predict(chunk, verbose=0)
+        parts.append(np.ravel(np.asarray(out)))
+    return np.concatenate(parts)
+
+
+def model_inputs(classifier, result):
+    """Return the (feature row, CNN view) pair for one processed light curve"""
+    bls_features = result["bls_features"]
+    view = light_curve_view(absolute_time(result), result["flux"], bls_features["bls_period"],
+                            bls_features.get("bls_t0", 0.0), cnn_view_length(classifier))
+    return feature_vector(bls_features), view
+
+
+def score_light_curve(classifier, result):
+    """
+    Score one processed light curve with the classifier's models.
+
+    Returns:
+        tuple: (xgb_proba, cnn_proba, ensemble_proba); NaN where a model is
+        not loaded.
+    """
+    features, view = model_inputs(classifier, result)
+    xgb_proba, cnn_proba, ensemble = predict_batch(classifier, features[None, :], view[None, :])
+    return float(xgb_proba[0]), float(cnn_proba[0]), float(ensemble[0])
+
+
+def _stage(profile, name):
+    return profile.stage(name) if profile is not None else nullcontext()
+
+
+def predict_batch(classifier, features, views=None, batch_size=DEFAULT_BATCH_SIZE, profile=None):
+    """
+    Score many light curves with one XGBoost call and chunked CNN calls.
+
+    Args:
+        classifier: Object exposing ``xgb_model`` and/or ``cnn_model``.
+        features (np.ndarray): (N, len(FEATURE_NAMES)) feature matrix.
+        views (np.ndarray): (N, length) or (N, length, 1) phase-folded or
+            binned views for the CNN; may be None when only XGBoost is used.
+        batch_size (int): Rows per CNN forward pass.
+        profile (PipelineProfile): Optional profile receiving "xgboost" and
+            "cnn" stage timings.
+
+    Returns:
+        tuple: (xgb_proba, cnn_proba, ensemble_proba) float64 arrays of
+        length N; NaN where a model is not loaded.
+    """
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    if features.ndim != 2 or features.shape[1] != len(FEATURE_NAMES):
+        raise ValueError(f"features must have shape (N, {len(FEATURE_NAMES)}), got {features.shape}")
+    n = len(features)
+    xgb_proba = np.full(n, np.nan)
+    cnn_proba = np.full(n, np.nan)
+    if n == 0:
+        return xgb_proba, cnn_proba, np.full(0, np.nan)
+
+    xgb_model = getattr(classifier, "xgb_model", None)
+    if xgb_model is not None:
+        with _stage(profile, "xgboost"):
+            xgb_proba = _xgb_probabilities(xgb_model, features).astype(np.float64)
+
+    cnn_model = getattr(classifier, "cnn_model", None)
+    if cnn_model is not None and views is not None:
+        views = np.ascontiguousarray(views, dtype=np.float32)
+        if views.ndim == 2:
+            views = views[:, :, None]
+        if len(views) != n:
+            raise ValueError(f"Got {n} feature rows but {len(views)} views")
+        with _stage(profile, "cnn"):
+            cnn_proba = _cnn_probabilities(cnn_model, views, max(1, int(batch_size))).astype(np.float64)
+
+    stacked = np.vstack([xgb_proba, cnn_proba])
+    counts = np.sum(~np.isnan(stacked), axis=0)
+    ensemble = np.where(counts > 0, np.nansum(stacked, axis=0) / np.maximum(counts, 1), np.nan)
+    return xgb_proba, cnn_proba, ensemble
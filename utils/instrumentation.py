@@ -0,0 +1,186 @@
+# utils/instrumentation.py - Per-stage wall/CPU/RSS profiling and Prometheus metrics
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.model_registry import current_rss_bytes
+
+# RSS is sampled this often while a stage runs to catch its peak
+RSS_SAMPLE_INTERVAL = 0.01
+# Histogram buckets (seconds) for stage wall time
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger("celestial.metrics")
+if os.environ.get("CELESTIAL_METRICS_LOG"):
+    # One JSON object per line, e.g. for shipping to a log pipeline
+    _handler = logging.FileHandler(os.environ["CELESTIAL_METRICS_LOG"])
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+
+class _RssSampler:
+    """Background thread tracking the highest RSS seen while a stage runs"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.peak = current_rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+        return self.peak
+
+
+class PipelineProfile:
+    """
+    Wall time, CPU time and peak RSS for each stage of one analysis.
+
+    CPU time is process CPU (``time.process_time``), so it includes worker
+    threads a stage fans out to, and work from other concurrent requests.
+    """
+
+    def __init__(self, stages=None, sample_interval=RSS_SAMPLE_INTERVAL):
+        self.stages = {} if stages is None else stages
+        self.sample_interval = sample_interval
+
+    @contextmanager
+    def stage(self, name):
+        sampler = _RssSampler(self.sample_interval)
+        rss_start = sampler.peak
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak = sampler.stop()
+            previous = self.stages.get(name)
+            entry = {
+                "wall_s": round(wall, 6),
+                "cpu_s": round(cpu, 6),
+                "peak_rss_mb": round(peak / 2**20, 2),
+                "rss_delta_mb": round((current_rss_bytes() - rss_start) / 2**20, 2),
+            }
+            if previous:
+                # A stage entered twice (e.g. batched scoring) accumulates
+                entry["wall_s"] = round(entry["wall_s"] + previous["wall_s"], 6)
+                entry["cpu_s"] = round(entry["cpu_s"] + previous["cpu_s"], 6)
+                entry["peak_rss_mb"] = max(entry["peak_rss_mb"], previous["peak_rss_mb"])
+            self.stages[name] = entry
+
+    def merge_into(self, result):
+        """Add this profile's stages to ``result["profile"]`` (e.g. plotting after a cached run)"""
+        stages = dict(result.get("profile", {}).get("stages", {}))
+        stages.update(self.stages)
+        result["profile"] = PipelineProfile(stages).to_dict()
+
+    def to_dict(self):
+        """JSON-friendly summary: per-stage numbers plus totals"""
+        stages = {name: dict(entry) for name, entry in self.stages.items()}
+        return {
+            "stages": stages,
+            "wall_s": round(sum(entry["wall_s"] for entry in stages.values()), 6),
+            "cpu_s": round(sum(entry["cpu_s"] for entry in stages.values()), 6),
+            "peak_rss_mb": max((entry["peak_rss_mb"] for entry in stages.values()), default=0.0),
+        }
+
+
+class MetricsRegistry:
+    """Process-wide aggregates of stage profiles, rendered in Prometheus text format"""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stages = {}
+        self.analyses = 0
+        self._total_wall = 0.0
+        self._last = None
+
+    def observe(self, profile, **context):
+        """
+        Fold a finished profile into the aggregates and emit a structured log line.
+
+        Args:
+            profile (PipelineProfile): The finished profile.
+            **context: Extra fields for the log line (e.g. target_id, n_points).
+        """
+        summary = profile.to_dict()
+        with self._lock:
+            for name, entry in summary["stages"].items():
+                agg = self._stages.setdefault(name, {
+                    "count": 0, "wall_sum": 0.0, "cpu_sum": 0.0, "peak_rss": 0.0,
+                    "buckets": [0] * len(self.buckets),
+                })
+                agg["count"] += 1
+                agg["wall_sum"] += entry["wall_s"]
+                agg["cpu_sum"] += entry["cpu_s"]
+                agg["peak_rss"] = max(agg["peak_rss"], entry["peak_rss_mb"] * 2**20)
+                for i, bound in enumerate(self.buckets):
+                    if entry["wall_s"] <= bound:
+                        agg["buckets"][i] += 1
+            if "read" in summary["stages"] or "preprocess" in summary["stages"]:
+                self.analyses += 1
+                self._total_wall += summary["wall_s"]
+                self._last = summary
+        logger.info(json.dumps({"event": "pipeline_profile", "ts": round(time.time(), 3), **context, **summary}))
+
+    def summary(self):
+        """Average wall time and peak RSS over the analyses seen so far"""
+        with self._lock:
+            return {
+                "analyses": self.analyses,
+                "mean_wall_s": self._total_wall / self.analyses if self.analyses else None,
+                "peak_rss_mb": max((agg["peak_rss"] for agg in self._stages.values()), default=0.0) / 2**20,
+                "last": self._last,
+            }
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP celestial_stage_seconds Wall time of each pipeline stage.",
+            "# TYPE celestial_stage_seconds histogram",
+        ]
+        with self._lock:
+            stages = {name: dict(agg, buckets=list(agg["buckets"])) for name, agg in self._stages.items()}
+            analyses = self.analyses
+        for name, agg in sorted(stages.items()):
+            for bound, count in zip(self.buckets, agg["buckets"]):
+                lines.append(f'celestial_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'celestial_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {agg["count"]}')
+            lines.append(f'celestial_stage_seconds_sum{{stage="{name}"}} {agg["wall_sum"]:.6f}')
+            lines.append(f'celestial_stage_seconds_count{{stage="{name}"}} {agg["count"]}')
+        lines += ["# HELP celestial_stage_cpu_seconds_total Process CPU time spent in each stage.",
+                  "# TYPE celestial_stage_cpu_seconds_total counter"]
+        lines += [f'celestial_stage_cpu_seconds_total{{stage="{name}"}} {agg["cpu_sum"]:.6f}'
+                  for name, agg in sorted(stages.items())]
+        lines += ["# HELP celestial_stage_peak_rss_bytes Highest resident memory observed during each stage.",
+                  "# TYPE celestial_stage_peak_rss_bytes gauge"]
+        lines += [f'celestial_stage_peak_rss_bytes{{stage="{name}"}} {agg["peak_rss"]:.0f}'
+                  for name, agg in sorted(stages.items())]
+        lines += ["# HELP celestial_analyses_total Light curves analyzed by this process.",
+                  "# TYPE celestial_analyses_total counter",
+                  f"celestial_analyses_total {analyses}",
+                  "# HELP celestial_process_resident_memory_bytes Current resident memory.",
+                  "# TYPE celestial_process_resident_memory_bytes gauge",
+                  f"celestial_process_resident_memory_bytes {current_rss_bytes()}"]
+        return "\n".join(lines) + "\n"
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics():
+    """Return the process-wide metrics registry"""
+    return _metrics
@@ -0,0 +1,288 @@
+# utils/job_queue.py - Bounded analysis job queue shared by all UI sessions
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Concurrent analyses per server process, and jobs allowed to wait behind them
+JOB_WORKERS = int(os.environ.get("CELESTIAL_JOB_WORKERS", str(min(2, os.cpu_count() or 1))))
+MAX_QUEUED_JOBS = int(os.environ.get("CELESTIAL_JOB_QUEUE", "8"))
+# Active (queued or running) jobs one session may hold; a newer submission supersedes its oldest
+MAX_JOBS_PER_SESSION = 1
+# Finished jobs are kept this long for polling, then pruned
+JOB_TTL_SECONDS = 600
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when a job is rejected by the back-pressure limits"""
+
+
+class JobCancelled(RuntimeError):
+    """Raised when a job finished without a result because it was cancelled or superseded"""
+
+
+class Job:
+    """One submitted analysis; progress is updated from the worker thread"""
+
+    def __init__(self, key, session):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        # Sessions waiting on this job (identical uploads share one)
+        self.sessions = {session} if session is not None else set()
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    @property
+    def done(self):
+        return self.status not in ACTIVE
+
+    def report(self, progress, message=None):
+        """Progress callback handed to the job function"""
+        self.progress = max(self.progress, min(float(progress), 1.0))
+        if message:
+            self.message = message
+
+    def snapshot(self):
+        return {
+            "id": self.id, "status": self.status, "progress": self.progress, "message": self.message,
+            "error": None if self.error is None else str(self.error),
+            "submitted_at": self.submitted_at, "started_at": self.started_at, "finished_at": self.finished_at,
+        }
+
+
+class AnalysisJobQueue:
+    """
+    Runs analyses on a fixed thread pool with back-pressure.
+
+    Sessions submit a function and get a job ID back immediately, then poll
+    ``get()`` (or block in ``wait()``) for progress and the result. Jobs with
+    the same ``key`` (e.g. the result cache key of an upload) share one
+    execution, and once ``workers + max_queued`` jobs are active new
+    submissions are rejected with JobQueueFull instead of piling up behind
+    a heavy upload.
+
+    A session holds at most ``max_per_session`` active jobs: a submission
+    beyond that supersedes the session's oldest job (a Streamlit rerun
+    abandons the script run that was waiting on it). A superseded job no
+    other session shares is cancelled if still queued; a running one
+    finishes (filling the result cache) but no longer counts for the
+    session.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS, max_per_session=MAX_JOBS_PER_SESSION,
+                 ttl=JOB_TTL_SECONDS):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_per_session = max_per_session
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.done and job.finished_at and now - job.finished_at > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _active(self):
+        return [job for job in self._jobs.values() if not job.done]
+
+    def _supersede(self, session, keep):
+        """Detach a session from its oldest active jobs beyond max_per_session, ``keep`` included"""
+        held = sorted((job for job in self._active() if session in job.sessions and job is not keep),
+                      key=lambda job: job.submitted_at)
+        for job in held[:max(len(held) + 1 - self.max_per_session, 0)]:
+            job.sessions.discard(session)
+            if not job.sessions and job.status == QUEUED and job.future.cancel():
+                self._mark_cancelled(job, "Superseded")
+
+    @staticmethod
+    def _mark_cancelled(job, message):
+        job.status = CANCELLED
+        job.message = message
+        job.finished_at = time.time()
+
+    def submit(self, fn, key=None, session=None):
+        """
+        Queue ``fn(report)`` and return its job ID.
+
+        Args:
+            fn (callable): Called on a worker thread with a
+                ``report(progress, message)`` callback; its return value
+                becomes the job result.
+            key (str): Deduplication key; an active job with the same key is
+                returned instead of starting another.
+            session (str): Submitting session; its oldest active jobs beyond
+                ``max_per_session`` are superseded.
+
+        Raises:
+            JobQueueFull: If the queue is full.
+        """
+        with self._lock:
+            self._prune(time.time())
+            if key is not None:
+                for job in self._active():
+                    if job.key == key:
+                        if session is not None:
+                            self._supersede(session, keep=job)
+                            job.sessions.add(session)
+                        return job.id
+            if session is not None:
+                self._supersede(session, keep=None)
+            active = self._active()
+            if len(active) >= self.workers + self.max_queued:
+                raise JobQueueFull(f"Analysis queue is full ({len(active)} jobs active)")
+            job = Job(key, session)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job, fn)
+            return job.id
+
+    def _run(self, job, fn):
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.message = "Running"
+        try:
+            job.result = fn(job.report)
+            job.progress = 1.0
+            job.message = "Complete"
+            job.status = DONE
+        except Exception as e:
+            job.error = e
+            job.message = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        """Return the Job for an ID, or None if unknown or pruned"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id):
+        """Number of queued jobs submitted ahead of this one"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return 0
+            return sum(other.status == QUEUED and other.submitted_at < job.submitted_at
+                       for other in self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancel a job that hasn't started; returns True if it was cancelled"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED or not job.future.cancel():
+                return False
+            self._mark_cancelled(job, "Cancelled")
+            return True
+
+    def wait(self, job_id, on_progress=None, poll_interval=0.2, timeout=None):
+        """
+        Block until a job finishes, calling ``on_progress(job)`` while it runs.
+
+        Returns:
+            Job: The finished job (or the still-active job on timeout).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and not job.done:
+            if on_progress:
+                on_progress(job)
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            try:
+                job.future.result(timeout=poll_interval)
+            except Exception:
+                pass
+        return job
+
+    def stats(self):
+        with self._lock:
+            active = self._active()
+            return {
+                "workers": self.workers,
+                "running": sum(job.status == RUNNING for job in active),
+                "queued": sum(job.status == QUEUED for job in active),
+                "capacity": self.workers + self.max_queued,
+            }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide analysis job queue"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = AnalysisJobQueue()
+        return _queue
+
+
+def analyze_in_queue(queue, cache, processor, source, session, label="Analyzing", on_progress=None,
+                     max_planets=None, feature_path=None):
+    """
+    Analyze a light curve source on the job queue, through the result cache.
+
+    Identical inputs share one job across sessions, so the shared result is
+    copied (as LightCurveResultCache.get() copies) before it is returned:
+    callers may update its dicts without leaking into other sessions.
+
+    Args:
+        queue (AnalysisJobQueue): Queue to run the analysis on.
+        cache (LightCurveResultCache): Result cache consulted and filled.
+        processor (LightCurveProcessor): Processor for the pipeline.
+        source: Path, bytes or file-like light curve (see read_light_curve()).
+        session (str): Session ID, for the per-session job limit.
+        label (str): Status text shown while the job runs.
+        on_progress (callable): Called with (fraction, status text) while
+            the job waits or runs.
+        max_planets (int): Signals to search for (see process_light_curve_arrays()).
+        feature_path (str): Feature path (see utils.pipeline.resolve_feature_path()).
+
+    Raises:
+        JobQueueFull: If the queue rejects the job.
+        JobCancelled: If the job was cancelled, e.g. superseded by a newer
+            submission from the same session.
+    """
+    from utils.light_curve_io import source_blocks
+    from utils.pipeline import process_light_curve_source
+    from utils.result_cache import _copy_result, result_cache_key
+
+    key = result_cache_key(source_blocks(source), processor, max_planets, feature_path)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    def job(report):
+        result = process_light_curve_source(processor, source, progress=report, max_planets=max_planets,
+                                            feature_path=feature_path)
+        cache.put(key, result)
+        return result
+
+    def show(job):
+        if job.status == QUEUED:
+            text = f"⏳ Waiting for a free analysis worker ({queue.position(job.id)} ahead)"
+        else:
+            text = f"{label} ({job.message})"
+        on_progress(job.progress, text)
+
+    job = queue.wait(queue.submit(job, key=key, session=session), on_progress=show if on_progress else None)
+    if job.error is not None:
+        raise job.error
+    if job.status == CANCELLED:
+        raise JobCancelled(job.message)
+    return _copy_result(job.result)
@@ -0,0 +1,133 @@
+# utils/lazy_imports.py - Deferred heavy imports and startup import profiling
+import importlib
+import re
+import subprocess
+import sys
+import threading
+import time
+
+# Heavy modules worth importing off the main thread before first use
+HEAVY_MODULES = ("tensorflow", "xgboost", "plotly.graph_objects", "plotly.subplots")
+
+_import_times = {}
+_lock = threading.Lock()
+
+
+def _timed_import(name):
+    """Import a module, recording how long the first import took"""
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        _import_times.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+class LazyModule:
+    """Module proxy that performs the real import on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = _timed_import(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """Return a proxy for ``name`` that imports it when first used"""
+    return LazyModule(name)
+
+
+def lazy_callable(module_name, attr):
+    """Return a function that imports ``module_name`` and calls ``attr`` on first use"""
+    module = LazyModule(module_name)
+
+    def call(*args, **kwargs):
+        return getattr(module, attr)(*args, **kwargs)
+
+    call.__name__ = attr
+    call.__doc__ = f"Lazily imported {module_name}.{attr}"
+    return call
+
+
+def warm_up(modules=HEAVY_MODULES, then=None):
+    """
+    Import modules on a daemon thread so first use doesn't pay the cost.
+
+    Args:
+        modules (tuple): Module names to import; missing ones are skipped.
+        then (callable): Optional follow-up run on the same thread, e.g.
+            loading the models once their frameworks are imported.
+
+    Returns:
+        threading.Thread: The started warm-up thread.
+    """
+    def run():
+        for name in modules:
+            try:
+                _timed_import(name)
+            except ImportError:
+                pass
+        if then is not None:
+            try:
+                then()
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=run, name="celestial-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def import_times():
+    """Seconds spent on each lazily/warm-imported module in this process"""
+    with _lock:
+        return dict(_import_times)
+
+
+def profile_imports(modules, top=25):
+    """
+    Measure per-module import time in a fresh interpreter via ``-X importtime``.
+
+    Returns:
+        list: (module, self_seconds, cumulative_seconds) sorted by cumulative
+        time, at most ``top`` entries.
+    """
+    # Missing optional modules are skipped rather than aborting the profile
+    code = "\n".join(f"try:\n    import {name}\nexcept ImportError:\n    pass" for name in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True)
+    rows = []
+    pattern = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s+(.*)$")
+    for line in proc.stderr.splitlines():
+        match = pattern.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            rows.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows[:top]
+
+
+def main(argv=None):
+    """Print a startup import profile: python -m utils.lazy_imports [modules...]"""
+    argv = sys.argv[1:] if argv is None else argv
+    modules = argv or ["streamlit", "numpy", "pandas", *HEAVY_MODULES]
+    rows = profile_imports(modules)
+    print(f"{'module':<50} {'self (s)':>10} {'cumulative (s)':>15}")
+    for name, self_s, cumulative_s in rows:
+        print(f"{name:<50} {self_s:>10.3f} {cumulative_s:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
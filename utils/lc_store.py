@@ -0,0 +1,260 @@
+# utils/lc_store.py - Binary light curve store: one memory-mappable .npy per target
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+
+INDEX_FILE = "index.json"
+STORE_VERSION = 1
+
+
+def _safe_name(target_id):
+    """
+    Filesystem-safe file stem for a target ID (e.g. 'TIC 12345' -> 'TIC_12345-67ce1e33').
+
+    The readable part maps every unsafe character to '_', so IDs such as
+    'TIC 1', 'TIC_1' and 'TIC/1' share it; a short hash of the raw ID
+    keeps their files apart (and apart on case-insensitive filesystems).
+    """
+    target_id = str(target_id)
+    digest = hashlib.sha256(target_id.encode("utf-8")).hexdigest()[:8]
+    return f"{re.sub(r'[^A-Za-z0-9._-]', '_', target_id)}-{digest}"
+
+
+def _timestamp():
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _atomic_write(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def save_npy_light_curve(path, time, flux):
+    """Write time and flux as one (2, N) float64 .npy so each row maps contiguously"""
+    array = np.empty((2, len(time)), dtype=np.float64)
+    array[0] = time
+    array[1] = flux
+
+    def write(tmp_path):
+        with open(tmp_path, "wb") as fh:
+            np.save(fh, array)
+
+    _atomic_write(path, write)
+
+
+def load_npy_light_curve(path, mmap=True):
+    """
+    Load a (2, N) light curve .npy written by save_npy_light_curve().
+
+    With ``mmap`` the returned arrays are read-only views onto the file:
+    nothing is parsed or copied, and pages load on first access.
+    """
+    array = np.load(path, mmap_mode="r" if mmap else None)
+    if array.ndim != 2 or array.shape[0] != 2:
+        raise ValueError(f"{path} is not a (2, N) time/flux light curve array")
+    return array[0], array[1]
+
+
+def write_target(root, target_id, times, flux, source=None):
+    """
+    Write one target's .npy into a store directory without touching the index.
+
+    Used by put() and by producers in other processes (e.g. utils.synthetic),
+    which hand the returned entry back for LightCurveStore.register().
+
+    Returns:
+        dict: The index entry for the target.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    flux = np.asarray(flux, dtype=np.float64)
+    if times.shape != flux.shape or times.ndim != 1:
+        raise ValueError("time and flux must be 1-D arrays of the same length")
+    file_name = f"{_safe_name(target_id)}.npy"
+    save_npy_light_curve(os.path.join(root, file_name), times, flux)
+    return {
+        "file": file_name,
+        "n_points": int(len(times)),
+        "time_min": float(np.nanmin(times)) if len(times) else None,
+        "time_max": float(np.nanmax(times)) if len(times) else None,
+        "source": source,
+        "updated_at": _timestamp(),
+    }
+
+
+class LightCurveStore:
+    """
+    Directory of binary light curves indexed by target ID.
+
+    Each target is a ``<target>-<hash>.npy`` file holding a (2, N) float64 array
+    (time row, flux row); ``index.json`` maps target IDs to files and basic
+    metadata. Writes are atomic, so readers never see a partial file.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._index = self._read_index()
+
+    @staticmethod
+    def is_store(path):
+        return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+    def _index_path(self):
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _read_index(self):
+        try:
+            with open(self._index_path(), encoding="utf-8") as fh:
+                index = json.load(fh)
+        except FileNotFoundError:
+            return {}
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported light curve store version in {self.root}: {index.get('version')}")
+        return index["targets"]
+
+    def _write_index(self):
+        payload = {"version": STORE_VERSION, "targets": self._index}
+
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(payload, fh, indent=1, sort_keys=True)
+
+        _atomic_write(self._index_path(), write)
+
+    def refresh(self):
+        """Re-read the index, picking up targets written by other processes"""
+        with self._lock:
+            self._index = self._read_index()
+
+    def __contains__(self, target_id):
+        return str(target_id) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def targets(self):
+        return sorted(self._index)
+
+    def info(self, target_id):
+        return dict(self._index[str(target_id)])
+
+    def path(self, target_id):
+        """Absolute path of a target's .npy file"""
+        try:
+            return os.path.join(self.root, self._index[str(target_id)]["file"])
+        except KeyError:
+            raise KeyError(f"Target {target_id!r} is not in the light curve store {self.root}") from None
+
+    def put(self, target_id, times, flux, source=None):
+        """Store (or replace) a target's light curve"""
+        entry = write_target(self.root, target_id, times, flux, source)
+        self.register({target_id: entry})
+        return entry
+
+    def register(self, entries):
+        """Add entries from write_target() to the index with a single index write"""
+        with self._lock:
+            replaced = []
+            for target_id, entry in entries.items():
+                previous = self._index.get(str(target_id))
+                if previous is not None and previous["file"] != entry["file"]:
+                    replaced.append(previous["file"])  # written under an older naming scheme
+                self._index[str(target_id)] = entry
+            in_use = {entry["file"] for entry in self._index.values()}
+            replaced = [file_name for file_name in replaced if file_name not in in_use]
+            self._write_index()
+        for file_name in replaced:
+            try:
+                os.remove(os.path.join(self.root, file_name))
+            except OSError:
+                pass
+
+    def get(self, target_id, mmap=True):
+        """Return (time, flux) for a target, memory-mapped by default"""
+        return load_npy_light_curve(self.path(target_id), mmap=mmap)
+
+    def delete(self, target_id):
+        with self._lock:
+            entry = self._index.pop(str(target_id))
+            self._write_index()
+        os.remove(os.path.join(self.root, entry["file"]))
+
+    def import_file(self, path, target_id=None):
+        """Convert a CSV/FITS light curve into the store"""
+        from utils.light_curve_io import read_light_curve
+
+        target_id = target_id or os.path.splitext(os.path.basename(path))[0]
+        times, flux = read_light_curve(path)
+        return self.put(target_id, times, flux, source=os.path.abspath(path))
+
+
+def convert(inputs, root, skip_existing=True, progress=None):
+    """
+    Convert CSV/FITS light curves into a store.
+
+    Args:
+        inputs (list): (target_id, path) pairs, e.g. from utils.batch.discover_inputs().
+        root (str): Store directory.
+        skip_existing (bool): Leave targets already in the store untouched.
+        progress (callable): Called with (done, total, target_id, error).
+
+    Returns:
+        dict: Counts of converted, skipped and failed targets.
+    """
+    store = LightCurveStore(root)
+    summary = {"converted": 0, "skipped": 0, "error": 0}
+    for done, (target_id, path) in enumerate(inputs, 1):
+        error = None
+        if skip_existing and target_id in store:
+            summary["skipped"] += 1
+        else:
+            try:
+                store.import_file(path, target_id)
+                summary["converted"] += 1
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                summary["error"] += 1
+        if progress:
+            progress(done, len(inputs), target_id, error)
+    return summary
+
+
+def main(argv=None):
+    """Convert light curves into a binary store: python -m utils.lc_store INPUTS... -o STORE"""
+    from utils.batch import discover_inputs
+
+    parser = argparse.ArgumentParser(description="Convert CSV/FITS light curves into a binary store")
+    parser.add_argument("inputs", nargs="+", help="Directories, glob patterns or manifest files")
+    parser.add_argument("-o", "--output", required=True, help="Store directory")
+    parser.add_argument("--overwrite", action="store_true", help="Re-convert targets already in the store")
+    args = parser.parse_args(argv)
+
+    targets = []
+    for spec in args.inputs:
+        targets.extend(discover_inputs(spec))
+
+    def report(done, total, target_id, error):
+        status = "✅" if error is None else f"❌ {error}"
+        print(f"[{done}/{total}] {target_id} {status}", flush=True)
+
+    summary = convert(targets, args.output, skip_existing=not args.overwrite, progress=report)
+    print(f"📦 Store {args.output}: {summary['converted']} converted, {summary['skipped']} already present, "
+          f"{summary['error']} failed")
+    return 0 if summary["error"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
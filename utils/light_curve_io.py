@@ -0,0 +1,226 @@
+# utils/light_curve_io.py - Read light curves from paths, buffers and arrays
+import io
+import os
+
+import numpy as np
+
+LIGHT_CURVE_COLUMNS = ("time", "flux")
+# Rows parsed per chunk by the streaming CSV reader
+CHUNK_ROWS = 262_144
+# Ceiling on the decoded time+flux buffers of one light curve (bytes)
+MAX_LIGHT_CURVE_BYTES = int(os.environ.get("CELESTIAL_MAX_LC_BYTES", str(1 << 30)))
+# Bytes read at a time when hashing files and streams (see source_blocks())
+HASH_BLOCK_BYTES = 1 << 20
+
+
+FITS_SUFFIXES = (".fits", ".fit", ".fts", ".fits.gz", ".fit.gz")
+# Flux columns tried in order for TESS/Kepler light curve tables
+FITS_FLUX_COLUMNS = ("PDCSAP_FLUX", "SAP_FLUX", "FLUX")
+# Quality bits dropped by default (lightkurve's "default" bitmasks)
+QUALITY_BITMASKS = {"TESS": 175, "KEPLER": 1130799, "K2": 1130799}
+
+
+class LightCurveTooLarge(ValueError):
+    """Raised when a light curve would exceed the memory ceiling"""
+
+
+def _as_file_like(source):
+    """Wrap in-memory bytes in a file object without copying where possible"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def _from_array(source):
+    """Split an (N, 2) array, structured array or (time, flux) pair into columns"""
+    if isinstance(source, tuple) and len(source) == 2:
+        time, flux = source
+        return np.asarray(time, dtype=np.float64), np.asarray(flux, dtype=np.float64)
+    array = np.asarray(source)
+    if array.dtype.names:
+        return (np.asarray(array["time"], dtype=np.float64),
+                np.asarray(array["flux"], dtype=np.float64))
+    if array.ndim == 2 and array.shape[1] == 2:
+        return (np.asarray(array[:, 0], dtype=np.float64),
+                np.asarray(array[:, 1], dtype=np.float64))
+    if array.ndim == 2 and array.shape[0] == 2:
+        return np.asarray(array[0], dtype=np.float64), np.asarray(array[1], dtype=np.float64)
+    raise ValueError("Array light curves must be (N, 2), (2, N) or have 'time' and 'flux' fields")
+
+
+def is_fits(source):
+    """True if a path, buffer or upload holds a FITS file (by name or magic bytes)"""
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    if str(name).lower().endswith(FITS_SUFFIXES):
+        return True
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:6]) == b"SIMPLE"
+    if hasattr(source, "getbuffer"):
+        return bytes(source.getbuffer()[:6]) == b"SIMPLE"
+    return False
+
+
+def read_fits_light_curve(source, flux_column=None, quality_bitmask=None, hdu=1, max_bytes=MAX_LIGHT_CURVE_BYTES):
+    """
+    Read time and flux from a TESS/Kepler light curve FITS file.
+
+    Paths are opened memory-mapped, so only the pages holding the table
+    are read; in-memory uploads are parsed from their buffer without a copy.
+
+    Args:
+        source: Path, raw FITS bytes or a file-like object.
+        flux_column (str): Flux column; defaults to the first present of
+            PDCSAP_FLUX, SAP_FLUX, FLUX.
+        quality_bitmask (int): QUALITY bits to drop. None picks the mission
+            default from the TELESCOP header, 0 keeps every cadence.
+        hdu (int): Index of the light curve table extension.
+        max_bytes (int): Ceiling on the decoded time+flux buffers, checked
+            from the table's row count before they are built; None disables it.
+
+    Returns:
+        tuple: (time, flux) float64 NumPy arrays of the good cadences.
+
+    Raises:
+        LightCurveTooLarge: If the decoded buffers would exceed ``max_bytes``.
+    """
+    from astropy.io import fits
+
+    if isinstance(source, (str, os.PathLike)):
+        handle = source
+    elif hasattr(source, "getbuffer"):
+        handle = io.BytesIO(source.getbuffer())
+    else:
+        handle = _as_file_like(source)
+
+    with fits.open(handle, memmap=True, lazy_load_hdus=True) as hdul:
+        table = hdul[hdu]
+        data = table.data
+        names = [name.upper() for name in data.columns.names]
+        if flux_column is None:
+            flux_column = next((name for name in FITS_FLUX_COLUMNS if name in names), None)
+        if flux_column is None or "TIME" not in names:
+            raise ValueError(f"FITS table has no TIME/flux columns (found: {', '.join(names)})")
+        n_rows = len(data)
+        if max_bytes is not None and n_rows * 2 * np.dtype(np.float64).itemsize > max_bytes:
+            raise LightCurveTooLarge(
+                f"Light curve exceeds the {max_bytes / 2**20:.0f} MiB ingest limit ({n_rows:,} rows)")
+
+        time = np.asarray(data["TIME"], dtype=np.float64)
+        flux = np.asarray(data[flux_column], dtype=np.float64)
+        keep = np.isfinite(time)
+        if "QUALITY" in names:
+            if quality_bitmask is None:
+                telescope = str(hdul[0].header.get("TELESCOP", table.header.get("TELESCOP", ""))).upper()
+                quality_bitmask = QUALITY_BITMASKS.get(telescope, QUALITY_BITMASKS["TESS"])
+            if quality_bitmask:
+                keep &= (np.asarray(data["QUALITY"]) & quality_bitmask) == 0
+    if keep.all():
+        return time, flux
+    return time[keep], flux[keep]
+
+
+def iter_light_curve_chunks(source, columns=LIGHT_CURVE_COLUMNS, flux_dtype=np.float64, chunk_rows=CHUNK_ROWS):
+    """
+    Parse a CSV source chunk by chunk, yielding (time, flux) NumPy arrays.
+
+    Only the two requested columns are parsed, straight into numeric
+    dtypes, so no object columns or whole-file DataFrames are built.
+    """
+    import pandas as pd
+
+    handle = source if isinstance(source, (str, os.PathLike)) else _as_file_like(source)
+    time_col, flux_col = columns
+    dtypes = {time_col: np.float64, flux_col: flux_dtype}
+    with pd.read_csv(handle, usecols=list(columns), dtype=dtypes, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            yield chunk[time_col].to_numpy(), chunk[flux_col].to_numpy()
+
+
+def read_light_curve_chunked(source, columns=LIGHT_CURVE_COLUMNS, flux_dtype=np.float64,
+                             chunk_rows=CHUNK_ROWS, max_bytes=MAX_LIGHT_CURVE_BYTES):
+    """
+    Stream a CSV light curve into contiguous NumPy buffers.
+
+    Args:
+        source: Path, raw CSV bytes or a file-like object.
+        columns (tuple): Names of the time and flux columns.
+        flux_dtype: np.float64 or np.float32 for the flux buffer. Time is
+            always float64; float32 can't resolve minutes at BJD offsets.
+        chunk_rows (int): Rows parsed per chunk.
+        max_bytes (int): Ceiling on the decoded buffers; None disables it.
+
+    Returns:
+        tuple: (time, flux) NumPy arrays.
+
+    Raises:
+        LightCurveTooLarge: If the decoded buffers would exceed ``max_bytes``.
+    """
+    row_bytes = np.dtype(np.float64).itemsize + np.dtype(flux_dtype).itemsize
+    times, fluxes = [], []
+    n_rows = 0
+    for time, flux in iter_light_curve_chunks(source, columns, flux_dtype, chunk_rows):
+        n_rows += len(time)
+        if max_bytes is not None and n_rows * row_bytes > max_bytes:
+            raise LightCurveTooLarge(
+                f"Light curve exceeds the {max_bytes / 2**20:.0f} MiB ingest limit after {n_rows:,} rows")
+        times.append(time)
+        fluxes.append(flux)
+    if not times:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=flux_dtype)
+    if len(times) == 1:
+        return times[0], fluxes[0]
+    return np.concatenate(times), np.concatenate(fluxes)
+
+
+def read_light_curve(source, columns=LIGHT_CURVE_COLUMNS, flux_dtype=np.float64, max_bytes=MAX_LIGHT_CURVE_BYTES):
+    """
+    Read time and flux columns from any supported light curve source.
+
+    Args:
+        source: Path (CSV, FITS or light curve store .npy), raw CSV or FITS
+            bytes, a file-like object (e.g. a Streamlit UploadedFile), a
+            NumPy array or a (time, flux) tuple.
+        columns (tuple): Names of the time and flux columns in CSV input.
+        flux_dtype: Flux dtype for CSV input (np.float64 or np.float32).
+        max_bytes (int): Memory ceiling for CSV and FITS input, see read_light_curve_chunked().
+
+    Returns:
+        tuple: (time, flux) NumPy arrays.
+    """
+    if isinstance(source, (tuple, np.ndarray)):
+        return _from_array(source)
+    if isinstance(source, (str, os.PathLike)) and str(source).endswith(".npy"):
+        from utils.lc_store import load_npy_light_curve
+
+        return load_npy_light_curve(source)
+    if is_fits(source):
+        return read_fits_light_curve(source, max_bytes=max_bytes)
+    return read_light_curve_chunked(source, columns, flux_dtype=flux_dtype, max_bytes=max_bytes)
+
+
+def source_blocks(source, block_size=HASH_BLOCK_BYTES):
+    """
+    Yield the raw bytes of a source in blocks, for hashing.
+
+    Files and streams are read ``block_size`` bytes at a time so a large
+    light curve is never held in memory whole; in-memory buffers and arrays
+    are yielded as they are, without a copy.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fh:
+            yield from iter(lambda: fh.read(block_size), b"")
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield source
+    elif hasattr(source, "getbuffer"):
+        yield source.getbuffer()
+    elif isinstance(source, tuple):
+        for part in source:
+            yield np.ascontiguousarray(part, dtype=np.float64).data
+    elif isinstance(source, np.ndarray):
+        yield np.ascontiguousarray(source).data
+    else:
+        source.seek(0)
+        yield from iter(lambda: source.read(block_size), b"")
+        source.seek(0)
@@ -0,0 +1,218 @@
+# utils/model_registry.py - Process-wide model cache
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Model artifacts loaded by ExoplanetClassifier.load_models()
+DEFAULT_ARTIFACTS = ("models/xgb_model.pkl", "models/cnn_model.h5")
+# Written next to retrained artifacts by models/parallel_training.py; records the feature path
+# (utils.pipeline.FEATURE_PATHS) the models were trained on. Models without one are the shipped
+# models, trained on the processor's extraction
+MODEL_METADATA = "models/model_metadata.json"
+# A failed load is retried on a later get_classifier() after this delay (seconds), doubling per
+# consecutive failure up to LOAD_RETRY_MAX
+LOAD_RETRY_DELAY = float(os.environ.get("CELESTIAL_MODEL_RETRY_S", "1.0"))
+LOAD_RETRY_MAX = 60.0
+
+
+def read_model_metadata(path):
+    """Return the metadata dict stored with a set of models ({} if there is none)"""
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def current_rss_bytes():
+    """Return the resident set size of this process in bytes (0 if unknown)"""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except (ImportError, AttributeError):
+        return 0
+
+
+class ModelRegistry:
+    """Loads each model artifact once per process and shares it across sessions"""
+
+    def __init__(self, artifacts=DEFAULT_ARTIFACTS, metadata=MODEL_METADATA):
+        # The metadata file is watched like an artifact, so promoting new models reloads both
+        self.artifacts = tuple(artifacts) + ((metadata,) if metadata else ())
+        self.metadata = metadata
+        self._lock = threading.Lock()
+        self._classifier = None
+        self._metadata = {}
+        self._fingerprint = None
+        self._failures = 0
+        self._retry_at = None
+        self._warm_thread = None
+        self._stats = {
+            "loaded": False,
+            "load_count": 0,
+            "load_seconds": 0.0,
+            "memory_bytes": 0,
+            "loaded_at": None,
+            "error": None,
+            "failures": 0,
+            "feature_path": None,
+            "artifacts": {},
+        }
+
+    def _artifact_hashes(self):
+        """Hash every artifact that exists on disk"""
+        hashes = {}
+        for path in self.artifacts:
+            hashes[path] = file_sha256(path) if os.path.exists(path) else None
+        return hashes
+
+    def _artifacts_changed(self):
+        """Cheap mtime/size check before falling back to content hashes"""
+        if self._fingerprint is None:
+            return True
+        for path in self.artifacts:
+            known = self._fingerprint.get(path)
+            if not os.path.exists(path):
+                if known is not None:
+                    return True
+                continue
+            if known is None:
+                return True
+            stat = os.stat(path)
+            if (stat.st_mtime_ns, stat.st_size) != known["stat"]:
+                if file_sha256(path) != known["sha256"]:
+                    return True
+                known["stat"] = (stat.st_mtime_ns, stat.st_size)
+        return False
+
+    def _load(self):
+        """
+        Build a fresh classifier and load its artifacts.
+
+        A failed load is not cached: the previously loaded classifier (or,
+        if there is none, the unloaded one) keeps serving and the load is
+        retried with exponential backoff.
+        """
+        from models.train_models import ExoplanetClassifier
+
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        classifier = ExoplanetClassifier()
+        error = None
+        try:
+            classifier.load_models()
+        except Exception as e:
+            error = str(e)
+        elapsed = time.perf_counter() - start
+
+        if error is not None:
+            self._failures += 1
+            self._retry_at = time.monotonic() + min(LOAD_RETRY_DELAY * 2 ** (self._failures - 1), LOAD_RETRY_MAX)
+            if self._classifier is None or not self._stats["loaded"]:
+                self._classifier = classifier
+                self._stats["loaded"] = False
+            self._stats.update({
+                "load_count": self._stats["load_count"] + 1,
+                "error": error,
+                "failures": self._failures,
+            })
+            return
+
+        fingerprint = {}
+        for path, digest in self._artifact_hashes().items():
+            if digest is None:
+                fingerprint[path] = None
+                continue
+            stat = os.stat(path)
+            fingerprint[path] = {"sha256": digest, "stat": (stat.st_mtime_ns, stat.st_size)}
+
+        self._classifier = classifier
+        self._fingerprint = fingerprint
+        self._failures = 0
+        self._retry_at = None
+        self._metadata = read_model_metadata(self.metadata) if self.metadata else {}
+        self._stats.update({
+            "loaded": True,
+            "load_count": self._stats["load_count"] + 1,
+            "load_seconds": elapsed,
+            "memory_bytes": max(current_rss_bytes() - rss_before, 0),
+            "loaded_at": time.time(),
+            "error": None,
+            "failures": 0,
+            "feature_path": self._metadata.get("feature_path", "processor"),
+            "artifacts": {path: (info["sha256"] if info else None) for path, info in fingerprint.items()},
+        })
+
+    def get_classifier(self):
+        """Return the shared classifier, reloading when an artifact changed or a failed load is due a retry"""
+        with self._lock:
+            if self._retry_at is not None:
+                if time.monotonic() >= self._retry_at:
+                    self._load()
+            elif self._classifier is None or self._artifacts_changed():
+                self._load()
+            return self._classifier
+
+    def warm_up(self):
+        """Import the ML frameworks and load the models on a background thread"""
+        from utils.lazy_imports import warm_up
+
+        if self._classifier is not None or (self._warm_thread and self._warm_thread.is_alive()):
+            return self._warm_thread
+        self._warm_thread = warm_up(then=self.get_classifier)
+        return self._warm_thread
+
+    @property
+    def models_loaded(self):
+        return self._stats["loaded"]
+
+    @property
+    def feature_path(self):
+        """
+        Feature path the loaded models were trained on, for scoring callers
+        to analyze with; None (the pipeline default) until models are loaded.
+        """
+        return self._stats["feature_path"] if self._stats["loaded"] else None
+
+    def stats(self):
+        """Return load time, memory and artifact hashes for the current models"""
+        with self._lock:
+            return dict(self._stats)
+
+    def invalidate(self):
+        """Drop the cached classifier so the next access reloads it"""
+        with self._lock:
+            self._classifier = None
+            self._fingerprint = None
+            self._retry_at = None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """Return the process-wide model registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
@@ -0,0 +1,319 @@
+# utils/pipeline.py - In-memory light curve analysis pipeline
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from utils.bls_engine import MAX_PLANETS, default_engine, in_transit
+from utils.detrend import detrend_light_curve
+from utils.instrumentation import PipelineProfile, get_metrics
+from utils.light_curve_io import LIGHT_CURVE_COLUMNS, read_light_curve
+from utils.precision import compact_light_curve
+
+# Minimum BLS depth signal-to-noise for a transit detection
+DETECTION_SNR = 7.1
+
+# "processor" cleans with LightCurveProcessor.preprocess_light_curve (falling back to
+# utils.detrend for processors without one); "detrend" always uses the utils.detrend biweight
+PREPROCESS = os.environ.get("CELESTIAL_PREPROCESS", "processor")
+PREPROCESS_MODES = ("processor", "detrend")
+
+# Source of bls_features: "processor" is the original LightCurveProcessor.process_light_curve()
+# extraction the shipped XGBoost/CNN models were trained on; "pipeline" runs this module's BLS
+# search, whose period grid, SNR definition and detection threshold differ. Models must be scored
+# on the path they were trained on, so the default stays "processor"; scoring callers pass the
+# path recorded with the loaded models (ModelRegistry.feature_path) instead
+FEATURE_PATH = os.environ.get("CELESTIAL_FEATURE_PATH", "processor")
+FEATURE_PATHS = ("processor", "pipeline")
+
+# Relative tolerance per feature for the pipeline's BLS to count as matching the processor's
+# extraction (see feature_parity); the "pipeline" feature path is only for models trained on it
+# until these hold on the sample data
+PARITY_TOLERANCE = {"bls_period": 0.01, "bls_depth": 0.10, "bls_snr": 0.25, "bls_power": 0.25}
+
+EMPTY_BLS_FEATURES = {
+    "bls_period": 0.0,
+    "bls_depth": 0.0,
+    "bls_snr": 0.0,
+    "bls_power": 0.0,
+    "bls_duration": 0.0,
+    "bls_t0": 0.0,
+}
+
+
+def resolve_feature_path(processor, feature_path=None):
+    """
+    The feature path an analysis actually runs: ``feature_path`` (default
+    FEATURE_PATH), or "pipeline" for processors without process_light_curve().
+    """
+    feature_path = feature_path or FEATURE_PATH
+    if feature_path not in FEATURE_PATHS:
+        raise ValueError(f"Unknown feature path {feature_path!r}; expected one of {FEATURE_PATHS}")
+    if feature_path == "processor" and not hasattr(processor, "process_light_curve"):
+        return "pipeline"
+    return feature_path
+
+
+def preprocess(processor, time, flux, mode=None):
+    """Clean a raw light curve with the configured preprocessing; returns float64 (time, flux)"""
+    mode = mode or PREPROCESS
+    if mode not in PREPROCESS_MODES:
+        raise ValueError(f"Unknown preprocessing mode {mode!r}; expected one of {PREPROCESS_MODES}")
+    if mode == "processor" and hasattr(processor, "preprocess_light_curve"):
+        time, flux = processor.preprocess_light_curve(time, flux)
+    else:
+        time, flux = detrend_light_curve(time, flux)
+    return np.asarray(time, dtype=np.float64), np.asarray(flux, dtype=np.float64)
+
+
+def run_bls(time, flux, engine=None, stats=None):
+    """
+    Run a Box Least Squares search and return (bls_features, detected).
+
+    ``stats``, if given, is updated with the search mode and the number of
+    grid evaluations it used.
+    """
+    engine = engine or default_engine()
+    result = engine.search(time, flux)
+    if stats is not None:
+        stats.update(result.stats)
+    features = result.best_features()
+    detected = features["bls_depth"] > 0 and features["bls_snr"] >= DETECTION_SNR
+    return (features if detected else dict(EMPTY_BLS_FEATURES)), detected
+
+
+def processor_features(processor, time, flux):
+    """
+    Run the processor's original extraction and return (bls_features, detected).
+
+    process_light_curve() reads a CSV path, so the raw arrays are written
+    to a private temporary file for the call. As in the original apps, a
+    transit counts as detected when the processor reports a period.
+    """
+    with tempfile.TemporaryDirectory(prefix="celestial-") as tmp_dir:
+        path = os.path.join(tmp_dir, "light_curve.csv")
+        np.savetxt(path, np.column_stack((time, flux)), fmt="%.17g", delimiter=",",
+                   header=",".join(LIGHT_CURVE_COLUMNS), comments="")
+        legacy = processor.process_light_curve(path)
+    features = dict(EMPTY_BLS_FEATURES, **legacy.get("bls_features", {}))
+    return features, features["bls_period"] > 0
+
+
+def candidate_features(time, flux, bls_features, number):
+    """A transit candidate: its bls_* features plus transit coverage and depth uncertainty"""
+    period, t0 = bls_features["bls_period"], bls_features["bls_t0"]
+    transit = in_transit(time, period, t0, bls_features["bls_duration"])
+    epochs = np.unique(np.rint((time[transit] - t0) / period)) if period > 0 else np.empty(0)
+    return dict(
+        bls_features,
+        candidate=number,
+        n_transits=int(len(epochs)),
+        n_in_transit=int(transit.sum()),
+        depth_uncertainty=uncertainty_features(flux, bls_features)["depth_uncertainty"],
+    )
+
+
+def candidate_table(candidates):
+    """Display rows, one per transit candidate, for the UI's candidate tables"""
+    return [{
+        "Candidate": candidate["candidate"],
+        "Period (d)": round(candidate["bls_period"], 5),
+        "Depth (ppt)": round(candidate["bls_depth"] * 1000, 3),
+        "Duration (h)": round(candidate["bls_duration"] * 24, 2),
+        "SNR": round(candidate["bls_snr"], 1),
+        "Transits": candidate["n_transits"],
+    } for candidate in candidates]
+
+
+def run_multi_bls(time, flux, max_planets, engine=None, stats=None):
+    """
+    Iterative multi-planet search; returns transit candidates, strongest first.
+
+    Each candidate is a candidate_features() dict for one signal found by
+    BLSEngine.search_iterative, which masks the transits of every detection
+    before searching again. ``stats``, if given, is updated with the number
+    of passes and the total grid evaluations.
+    """
+    engine = engine or default_engine()
+    results, search_stats = engine.search_iterative(time, flux, max_planets, DETECTION_SNR)
+    if stats is not None:
+        stats.update(search_stats)
+    return [candidate_features(time, flux, result.best_features(), number)
+            for number, result in enumerate(results, 1)]
+
+
+def quality_report(raw_time, raw_flux, time, flux):
+    """Summarise coverage and noise of a cleaned light curve"""
+    cadence = float(np.median(np.diff(time))) if len(time) > 1 else 0.0
+    return {
+        "n_points": int(len(raw_time)),
+        "n_valid": int(len(time)),
+        "nan_fraction": float(np.mean(~np.isfinite(raw_flux))) if len(raw_flux) else 0.0,
+        "time_span_days": float(time.max() - time.min()) if len(time) else 0.0,
+        "median_cadence_days": cadence,
+        "flux_rms_ppm": float(np.std(flux) * 1e6) if len(flux) else 0.0,
+    }
+
+
+def uncertainty_features(flux, bls_features):
+    """Noise statistics used to qualify the BLS measurement"""
+    flux_std = float(np.std(flux)) if len(flux) else 0.0
+    flux_mad = float(np.median(np.abs(flux - np.median(flux)))) if len(flux) else 0.0
+    snr = bls_features["bls_snr"]
+    return {
+        "flux_std": flux_std,
+        "flux_mad": flux_mad,
+        "depth_uncertainty": float(bls_features["bls_depth"] / snr) if snr > 0 else 0.0,
+    }
+
+
+def process_light_curve_arrays(processor, time, flux, progress=None, profile=None, max_planets=None,
+                               precision=None, feature_path=None):
+    """
+    Run the full analysis on in-memory time/flux arrays.
+
+    Args:
+        processor (LightCurveProcessor): Supplies preprocess_light_curve()
+            (see preprocess() and CELESTIAL_PREPROCESS).
+        time (np.ndarray): Observation times in days.
+        flux (np.ndarray): Flux measurements.
+        progress (callable): Optional ``progress(fraction, message)`` hook
+            called as each stage starts.
+        profile (PipelineProfile): Profile to add stage timings to; a new
+            one is created (and reported to the metrics registry) if None.
+        max_planets (int): Signals to search for (defaults to MAX_PLANETS);
+            above 1 runs the iterative multi-planet search, whose strongest
+            candidate supplies bls_features. Ignored on the "processor"
+            feature path, which reports the processor's single signal.
+        precision (str): Dtype policy for the returned time/flux arrays
+            (defaults to RESULT_PRECISION, see utils.precision); all
+            analysis runs in float64 regardless.
+        feature_path (str): "processor" or "pipeline" (defaults to
+            FEATURE_PATH, see resolve_feature_path()).
+
+    Returns:
+        dict: time (days since time_offset), time_offset, flux, period,
+        transit_detected, bls_features, candidates, bls_search,
+        feature_path, quality_report, uncertainty_features and profile.
+    """
+    feature_path = resolve_feature_path(processor, feature_path)
+    owned = profile is None
+    profile = profile or PipelineProfile()
+    if progress:
+        progress(0.2, "Detrending light curve")
+    with profile.stage("preprocess"):
+        clean_time, clean_flux = preprocess(processor, time, flux)
+
+    if progress:
+        progress(0.4, "Searching for transits (BLS)")
+    max_planets = MAX_PLANETS if max_planets is None else max_planets
+    search_stats = {}
+    with profile.stage("bls"):
+        if feature_path == "processor":
+            bls_features, detected = processor_features(processor, time, flux)
+            candidates = [candidate_features(clean_time, clean_flux, bls_features, 1)] if detected else []
+            search_stats["mode"] = "processor"
+        elif max_planets > 1:
+            candidates = run_multi_bls(clean_time, clean_flux, max_planets, stats=search_stats)
+            detected = bool(candidates)
+            bls_features = ({name: candidates[0][name] for name in EMPTY_BLS_FEATURES} if detected
+                            else dict(EMPTY_BLS_FEATURES))
+        else:
+            bls_features, detected = run_bls(clean_time, clean_flux, stats=search_stats)
+            candidates = [candidate_features(clean_time, clean_flux, bls_features, 1)] if detected else []
+
+    if progress:
+        progress(0.9, "Extracting features")
+    with profile.stage("features"):
+        report = quality_report(time, flux, clean_time, clean_flux)
+        uncertainty = uncertainty_features(clean_flux, bls_features)
+        time_offset, clean_time, clean_flux = compact_light_curve(clean_time, clean_flux, precision)
+
+    if owned:
+        get_metrics().observe(profile, n_points=int(len(time)))
+    return {
+        "time": clean_time,
+        "time_offset": time_offset,
+        "flux": clean_flux,
+        "period": bls_features["bls_period"],
+        "transit_detected": detected,
+        "bls_features": bls_features,
+        "candidates": candidates,
+        "bls_search": search_stats,
+        "feature_path": feature_path,
+        "quality_report": report,
+        "uncertainty_features": uncertainty,
+        "profile": profile.to_dict(),
+    }
+
+
+def process_light_curve_source(processor, source, progress=None, max_planets=None, feature_path=None):
+    """Read a path, bytes, file-like or array source in memory and analyze it"""
+    profile = PipelineProfile()
+    if progress:
+        progress(0.05, "Reading light curve")
+    with profile.stage("read"):
+        time, flux = read_light_curve(source)
+    result = process_light_curve_arrays(processor, time, flux, progress, profile, max_planets,
+                                        feature_path=feature_path)
+    get_metrics().observe(profile, n_points=int(len(time)))
+    return result
+
+
+def feature_parity(processor, time, flux, tolerance=PARITY_TOLERANCE):
+    """
+    Compare the pipeline's BLS features with the processor's own extraction.
+
+    Both run on the same raw arrays; the pipeline searches the preprocessed
+    curve exactly as the "pipeline" feature path does.
+
+    Returns:
+        dict: Per feature the two values, their relative difference and
+        whether it is within ``tolerance``, plus an overall ``match``.
+    """
+    expected, expected_detected = processor_features(processor, time, flux)
+    clean_time, clean_flux = preprocess(processor, time, flux)
+    actual, detected = run_bls(clean_time, clean_flux)
+    report = {"features": {}, "detected": {"processor": bool(expected_detected), "pipeline": bool(detected)}}
+    for name, limit in tolerance.items():
+        a, b = float(expected.get(name, 0.0)), float(actual.get(name, 0.0))
+        diff = abs(a - b) / abs(a) if a else abs(b)
+        report["features"][name] = {"processor": a, "pipeline": b, "rel_diff": diff, "ok": diff <= limit}
+    report["match"] = bool(expected_detected) == bool(detected) and all(
+        entry["ok"] for entry in report["features"].values())
+    return report
+
+
+def main(argv=None):
+    """Check pipeline/processor feature parity: python -m utils.pipeline [light curves]"""
+    parser = argparse.ArgumentParser(description="Compare the pipeline's BLS features with the processor's")
+    parser.add_argument("sources", nargs="*", help="Light curve files (default: the create_sample_data.py curves)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from utils.feature_extractor import LightCurveProcessor
+
+    processor = LightCurveProcessor()
+    if args.sources:
+        curves = [(source, read_light_curve(source)) for source in args.sources]
+    else:
+        from create_sample_data import create_professional_non_transit, create_professional_transit
+
+        np.random.seed(args.seed)
+        curves = [("sample_with_transit", create_professional_transit(marker=False)),
+                  ("sample_no_transit", create_professional_non_transit(marker=False))]
+    matched = True
+    for name, (time, flux) in curves:
+        report = feature_parity(processor, time, flux)
+        matched &= report["match"]
+        print(f"{'✅' if report['match'] else '❌'} {name}: detected {report['detected']}")
+        for feature, entry in report["features"].items():
+            print(f"  {feature:<11} processor {entry['processor']:.6g}  pipeline {entry['pipeline']:.6g}  "
+                  f"({100 * entry['rel_diff']:.1f}%{'' if entry['ok'] else ' > tolerance'})")
+    return 0 if matched else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+# utils/precision.py - Compact result arrays and memory footprint reports
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+# "float32" keeps result flux as float32 and time as float32 days since the first cadence
+# (resolving ~0.2 s over a 30-day sector, ~5 s over a 4-year Kepler baseline); "float64"
+# keeps the pipeline's full-precision arrays. Analysis itself always runs in float64.
+RESULT_PRECISION = os.environ.get("CELESTIAL_RESULT_PRECISION", "float32")
+
+PRECISIONS = ("float32", "float64")
+
+
+def compact_light_curve(time, flux, precision=None):
+    """
+    Convert cleaned float64 arrays to the result precision.
+
+    Returns:
+        tuple: (time_offset, time, flux); ``time + time_offset`` gives the
+        observation times. float64 input is returned as is for "float64".
+    """
+    precision = precision or RESULT_PRECISION
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown result precision {precision!r}; expected one of {PRECISIONS}")
+    if precision == "float64":
+        return 0.0, time, flux
+    offset = float(time[0]) if len(time) else 0.0
+    # Subtract in float64 and round once into the float32 buffer, without a float64 temporary
+    relative = np.empty(len(time), dtype=np.float32)
+    np.subtract(time, offset, out=relative, casting="same_kind")
+    return offset, relative, flux.astype(np.float32)
+
+
+def absolute_time(result):
+    """Observation times of a result as float64 (a new array)"""
+    return np.add(result["time"], result.get("time_offset", 0.0), dtype=np.float64)
+
+
+def footprint(value):
+    """Bytes held by the NumPy arrays in a (nested) result dict, list or tuple"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(footprint(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(footprint(v) for v in value)
+    return 0
+
+
+def _plot_arrays(result):
+    """The decimated traces the UI builds from a result"""
+    from utils.decimate import decimate, phase_fold
+
+    time, flux = decimate(result["time"], result["flux"])
+    traces = [time + result.get("time_offset", 0.0), flux]
+    if result["period"] > 0:
+        traces.extend(phase_fold(result["time"], result["flux"], result["period"], -result.get("time_offset", 0.0)))
+    return traces
+
+
+def _traced(fn):
+    """Run fn() under tracemalloc; return (value, peak bytes allocated during the call)"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        value = fn()
+        return value, tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+def memory_report(processor, time, flux, precisions=PRECISIONS):
+    """
+    Memory used by one analysis and its plots under each result precision.
+
+    NumPy reports its buffers to tracemalloc, so the peaks cover every
+    array allocated by preprocessing, BLS, feature extraction and the plot
+    builders (though not memory allocated by other native libraries).
+
+    Returns:
+        dict: Per precision, the result's array bytes (``result_bytes``, and
+        ``arrays`` per result key), the peak bytes allocated while
+        analyzing and while building plot traces, and the input size.
+    """
+    from utils.pipeline import process_light_curve_arrays
+
+    time = np.asarray(time, dtype=np.float64)
+    flux = np.asarray(flux, dtype=np.float64)
+    report = {"n_points": int(len(time)), "input_bytes": int(time.nbytes + flux.nbytes), "precisions": {}}
+    for precision in precisions:
+        result, analysis_peak = _traced(lambda: process_light_curve_arrays(processor, time, flux, precision=precision))
+        _, plot_peak = _traced(lambda: _plot_arrays(result))
+        report["precisions"][precision] = {
+            "result_bytes": footprint(result),
+            "arrays": {key: footprint(value) for key, value in result.items() if footprint(value)},
+            "analysis_peak_bytes": analysis_peak,
+            "plot_peak_bytes": plot_peak,
+        }
+    return report
+
+
+def main(argv=None):
+    """Print a memory footprint report: python -m utils.precision [light_curve]"""
+    parser = argparse.ArgumentParser(description="Compare the memory footprint of result precisions")
+    parser.add_argument("source", nargs="?", help="Light curve file (default: a synthetic curve)")
+    parser.add_argument("--points", type=int, default=200_000, help="Cadences of the synthetic curve")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    args = parser.parse_args(argv)
+
+    from utils.feature_extractor import LightCurveProcessor
+
+    if args.source:
+        from utils.light_curve_io import read_light_curve
+
+        time, flux = read_light_curve(args.source)
+    else:
+        from utils.synthetic import generate_arrays
+
+        time, flux, _ = generate_arrays(1, args.points, rng=np.random.default_rng(args.seed), transit_fraction=1.0)
+        flux = flux[0]
+
+    report = memory_report(LightCurveProcessor(), time, flux)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    mib = 2.0 ** 20
+    print(f"📦 {report['n_points']:,} cadences, {report['input_bytes'] / mib:.1f} MiB input")
+    baseline = report["precisions"].get("float64")
+    for precision, info in report["precisions"].items():
+        line = (f"  {precision}: result {info['result_bytes'] / mib:.1f} MiB, "
+                f"analysis peak {info['analysis_peak_bytes'] / mib:.1f} MiB, "
+                f"plots peak {info['plot_peak_bytes'] / mib:.1f} MiB")
+        if baseline and precision != "float64" and info["result_bytes"]:
+            line += f" ({baseline['result_bytes'] / info['result_bytes']:.1f}x smaller result)"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
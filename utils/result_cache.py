@@ -0,0 +1,181 @@
+# utils/result_cache.py - Content-addressed cache for process_light_curve results
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from utils.bls_engine import BLS_SEARCH, MAX_PLANETS
+from utils.pipeline import PREPROCESS, resolve_feature_path
+from utils.precision import RESULT_PRECISION
+
+# Bump when the layout of cached result dicts changes
+CACHE_VERSION = 7
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "light_curves")
+
+_SIMPLE_TYPES = (bool, int, float, str, bytes, type(None))
+
+
+def processor_fingerprint(processor):
+    """Describe a processor's configuration as a stable string"""
+    parts = [type(processor).__module__, type(processor).__qualname__]
+    for name, value in sorted(vars(processor).items()):
+        if name.startswith("_"):
+            continue
+        if isinstance(value, _SIMPLE_TYPES) or (
+            isinstance(value, (tuple, list)) and all(isinstance(v, _SIMPLE_TYPES) for v in value)
+        ):
+            parts.append(f"{name}={value!r}")
+    return "|".join(parts)
+
+
+def result_cache_key(data, processor, max_planets=None, feature_path=None):
+    """
+    Hash the input bytes together with the processor configuration and the analysis options.
+
+    ``data`` is a bytes-like object or an iterable of them (e.g.
+    utils.light_curve_io.source_blocks(), which streams files).
+    """
+    max_planets = MAX_PLANETS if max_planets is None else max_planets
+    feature_path = resolve_feature_path(processor, feature_path)
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_VERSION}|{PREPROCESS}|{feature_path}|{BLS_SEARCH}|{max_planets}|{RESULT_PRECISION}|"
+                  f"{processor_fingerprint(processor)}".encode())
+    digest.update(b"\0")
+    for block in ((data,) if isinstance(data, (bytes, bytearray, memoryview)) else data):
+        digest.update(memoryview(block))
+    return digest.hexdigest()
+
+
+def _copy_result(result):
+    """Copy the dict layers of a result so callers can't mutate cached entries"""
+    return {key: (_copy_result(value) if isinstance(value, dict) else value) for key, value in result.items()}
+
+
+class LightCurveResultCache:
+    """Two-tier (memory LRU + size-bounded disk) cache of processed light curves"""
+
+    def __init__(self, max_memory_entries=32, cache_dir=DEFAULT_CACHE_DIR, max_disk_bytes=256 * 1024 * 1024):
+        self.max_memory_entries = max_memory_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as fh:
+                result = pickle.load(fh)
+            os.utime(path)  # mark as recently used for eviction
+            return result
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+    def _write_disk(self, key, result):
+        if not self.cache_dir or self.max_disk_bytes <= 0:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as fh:
+                pickle.dump(result, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        """Remove least recently used files until the directory fits the budget"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def get(self, key):
+        """Return a cached result for key, or None"""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return _copy_result(result)
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits["disk"] += 1
+            self._remember(key, result)
+        return _copy_result(result)
+
+    def put(self, key, result):
+        """Store a result in both tiers"""
+        result = _copy_result(result)
+        with self._lock:
+            self._remember(key, result)
+        self._write_disk(key, result)
+
+    def get_or_compute(self, data, processor, compute, max_planets=None, feature_path=None):
+        """Return the cached result for (data, processor, options) or compute and store it"""
+        key = result_cache_key(data, processor, max_planets, feature_path)
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        """Drop every cached entry from memory and disk"""
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".pkl"):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide light curve result cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LightCurveResultCache()
+        return _cache
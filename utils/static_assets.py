@@ -0,0 +1,107 @@
+# utils/static_assets.py - Process-wide cache for encoded images and rendered CSS
+import base64
+import hashlib
+import mimetypes
+import os
+import shutil
+import threading
+
+# Serve images from Streamlit's static folder instead of inlining base64
+# (requires server.enableStaticServing, see .streamlit/config.toml)
+STATIC_SERVING = os.environ.get("CELESTIAL_STATIC_ASSETS", "0") == "1"
+STATIC_DIR = "static"
+
+_lock = threading.Lock()
+_encoded = {}
+_published = {}
+_rendered = {}
+
+
+def _signature(path):
+    """(mtime_ns, size) of a file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def encode_base64(path):
+    """Return a file's base64 text, re-encoding only when its mtime/size changes"""
+    key = os.path.abspath(path)
+    signature = _signature(key)
+    if signature is None:
+        return None
+    with _lock:
+        cached = _encoded.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+    with open(key, "rb") as fh:
+        encoded = base64.b64encode(fh.read()).decode()
+    with _lock:
+        _encoded[key] = (signature, encoded)
+    return encoded
+
+
+def publish_static(path):
+    """
+    Copy an asset into the static folder under a content-hashed name.
+
+    The hashed name changes whenever the file does, so browsers can cache
+    the URL indefinitely. Returns the URL path Streamlit serves it from.
+    """
+    key = os.path.abspath(path)
+    signature = _signature(key)
+    if signature is None:
+        return None
+    with _lock:
+        cached = _published.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+    with open(key, "rb") as fh:
+        digest = hashlib.sha256(fh.read()).hexdigest()[:12]
+    stem, ext = os.path.splitext(os.path.basename(path))
+    name = f"{stem}.{digest}{ext}"
+    target = os.path.join(STATIC_DIR, name)
+    if not os.path.exists(target):
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        shutil.copyfile(key, target)
+    url = f"app/static/{name}"
+    with _lock:
+        _published[key] = (signature, url)
+    return url
+
+
+def asset_src(path, static=None):
+    """Return an <img>/CSS source for an asset: a static URL or a cached data URI"""
+    static = STATIC_SERVING if static is None else static
+    if static:
+        url = publish_static(path)
+        if url:
+            return url
+    encoded = encode_base64(path)
+    if encoded is None:
+        return None
+    mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return f"data:{mime};base64,{encoded}"
+
+
+def render_cached(name, dependencies, build):
+    """
+    Return ``build()``'s output, rebuilding only when a dependency file changes.
+
+    Args:
+        name (str): Cache key for the rendered block.
+        dependencies (list): Asset paths whose mtime/size invalidate the block.
+        build (callable): Produces the rendered string.
+    """
+    key = (name, STATIC_SERVING)
+    signature = tuple(_signature(os.path.abspath(path)) for path in dependencies)
+    with _lock:
+        cached = _rendered.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+    rendered = build()
+    with _lock:
+        _rendered[key] = (signature, rendered)
+    return rendered
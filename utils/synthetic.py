@@ -0,0 +1,338 @@
+# utils/synthetic.py - Vectorized synthetic light curves for training and stress-test corpora
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+# Default observing window, matching create_sample_data.py
+DEFAULT_BASELINE = 30.0
+DEFAULT_POINTS = 1500
+# Quadratic limb-darkening coefficients (u1, u2) of a Sun-like star in the Kepler band
+SOLAR_LIMB_DARKENING = (0.40, 0.26)
+# Samples generated per vectorized block, which bounds worker memory (~32 MB of float64)
+BLOCK_SAMPLES = 4_000_000
+# Curves per pool task when writing a corpus
+CHUNK_CURVES = 256
+LABELS_FILE = "labels.csv"
+LABEL_COLUMNS = ("target_id", "label", "n_planets", "period", "t0", "depth", "duration", "impact",
+                 "periods", "depths", "noise_ppm", "red_noise_ppm", "red_timescale", "variability_ppm",
+                 "rotation_period")
+
+
+def transit_model(time, period, t0, depth, duration, impact=0.0, ingress=None,
+                  limb_darkening=SOLAR_LIMB_DARKENING):
+    """
+    Relative flux of a limb-darkened transit, evaluated for all samples at once.
+
+    Parameters are scalars or arrays of shape (B,); with arrays the result
+    has shape (B, len(time)), one curve per parameter set sharing the time
+    grid. The shape uses the small-planet approximation: the occulted
+    intensity follows the quadratic limb-darkening law along the chord set
+    by the impact parameter, with a linear ramp over ingress and egress.
+
+    Args:
+        time (np.ndarray): Observation times in days.
+        period (float or np.ndarray): Orbital period in days.
+        t0 (float or np.ndarray): Mid-transit time of one transit.
+        depth (float or np.ndarray): Fractional depth at mid-transit (0 disables the planet).
+        duration (float or np.ndarray): First-to-fourth contact duration in days.
+        impact (float or np.ndarray): Impact parameter (0 = central transit).
+        ingress (float or np.ndarray): Ingress duration as a fraction of ``duration``;
+            derived from the radius ratio and impact parameter when None.
+        limb_darkening (tuple): Quadratic coefficients (u1, u2).
+
+    Returns:
+        np.ndarray: Relative flux, 1 out of transit.
+    """
+    time = np.asarray(time, dtype=np.float64)
+    period, t0, depth, duration, impact = (np.asarray(value, dtype=np.float64)[..., None]
+                                           for value in (period, t0, depth, duration, impact))
+    if ingress is None:
+        ingress = np.sqrt(depth) / np.maximum(1.0 - impact ** 2, 1e-3)
+    else:
+        ingress = np.asarray(ingress, dtype=np.float64)[..., None]
+    ingress = np.clip(ingress, 1e-3, 0.5)
+    u1, u2 = limb_darkening
+
+    def intensity(r2):
+        edge = 1.0 - np.sqrt(np.clip(1.0 - r2, 0.0, 1.0))
+        return 1.0 - u1 * edge - u2 * edge ** 2
+
+    # Distance from the nearest mid-transit in units of the half-duration;
+    # the transit shape is only evaluated for the few in-transit samples
+    cycles = (time - t0) / period
+    z = np.abs(cycles - np.rint(cycles)) * (2.0 * period / duration)
+    inside = (z < 1.0) & (depth > 0)
+    flux = np.ones(z.shape)
+    z = z[inside]
+    depth, impact, ingress = (np.broadcast_to(value, inside.shape)[inside] for value in (depth, impact, ingress))
+    shape = intensity(impact ** 2 + (1.0 - impact ** 2) * z ** 2) / intensity(impact ** 2)
+    flux[inside] = 1.0 - depth * shape * np.clip((1.0 - z) / ingress, 0.0, 1.0)
+    return flux
+
+
+def red_noise(rng, shape, sigma, timescale):
+    """
+    Correlated (red) noise with an exponential autocorrelation.
+
+    White noise is shaped in the Fourier domain by a Lorentzian filter, so
+    a batch of shape (B, N) costs two FFTs; each row is rescaled to its
+    ``sigma``.
+
+    Args:
+        rng (np.random.Generator): Random source.
+        shape (tuple): (N,) or (B, N).
+        sigma (float or np.ndarray): Standard deviation per curve.
+        timescale (float or np.ndarray): Correlation length in cadences.
+    """
+    n = shape[-1]
+    white = rng.standard_normal(shape)
+    freqs = np.fft.rfftfreq(n)
+    timescale = np.asarray(timescale, dtype=np.float64)[..., None]
+    noise = np.fft.irfft(np.fft.rfft(white, axis=-1) / np.sqrt(1.0 + (2 * np.pi * freqs * timescale) ** 2),
+                         n, axis=-1)
+    scale = np.asarray(sigma, dtype=np.float64)[..., None] / np.maximum(noise.std(axis=-1, keepdims=True), 1e-12)
+    return noise * scale
+
+
+def stellar_variability(rng, time, amplitude, rotation_period):
+    """
+    Spot modulation: the rotation signal and its first harmonic, with the
+    amplitude slowly evolving as spots grow and decay.
+    """
+    amplitude = np.asarray(amplitude, dtype=np.float64)[..., None]
+    rotation_period = np.asarray(rotation_period, dtype=np.float64)[..., None]
+    phases = rng.uniform(0, 2 * np.pi, (3,) + amplitude.shape)
+    evolution_period = rotation_period * rng.uniform(3.0, 10.0, amplitude.shape)
+    envelope = 1.0 + 0.3 * np.sin(2 * np.pi * time / evolution_period + phases[2])
+    omega = 2 * np.pi * time / rotation_period
+    return amplitude * envelope * (np.sin(omega + phases[0]) + 0.3 * np.sin(2 * omega + phases[1]))
+
+
+def sample_parameters(rng, n_curves, baseline=DEFAULT_BASELINE, transit_fraction=0.5, max_planets=3):
+    """
+    Draw random system, noise and variability parameters for a batch.
+
+    Planet slots are sorted by depth, deepest first; unused slots have zero
+    depth. Periods are drawn so every planet transits at least twice.
+
+    Returns:
+        dict: Arrays of shape (B,) or (B, max_planets) for the planet fields.
+    """
+    shape = (n_curves, max_planets)
+    has_planets = rng.random(n_curves) < transit_fraction
+    n_planets = np.where(has_planets, rng.integers(1, max_planets + 1, n_curves), 0)
+    present = np.arange(max_planets) < n_planets[:, None]
+
+    max_period = max(baseline / 2.0, 0.6)
+    period = np.exp(rng.uniform(np.log(0.5), np.log(max_period), shape))
+    # Duration scales as P^(1/3) for a Sun-like host, with a spread for other hosts and inclinations
+    duration = np.clip(0.54 * (period / 365.25) ** (1 / 3) * rng.uniform(0.5, 1.5, shape), 0.03, 0.6)
+    depth = np.where(present, np.exp(rng.uniform(np.log(3e-4), np.log(2e-2), shape)), 0.0)
+    order = np.argsort(-depth, axis=1)
+
+    def by_depth(values):
+        return np.take_along_axis(values, order, axis=1)
+
+    period, duration, depth = by_depth(period), by_depth(duration), by_depth(depth)
+    return {
+        "n_planets": n_planets,
+        "period": period,
+        "t0": rng.uniform(0, 1, shape) * period,
+        "depth": depth,
+        "duration": duration,
+        "impact": rng.uniform(0.0, 0.9, shape),
+        "noise_ppm": np.exp(rng.uniform(np.log(100.0), np.log(2000.0), n_curves)),
+        "red_noise_ppm": np.exp(rng.uniform(np.log(20.0), np.log(1000.0), n_curves)),
+        "red_timescale": rng.uniform(5.0, 100.0, n_curves),
+        "variability_ppm": np.where(rng.random(n_curves) < 0.7,
+                                    np.exp(rng.uniform(np.log(50.0), np.log(5000.0), n_curves)), 0.0),
+        "rotation_period": rng.uniform(1.0, 30.0, n_curves),
+    }
+
+
+def synthesize(time, params, rng):
+    """
+    Build a (B, N) flux batch from sample_parameters() output.
+
+    Planets multiply in (so overlapping transits stack), then spot
+    variability, red noise and white noise are added.
+    """
+    n_curves = len(params["n_planets"])
+    flux = np.ones((n_curves, len(time)))
+    for k in range(params["depth"].shape[1]):
+        rows = params["depth"][:, k] > 0
+        if rows.any():
+            flux[rows] *= transit_model(time, params["period"][rows, k], params["t0"][rows, k],
+                                        params["depth"][rows, k], params["duration"][rows, k],
+                                        params["impact"][rows, k])
+    rows = params["variability_ppm"] > 0
+    if rows.any():
+        flux[rows] += stellar_variability(rng, time, params["variability_ppm"][rows] * 1e-6,
+                                          params["rotation_period"][rows])
+    flux += red_noise(rng, flux.shape, params["red_noise_ppm"] * 1e-6, params["red_timescale"])
+    flux += rng.standard_normal(flux.shape) * (params["noise_ppm"][:, None] * 1e-6)
+    return flux
+
+
+def label_rows(params, target_ids):
+    """Ground-truth rows (LABEL_COLUMNS) for a batch; planet fields describe the deepest planet"""
+    rows = []
+    for i, target_id in enumerate(target_ids):
+        n = int(params["n_planets"][i])
+        row = {"target_id": target_id, "label": int(n > 0), "n_planets": n,
+               "periods": ";".join(f"{p:.6f}" for p in params["period"][i, :n]),
+               "depths": ";".join(f"{d:.6g}" for d in params["depth"][i, :n])}
+        for key in ("period", "t0", "depth", "duration", "impact"):
+            row[key] = float(params[key][i, 0]) if n else 0.0
+        for key in ("noise_ppm", "red_noise_ppm", "red_timescale", "variability_ppm", "rotation_period"):
+            row[key] = float(params[key][i])
+        rows.append(row)
+    return rows
+
+
+def generate_arrays(n_curves, n_points=DEFAULT_POINTS, baseline=DEFAULT_BASELINE, rng=None,
+                    transit_fraction=0.5, max_planets=3, prefix="SYN-", first=0):
+    """
+    Generate a batch of light curves in memory.
+
+    Args:
+        n_curves (int): Curves to generate.
+        n_points (int): Cadences per curve.
+        baseline (float): Observing window in days.
+        rng (np.random.Generator): Random source (a fresh one when None).
+        transit_fraction (float): Fraction of curves with at least one planet.
+        max_planets (int): Most planets per system.
+        prefix (str): Target ID prefix; IDs are numbered from ``first``.
+
+    Returns:
+        tuple: (time (N,), flux (B, N), label rows).
+    """
+    rng = rng or np.random.default_rng()
+    time = np.linspace(0.0, baseline, n_points)
+    per_block = max(1, BLOCK_SAMPLES // max(n_points, 1))
+    fluxes, labels = [], []
+    for start in range(0, n_curves, per_block):
+        count = min(per_block, n_curves - start)
+        params = sample_parameters(rng, count, baseline, transit_fraction, max_planets)
+        fluxes.append(synthesize(time, params, rng))
+        labels.extend(label_rows(params, [f"{prefix}{first + start + i:08d}" for i in range(count)]))
+    flux = fluxes[0] if len(fluxes) == 1 else np.concatenate(fluxes)
+    return time, flux, labels
+
+
+def _write_chunk(root, first, count, seed, options):
+    """Pool task: generate curves [first, first + count) and write them into the store directory"""
+    from utils.lc_store import write_target
+
+    # Seeding by chunk keeps a corpus identical for a given chunk size, whatever the worker count
+    rng = np.random.default_rng([seed, first])
+    entries, labels = {}, []
+    per_block = max(1, BLOCK_SAMPLES // max(options["n_points"], 1))
+    for start in range(first, first + count, per_block):
+        block = min(per_block, first + count - start)
+        time, flux, rows = generate_arrays(block, rng=rng, first=start, **options)
+        for row, curve in zip(rows, flux):
+            entries[row["target_id"]] = write_target(root, row["target_id"], time, curve, source="synthetic")
+        labels.extend(rows)
+    return entries, labels
+
+
+def generate_corpus(root, n_curves, n_points=DEFAULT_POINTS, baseline=DEFAULT_BASELINE, workers=None,
+                    chunk_size=CHUNK_CURVES, seed=0, transit_fraction=0.5, max_planets=3, prefix="SYN-",
+                    progress=None):
+    """
+    Generate a labelled corpus straight into a binary light curve store.
+
+    Chunks of curves are generated and written by a process pool; the
+    parent streams ground truth to ``labels.csv`` in the store as chunks
+    finish and adds all targets to the store index in one write at the end
+    (or when interrupted), so the index is not rewritten per curve.
+
+    Args:
+        root (str): Store directory (see utils.lc_store).
+        n_curves (int): Curves to generate.
+        workers (int): Worker processes (defaults to the CPU count).
+        chunk_size (int): Curves per pool task.
+        seed (int): Corpus seed; the same seed reproduces the same corpus.
+        progress (callable): Called with (done, total) after each chunk.
+
+    Returns:
+        dict: curves, elapsed_s and curves_per_s.
+    """
+    from utils.lc_store import LightCurveStore
+
+    start_time = time.perf_counter()
+    store = LightCurveStore(root)
+    options = {"n_points": n_points, "baseline": baseline, "transit_fraction": transit_fraction,
+               "max_planets": max_planets, "prefix": prefix}
+    workers = workers or os.cpu_count() or 1
+    labels_path = os.path.join(root, LABELS_FILE)
+    new_file = not os.path.exists(labels_path) or os.path.getsize(labels_path) == 0
+    entries = {}
+    done = 0
+
+    with open(labels_path, "a", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=LABEL_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = set()
+                chunks = iter(range(0, n_curves, chunk_size))
+                while True:
+                    for first in chunks:
+                        count = min(chunk_size, n_curves - first)
+                        pending.add(pool.submit(_write_chunk, root, first, count, seed, options))
+                        if len(pending) >= 2 * workers:
+                            break
+                    if not pending:
+                        break
+                    completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        chunk_entries, rows = future.result()
+                        entries.update(chunk_entries)
+                        writer.writerows(rows)
+                        done += len(rows)
+                    fh.flush()
+                    if progress:
+                        progress(done, n_curves)
+        finally:
+            if entries:
+                store.register(entries)
+
+    elapsed = time.perf_counter() - start_time
+    return {"curves": done, "elapsed_s": round(elapsed, 3), "curves_per_s": round(done / elapsed, 1) if elapsed else None}
+
+
+def main(argv=None):
+    """Generate a synthetic corpus: python -m utils.synthetic -o STORE -n 100000"""
+    parser = argparse.ArgumentParser(description="Generate labelled synthetic light curves into a binary store")
+    parser.add_argument("-o", "--output", required=True, help="Store directory")
+    parser.add_argument("-n", "--curves", type=int, default=10_000, help="Number of light curves")
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS, help="Cadences per curve")
+    parser.add_argument("--baseline", type=float, default=DEFAULT_BASELINE, help="Observing window in days")
+    parser.add_argument("--transit-fraction", type=float, default=0.5, help="Fraction of curves with planets")
+    parser.add_argument("--max-planets", type=int, default=3)
+    parser.add_argument("-j", "--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prefix", default="SYN-", help="Target ID prefix")
+    args = parser.parse_args(argv)
+
+    def report(done, total):
+        print(f"[{done}/{total}] curves written", flush=True)
+
+    summary = generate_corpus(args.output, args.curves, args.points, args.baseline, args.workers, seed=args.seed,
+                              transit_fraction=args.transit_fraction, max_planets=args.max_planets,
+                              prefix=args.prefix, progress=report)
+    print(f"🪐 {summary['curves']} curves in {summary['elapsed_s']}s ({summary['curves_per_s']} curves/s) "
+          f"-> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())